@@ -1,5 +1,5 @@
 const AppDataSource = require('../data-source');
-const { courseContentCreateSchema, courseContentUpdateSchema } = require('../validation/modelValidations');
+const { courseContentCreateSchema, courseContentBulkCreateSchema, courseContentUpdateSchema } = require('../validation/modelValidations');
 const ApiError = require('../utils/apiError');
 const ApiSuccess = require('../utils/apiSuccess');
 const CourseContent = require('../models/CourseContent');
@@ -51,7 +51,32 @@ const getContentByCourse = async (req, res, next) => {
   }
 };
 
+// Add many content items at once (data seeding)
+const addContentBulk = async (req, res, next) => {
+  try {
+    const { error, value } = courseContentBulkCreateSchema.validate(req.body);
+    if (error) {
+      return next(new ApiError(400, error.details[0].message));
+    }
+
+    const contentRepository = AppDataSource.getRepository(CourseContent);
+    const items = contentRepository.create(value.items.map(({ course_id, type, content, order }) => ({
+      course_id,
+      type,
+      content,
+      order,
+    })));
+    await contentRepository.save(items, { chunk: 1000 });
+
+    (new ApiSuccess(201, 'Content created successfully', items, { created: items.length }, null)).send(res);
+  } catch (err) {
+    console.error('Bulk add content error:', err);
+    return next(new ApiError(500, 'Server error'));
+  }
+};
+
 module.exports = {
   addContent,
+  addContentBulk,
   getContentByCourse,
 };
\ No newline at end of file
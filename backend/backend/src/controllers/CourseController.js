@@ -4,7 +4,7 @@ const Course = require('../models/Course');
 const User = require('../models/User');
 const ApiError = require('../utils/apiError');
 const ApiSuccess = require('../utils/apiSuccess');
-const { courseCreateSchema, courseUpdateSchema } = require('../validation/modelValidations'); 
+const { courseCreateSchema, courseBulkCreateSchema, courseUpdateSchema } = require('../validation/modelValidations'); 
 
 // Create a new course
 const createCourse = async (req, res, next) => {
@@ -129,8 +129,32 @@ const getFeaturedCourses = async (req, res, next) => {
     }
 };
 
+// Create many courses at once (data seeding)
+const createCoursesBulk = async (req, res, next) => {
+    try {
+        const { error, value } = courseBulkCreateSchema.validate(req.body);
+        if (error) {
+            return next(new ApiError(400, error.details[0].message));
+        }
+
+        const courseRepository = AppDataSource.getRepository(Course);
+        const courses = courseRepository.create(value.courses.map(({ title, description, instructor_id }) => ({
+            title,
+            description,
+            instructor_id,
+        })));
+        await courseRepository.save(courses, { chunk: 1000 });
+
+        (new ApiSuccess(201, 'Courses created successfully', courses, { created: courses.length }, null)).send(res);
+    } catch (err) {
+        console.error('Bulk create courses error:', err);
+        return next(new ApiError(500, 'Server error'));
+    }
+};
+
 module.exports = {
     createCourse,
+    createCoursesBulk,
     getAllCourses,
     getCourseById,
     updateCourse,
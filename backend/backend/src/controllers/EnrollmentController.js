@@ -1,10 +1,11 @@
+const { In } = require('typeorm');
 const AppDataSource = require('../data-source');
 const Enrollment = require('../models/Enrollment');
 const User = require('../models/User');
 const Course = require('../models/Course');
 const ApiError = require('../utils/apiError');
 const ApiSuccess = require('../utils/apiSuccess');
-const { enrollmentCreateSchema } = require('../validation/modelValidations'); 
+const { enrollmentCreateSchema, enrollmentBulkCreateSchema } = require('../validation/modelValidations'); 
 
 // Enroll a user in a course
 const enrollUser = async (req, res, next) => {
@@ -100,8 +101,46 @@ const getEnrollmentsByCourse = async (req, res, next) => {
     }
 };
 
+// Enroll many users at once (data seeding); pairs that are already enrolled are skipped,
+// so a batch can be re-sent after a failure
+const enrollUsersBulk = async (req, res, next) => {
+    try {
+        const { error, value } = enrollmentBulkCreateSchema.validate(req.body);
+        if (error) {
+            return next(new ApiError(400, error.details[0].message));
+        }
+
+        const { enrollments } = value;
+        const enrollmentRepository = AppDataSource.getRepository(Enrollment);
+
+        const existing = await enrollmentRepository.find({
+            where: {
+                user_id: In([...new Set(enrollments.map((enrollment) => enrollment.user_id))]),
+                course_id: In([...new Set(enrollments.map((enrollment) => enrollment.course_id))]),
+            },
+            select: { user_id: true, course_id: true }
+        });
+        const seen = new Set(existing.map((enrollment) => `${enrollment.user_id}:${enrollment.course_id}`));
+        const created = enrollmentRepository.create(enrollments.filter(({ user_id, course_id }) => {
+            const key = `${user_id}:${course_id}`;
+            return !seen.has(key) && seen.add(key);
+        }));
+        await enrollmentRepository.save(created, { chunk: 1000 });
+
+        (new ApiSuccess(201, 'Enrollments created successfully', null, {
+            requested: enrollments.length,
+            created: created.length,
+            skipped: enrollments.length - created.length
+        }, null)).send(res);
+    } catch (err) {
+        console.error('Bulk enrollment error:', err);
+        return next(new ApiError(500, 'Server error'));
+    }
+};
+
 module.exports = {
     enrollUser,
+    enrollUsersBulk,
     getEnrollmentsByUser,
     getEnrollmentsByCourse,
 };
\ No newline at end of file
@@ -1,10 +1,11 @@
+const { In } = require('typeorm');
 const AppDataSource = require('../data-source');
 const Notification = require('../models/Notification');
 const User = require('../models/User');
 const ApiError = require('../utils/apiError');
 const ApiSuccess = require('../utils/apiSuccess');
-const { sendEmail } = require('../services/emailService');
-const { notificationCreateSchema } = require('../validation/modelValidations');
+const { sendEmail, sendEmails } = require('../services/emailService');
+const { notificationCreateSchema, notificationBulkCreateSchema } = require('../validation/modelValidations');
 
 // Send a notification to a user
 const sendNotification = async (req, res, next) => {
@@ -46,6 +47,53 @@ const sendNotification = async (req, res, next) => {
     }
 };
 
+// Send the same notification to many users in one request
+const sendBulkNotifications = async (req, res, next) => {
+    try {
+        // Validate input
+        const { error, value } = notificationBulkCreateSchema.validate(req.body);
+        if (error) {
+            return next(new ApiError(400, error.details[0].message));
+        }
+
+        const { user_ids, message } = value;
+
+        const notificationRepository = AppDataSource.getRepository(Notification);
+        const userRepository = AppDataSource.getRepository(User);
+
+        // Unknown users are skipped instead of failing the whole batch
+        const users = await userRepository.find({ where: { id: In([...new Set(user_ids)]) } });
+        if (users.length === 0) {
+            return next(new ApiError(404, 'No users found'));
+        }
+
+        // Create all notifications in a single insert
+        const notifications = notificationRepository.create(
+            users.map((user) => ({ user_id: user.id, message }))
+        );
+        await notificationRepository.save(notifications);
+
+        (new ApiSuccess(201, 'Notifications sent successfully', notifications, {
+            requested: user_ids.length,
+            sent: notifications.length
+        }, null)).send(res);
+
+        // Email in the background through a small worker pool, so a large batch does not hold the response;
+        // a failed email does not undo the notifications
+        const recipients = users.map((user) => user.email);
+        sendEmails(recipients, 'New Notification', message)
+            .then((failed) => {
+                if (failed > 0) {
+                    console.error(`Bulk notification emails: ${failed} of ${recipients.length} failed`);
+                }
+            })
+            .catch((err) => console.error('Bulk notification emails error:', err));
+    } catch (err) {
+        console.error('Send bulk notifications error:', err);
+        return next(new ApiError(500, 'Server error'));
+    }
+};
+
 // Get all notifications for a user
 const getNotificationsByUser = async (req, res, next) => {
     const { user_id } = req.params;
@@ -70,5 +118,6 @@ const getNotificationsByUser = async (req, res, next) => {
 
 module.exports = {
     sendNotification,
+    sendBulkNotifications,
     getNotificationsByUser,
 };
\ No newline at end of file
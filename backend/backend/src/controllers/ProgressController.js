@@ -6,8 +6,8 @@ const User = require('../models/User');
 const ApiError = require('../utils/apiError');
 const ApiSuccess = require('../utils/apiSuccess');
 
-const { progressCreateSchema } = require('../validation/modelValidations'); 
-const { MoreThanOrEqual } = require('typeorm');
+const { progressCreateSchema, progressBulkCreateSchema } = require('../validation/modelValidations'); 
+const { In, MoreThanOrEqual } = require('typeorm');
 
 // Mark content as completed
 const markContentCompleted = async (req, res, next) => {
@@ -357,8 +357,45 @@ const getUserProgressOverTime = async (req, res, next) => {
   }
 };
 
+// Record many progress entries at once (data seeding); entries that already exist are skipped
+const markContentCompletedBulk = async (req, res, next) => {
+  try {
+    const { error, value } = progressBulkCreateSchema.validate(req.body);
+    if (error) {
+      return next(new ApiError(400, error.details[0].message));
+    }
+
+    const { records } = value;
+    const progressRepository = AppDataSource.getRepository(Progress);
+
+    const existing = await progressRepository.find({
+      where: {
+        user_id: In([...new Set(records.map((record) => record.user_id))]),
+        content_id: In([...new Set(records.map((record) => record.content_id))]),
+      },
+      select: { user_id: true, course_id: true, content_id: true }
+    });
+    const seen = new Set(existing.map((record) => `${record.user_id}:${record.course_id}:${record.content_id}`));
+    const created = progressRepository.create(records.filter(({ user_id, course_id, content_id }) => {
+      const key = `${user_id}:${course_id}:${content_id}`;
+      return !seen.has(key) && seen.add(key);
+    }));
+    await progressRepository.save(created, { chunk: 1000 });
+
+    (new ApiSuccess(201, 'Progress recorded successfully', null, {
+      requested: records.length,
+      created: created.length,
+      skipped: records.length - created.length
+    }, null)).send(res);
+  } catch (err) {
+    console.error('Bulk progress error:', err);
+    return next(new ApiError(500, 'Server error'));
+  }
+};
+
 module.exports = {
   markContentCompleted,
+  markContentCompletedBulk,
   getProgress,
   getCourseCompletionPercentage,
   getCourseAnalytics,
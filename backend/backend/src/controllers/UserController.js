@@ -1,10 +1,11 @@
 const bcrypt = require("bcryptjs");
 const jwt = require("jsonwebtoken");
+const { In } = require('typeorm');
 const AppDataSource = require('../data-source');
 const User = require("../models/User");
 const ApiError = require('../utils/apiError');
 const ApiSuccess = require('../utils/apiSuccess');
-const { userCreateSchema } = require('../validation/modelValidations'); 
+const { userCreateSchema, userBulkCreateSchema } = require('../validation/modelValidations'); 
 
 const register = async (req, res, next) => {
     try {
@@ -52,6 +53,50 @@ const register = async (req, res, next) => {
     }
 };
 
+// Register many users at once (data seeding); users that already exist are returned as they are
+const registerBulk = async (req, res, next) => {
+    try {
+        const { error, value } = userBulkCreateSchema.validate(req.body);
+        if (error) {
+            return next(new ApiError(400, error.details[0].message));
+        }
+
+        const { users } = value;
+        const userRepository = AppDataSource.getRepository(User);
+
+        const existing = await userRepository.find({
+            where: { email: In(users.map((user) => user.email)) },
+            select: { id: true, email: true, role: true }
+        });
+        const seen = new Set(existing.map((user) => user.email));
+        const newUsers = users.filter((user) => !seen.has(user.email) && seen.add(user.email));
+
+        // Seeded users share a few passwords, so hash each distinct password once rather than once per user
+        const hashes = new Map();
+        for (const password of new Set(newUsers.map((user) => user.password))) {
+            hashes.set(password, await bcrypt.hash(password, 10));
+        }
+
+        const created = userRepository.create(newUsers.map(({ name, email, password, role }) => ({
+            name,
+            email,
+            password: hashes.get(password),
+            role,
+        })));
+        await userRepository.save(created, { chunk: 1000 });
+
+        const data = [...existing, ...created].map(({ id, email, role }) => ({ id, email, role }));
+        (new ApiSuccess(201, 'Users registered successfully', data, {
+            requested: users.length,
+            created: created.length,
+            existing: existing.length
+        }, null)).send(res);
+    } catch (err) {
+        console.error('Bulk registration error:', err);
+        return next(new ApiError(500, 'Server error'));
+    }
+};
+
 const login = async (req, res, next) => {
     const { email, password } = req.body;
 
@@ -151,4 +196,4 @@ const getUserByEmail = async (req, res, next) => {
     }
 };
 
-module.exports = { register, login, getAllUsers, getUserById, getUserByEmail };
\ No newline at end of file
+module.exports = { register, registerBulk, login, getAllUsers, getUserById, getUserByEmail };
\ No newline at end of file
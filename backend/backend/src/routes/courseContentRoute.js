@@ -1,6 +1,7 @@
 const express = require('express');
 const { 
     addContent, 
+    addContentBulk,
     getContentByCourse 
 } = require('../controllers/CourseContentController');
 
@@ -12,6 +13,9 @@ const router = express.Router();
 // Add content to a course
 router.post('/', authMiddleware, roleMiddleware(['admin', 'instructor']), addContent);
 
+// Add many content items at once (data seeding)
+router.post('/bulk', authMiddleware, roleMiddleware(['admin', 'instructor']), addContentBulk);
+
 // Get all content for a course
 router.get('/:course_id', getContentByCourse);
 
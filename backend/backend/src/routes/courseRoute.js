@@ -1,6 +1,7 @@
 const express = require('express');
 const {
     createCourse,
+    createCoursesBulk,
     getAllCourses,
     getCourseById,
     updateCourse,
@@ -18,6 +19,9 @@ const router = express.Router();
 // Create a new course
 router.post('/', authMiddleware, roleMiddleware(['admin', 'instructor','student']), createCourse);
 
+// Create many courses at once (data seeding)
+router.post('/bulk', authMiddleware, roleMiddleware(['admin', 'instructor']), createCoursesBulk);
+
 router.get('/featured', authMiddleware, roleMiddleware(['admin', 'instructor','student']), getFeaturedCourses);
 
 
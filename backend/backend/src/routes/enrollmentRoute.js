@@ -1,6 +1,7 @@
 const express = require('express');
 const {
   enrollUser,
+  enrollUsersBulk,
   getEnrollmentsByUser,
   getEnrollmentsByCourse,
 } = require('../controllers/EnrollmentController');
@@ -13,6 +14,9 @@ const router = express.Router();
 // Enroll a user in a course
 router.post('/', authMiddleware, roleMiddleware(['admin', 'instructor','student']), enrollUser);
 
+// Enroll many users at once (data seeding)
+router.post('/bulk', authMiddleware, roleMiddleware(['admin']), enrollUsersBulk);
+
 // Get all enrollments for a user
 router.get('/user/:user_id',authMiddleware, roleMiddleware(['admin', 'instructor']),  getEnrollmentsByUser);
 
@@ -1,6 +1,7 @@
 const express = require('express');
 const { 
     sendNotification,
+    sendBulkNotifications,
     getNotificationsByUser 
 } = require('../controllers/NotificationController');
 const authMiddleware = require('../middleware/auth');
@@ -11,6 +12,9 @@ const router = express.Router();
 // Send a notification to a user
 router.post('/', authMiddleware, roleMiddleware(['admin', 'instructor']), sendNotification);
 
+// Send the same notification to several users
+router.post('/bulk', authMiddleware, roleMiddleware(['admin', 'instructor']), sendBulkNotifications);
+
 // Get all notifications for a user
 router.get('/:user_id', authMiddleware, roleMiddleware(['admin', 'instructor','student']), getNotificationsByUser);
 
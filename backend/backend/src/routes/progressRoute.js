@@ -1,6 +1,7 @@
 const express = require('express');
 const { 
     markContentCompleted, 
+    markContentCompletedBulk,
     getProgress,
     getCourseCompletionPercentage,
     getUserProgressOverTime
@@ -14,6 +15,9 @@ const router = express.Router();
 // Mark content as completed
 router.post('/', authMiddleware, roleMiddleware(['admin', 'instructor','student']), markContentCompleted);
 
+// Record many progress entries at once (data seeding)
+router.post('/bulk', authMiddleware, roleMiddleware(['admin']), markContentCompletedBulk);
+
 // Get progress for a user in a course
 router.get('/:user_id/:course_id',authMiddleware, roleMiddleware(['admin', 'instructor','student']), getProgress);
 
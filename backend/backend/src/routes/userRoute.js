@@ -1,6 +1,7 @@
 const express = require('express');
 const {
     register, 
+    registerBulk,
     login, 
     getAllUsers,
     getUserByEmail,
@@ -14,6 +15,9 @@ const router = express.Router();
 // Register route
 router.post('/register', register);
 
+// Register many users at once (data seeding)
+router.post('/bulk', authMiddleware, roleMiddleware(['admin']), registerBulk);
+
 // Login route
 router.post('/login', login);
 
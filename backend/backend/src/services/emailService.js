@@ -3,11 +3,16 @@ const dotenv = require('dotenv');
 
 dotenv.config();
 
-// Create a transporter
+// Emails sent at once; bulk sends queue behind this many SMTP connections
+const EMAIL_CONCURRENCY = parseInt(process.env.EMAIL_CONCURRENCY, 10) || 5;
+
+// Create a pooled transporter so connections are reused and capped
 const transporter = nodemailer.createTransport({
   host: process.env.EMAIL_HOST,
   port: process.env.EMAIL_PORT,
   secure: false, // true for 465, false for other ports
+  pool: true,
+  maxConnections: EMAIL_CONCURRENCY,
   auth: {
     user: process.env.EMAIL_USER,
     pass: process.env.EMAIL_PASSWORD,
@@ -32,4 +37,23 @@ const sendEmail = async (to, subject, text) => {
   }
 };
 
-module.exports = { sendEmail };
\ No newline at end of file
+// Send the same email to many recipients, at most EMAIL_CONCURRENCY at a time; returns the number that failed
+const sendEmails = async (recipients, subject, text) => {
+  let next = 0;
+  let failed = 0;
+  const worker = async () => {
+    while (next < recipients.length) {
+      const to = recipients[next++];
+      try {
+        await sendEmail(to, subject, text);
+      } catch (err) {
+        failed++;
+      }
+    }
+  };
+  const workers = Math.min(EMAIL_CONCURRENCY, recipients.length);
+  await Promise.all(Array.from({ length: workers }, worker));
+  return failed;
+};
+
+module.exports = { sendEmail, sendEmails };
\ No newline at end of file
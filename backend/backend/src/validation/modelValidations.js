@@ -15,6 +15,14 @@ const courseCreateSchema = Joi.object({
   })
 });
 
+const courseBulkCreateSchema = Joi.object({
+  courses: Joi.array().items(courseCreateSchema).min(1).max(5000).required().messages({
+    'any.required': 'Courses are required.',
+    'array.min': 'At least one course is required.',
+    'array.max': 'At most 5000 courses can be created at once.'
+  })
+});
+
 const courseUpdateSchema = Joi.object({
   title: Joi.string().max(255).optional().messages({
     'string.max': 'Title cannot exceed 255 characters.'
@@ -45,6 +53,14 @@ const courseContentCreateSchema = Joi.object({
   })
 });
 
+const courseContentBulkCreateSchema = Joi.object({
+  items: Joi.array().items(courseContentCreateSchema).min(1).max(5000).required().messages({
+    'any.required': 'Content items are required.',
+    'array.min': 'At least one content item is required.',
+    'array.max': 'At most 5000 content items can be created at once.'
+  })
+});
+
 const courseContentUpdateSchema = Joi.object({
   course_id: Joi.number().integer().optional().messages({
     'number.base': 'Course ID must be an integer.'
@@ -71,6 +87,14 @@ const enrollmentCreateSchema = Joi.object({
   })
 });
 
+const enrollmentBulkCreateSchema = Joi.object({
+  enrollments: Joi.array().items(enrollmentCreateSchema).min(1).max(5000).required().messages({
+    'any.required': 'Enrollments are required.',
+    'array.min': 'At least one enrollment is required.',
+    'array.max': 'At most 5000 enrollments can be created at once.'
+  })
+});
+
 const enrollmentUpdateSchema = Joi.object({
   user_id: Joi.number().integer().optional().messages({
     'number.base': 'User ID must be an integer.'
@@ -93,6 +117,19 @@ const notificationCreateSchema = Joi.object({
   is_read: Joi.boolean().optional()
 });
 
+const notificationBulkCreateSchema = Joi.object({
+  user_ids: Joi.array().items(Joi.number().integer()).min(1).max(10000).required().messages({
+    'any.required': 'User IDs are required.',
+    'array.base': 'User IDs must be an array of integers.',
+    'array.min': 'At least one user ID is required.',
+    'array.max': 'At most 10000 user IDs can be notified at once.'
+  }),
+  message: Joi.string().required().messages({
+    'any.required': 'Message is required.',
+    'string.empty': 'Message cannot be empty.'
+  })
+});
+
 const notificationUpdateSchema = Joi.object({
   user_id: Joi.number().integer().optional().messages({
     'number.base': 'User ID must be an integer.'
@@ -148,6 +185,28 @@ const userCreateSchema = Joi.object({
   })
 });
 
+const userBulkCreateSchema = Joi.object({
+  users: Joi.array().items(userCreateSchema).min(1).max(5000).required().messages({
+    'any.required': 'Users are required.',
+    'array.min': 'At least one user is required.',
+    'array.max': 'At most 5000 users can be registered at once.'
+  })
+});
+
+// Progress records as the progress table stores them (progressCreateSchema above mirrors notifications)
+const progressBulkCreateSchema = Joi.object({
+  records: Joi.array().items(Joi.object({
+    user_id: Joi.number().integer().required(),
+    course_id: Joi.number().integer().required(),
+    content_id: Joi.number().integer().required(),
+    time_spent: Joi.number().integer().min(0).optional()
+  })).min(1).max(5000).required().messages({
+    'any.required': 'Progress records are required.',
+    'array.min': 'At least one progress record is required.',
+    'array.max': 'At most 5000 progress records can be created at once.'
+  })
+});
+
 const userUpdateSchema = Joi.object({
   name: Joi.string().max(100).optional().messages({
     'string.max': 'Name cannot exceed 100 characters.'
@@ -167,15 +226,21 @@ const userUpdateSchema = Joi.object({
 
 module.exports = {
   courseCreateSchema,
+  courseBulkCreateSchema,
   courseUpdateSchema,
   courseContentCreateSchema,
+  courseContentBulkCreateSchema,
   courseContentUpdateSchema,
   enrollmentCreateSchema,
+  enrollmentBulkCreateSchema,
   enrollmentUpdateSchema,
   notificationCreateSchema,
+  notificationBulkCreateSchema,
   notificationUpdateSchema,
   progressCreateSchema,
+  progressBulkCreateSchema,
   progressUpdateSchema,
   userCreateSchema,
+  userBulkCreateSchema,
   userUpdateSchema
 };
\ No newline at end of file
@@ -0,0 +1,641 @@
+"""
+Asyncio execution engine for the E-Learning Platform Simulator
+Runs every simulated user as a coroutine on one event loop instead of one OS thread per user
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import aiohttp
+
+import catalog_cache
+import codec
+import credential_cache
+import fanout
+import http_pool
+import media
+import metrics
+import profiling
+import resilience
+import scenario
+import workload
+import world_model
+from users import Admin, BaseUser, Instructor, Student
+
+logger = logging.getLogger("elearning-simulator")
+
+
+class AsyncUserMixin:
+    """Coroutine versions of the BaseUser request and behavior methods"""
+
+    __slots__ = ()  # The concrete classes below add the "session" slot
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.session: aiohttp.ClientSession = None  # Set by AsyncEngine before the user is started
+
+    async def register(self) -> bool:
+        """Register user with the backend"""
+        user_data = {
+            "name": self.name,
+            "email": self.email,
+            "password": self.password,
+            "role": self.role
+        }
+
+        started = time.perf_counter()
+        try:
+            async with self.session.post(f"{self.api_url}/users/register", json=user_data) as response:
+                body = await response.read()
+            metrics.registry.record("post", "users/register", response.status, time.perf_counter() - started, self.role)
+
+            if response.status < 400:
+                try:
+                    self.user_data = json.loads(body).get("user")
+                    logger.info("Registered user: %s", self)
+                    return True
+                except ValueError:
+                    self.user_data = {"name": self.name, "email": self.email}
+                    logger.warning("User registration returned non-JSON response for %s", self)
+                    return True
+            else:
+                logger.warning("Failed to register user %s: %s", self, body.decode('utf-8', errors='replace'))
+                return False
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            metrics.registry.record("post", "users/register", 0, time.perf_counter() - started, self.role)
+            logger.error("Error registering user %s: %s", self, e)
+            return False
+
+    async def login(self) -> bool:
+        """Authenticate with the backend to get a token"""
+        login_data = {
+            "email": self.email,
+            "password": self.password
+        }
+
+        started = time.perf_counter()
+        try:
+            async with self.session.post(f"{self.api_url}/users/login", json=login_data) as response:
+                body = await response.read()
+            metrics.registry.record("post", "users/login", response.status, time.perf_counter() - started, self.role)
+
+            if response.status < 400:
+                try:
+                    self.set_token(json.loads(body).get("data"))
+                except ValueError:
+                    logger.warning("Login returned non-JSON response for %s", self)
+                    return False
+                if self.token:
+                    logger.info("User logged in: %s", self)
+                    return True
+                logger.warning("Login successful but no token received for %s", self)
+                return False
+            else:
+                logger.warning("Failed to login user %s: %s", self, body.decode('utf-8', errors='replace'))
+                return False
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            metrics.registry.record("post", "users/login", 0, time.perf_counter() - started, self.role)
+            logger.error("Error logging in user %s: %s", self, e)
+            return False
+
+    async def make_request(self, method: str, endpoint: str, data: Dict = None, parse: bool = True) -> Dict:
+        """Make an authenticated API request; parse=False skips decoding a body the caller does not read"""
+        if self.profile is None:
+            return await self._request(method, endpoint, data, parse)
+        # Part of a sampled action: time the request's phases, with aiohttp's trace hooks filling in its share
+        timer = profiling.RequestTimer()
+        try:
+            return await self._request(method, endpoint, data, parse, timer)
+        finally:
+            profiling.finish_request(self, timer, method, endpoint)
+
+    async def shared_request(self, method: str, endpoint: str, data: Dict = None) -> Dict:
+        """Coroutine version of BaseUser.shared_request"""
+        return await self._request(method, endpoint, data, parse=False, shared=True)
+
+    async def _request(self, method: str, endpoint: str, data: Dict = None, parse: bool = True,
+                       timer: profiling.RequestTimer = None, shared: bool = False) -> Dict:
+        if method.lower() not in ("get", "post", "put", "delete"):
+            logger.error("Unsupported HTTP method: %s", method)
+            return {"success": False, "status": "error", "error": "Unsupported HTTP method"}
+
+        if not shared:
+            await self.renew_expired_token()
+
+        url = f"{self.api_url}/{endpoint}"
+        workload.record(self, method, endpoint, data)
+        key = resilience.endpoint_key(method, endpoint)
+
+        # Open-loop actions are timed from their scheduled start, not from the actual send
+        started = time.perf_counter()
+        if not shared:
+            started = self.intended_start or started
+            self.intended_start = None
+        attempt = 0
+        while True:
+            if not resilience.allow(key):
+                # The endpoint's breaker is open: fail fast instead of adding load to a failing backend
+                return {"success": False, "status": "error", "error": f"Circuit open for {key}"}
+            if timer is not None:
+                timer.mark("prepare")
+            try:
+                status, content = await self._send(method, url, data, key, timer)
+                if status == 401 and not shared and self.token and await self.relogin():
+                    # Token rejected (e.g. the backend secret changed): retry once with the new one
+                    metrics.registry.record(method, endpoint, status, time.perf_counter() - started, self.role)
+                    started = time.perf_counter()
+                    status, content = await self._send(method, url, data, key, timer)
+                metrics.registry.record(method, endpoint, status, time.perf_counter() - started, self.role)
+
+                # Record activity timestamp
+                self.last_activity = time.time()
+
+            except resilience.Overloaded as e:
+                logger.warning("Request shed (%s %s): %s", method, endpoint, e)
+                return {"success": False, "status": "error", "error": str(e)}
+
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status = 0
+                error = e
+                if timer is not None:
+                    timer.mark("http")  # The failed exchange
+                metrics.registry.record(method, endpoint, 0, time.perf_counter() - started, self.role)
+
+            resilience.record(key, status)
+            if timer is not None:
+                timer.mark("record")
+            if resilience.should_retry(method, status, attempt):
+                attempt += 1
+                await asyncio.sleep(resilience.backoff(attempt))
+                if timer is not None:
+                    timer.mark("retry")
+                started = time.perf_counter()
+                continue
+
+            if status == 0:
+                logger.error("Request error (%s %s): %s", method, endpoint, error)
+                return {"success": False, "status": "error", "error": str(error) or type(error).__name__}
+            result = self._parse_response(status, content, parse)
+            if timer is not None:
+                timer.mark("decode")
+            if parse and method.lower() == "get":
+                # Learned from once a caller reads the body; a lazy body nobody reads stays undecoded
+                codec.when_decoded(result, lambda body: world_model.model.observe(endpoint, body, started))
+            return result
+
+    async def _send(self, method: str, url: str, data: Dict = None, key: str = None,
+                    timer: profiling.RequestTimer = None):
+        """Send one request on the shared session and return (status, body), holding an in-flight slot"""
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        body = codec.dumps(data) if method.lower() in ("post", "put") else None
+        options = {}
+        if key and resilience.has_timeout(key):
+            # The endpoint's own timeout overrides the session-wide one
+            options["timeout"] = aiohttp.ClientTimeout(total=resilience.timeout(key))
+        if timer is not None:
+            options["trace_request_ctx"] = timer
+
+        async with resilience.async_slot() as outcome:
+            if timer is not None:
+                timer.mark("queue")
+            async with self.session.request(method.upper(), url, data=body, headers=headers,
+                                            **options) as response:
+                if timer is not None:
+                    timer.mark("http")
+                body = await response.read()
+                if timer is not None:
+                    timer.mark("transfer")
+            if outcome is not None:
+                outcome["status"] = response.status
+            return response.status, body
+
+    async def cached_get(self, endpoint: str) -> Dict:
+        """GET a catalog endpoint through the shared catalog cache when it is enabled"""
+        result = catalog_cache.lookup(endpoint)
+        if result is None:
+            result = await self.make_request("get", endpoint)
+            catalog_cache.store(endpoint, result)
+        return result
+
+    async def renew_expired_token(self):
+        if credential_cache.token_expired(self.token_expires_at):
+            await self.relogin()
+
+    async def relogin(self) -> bool:
+        """Get a fresh token after expiry or a 401 and update the credential cache"""
+        logger.info("Renewing token for %s", self)
+        if await self.login():
+            credential_cache.remember(self)
+            return True
+        return False
+
+    async def behave(self, min_delay: int, max_delay: int):
+        """Base behavior loop for all users"""
+        logger.info("Starting behavior simulation for %s", self)
+        if self.id is None:
+            try:
+                await self.set_user_id()
+            except Exception as e:
+                logger.error("Error looking up user id for %s: %s", self, e)
+        while self.active:
+            try:
+                # Perform the next step of the role's scenario
+                await self.perform_action()
+
+                # Think time before the next action
+                delay = scenario.think_time(self.role, self.rng, bool(self.pending_steps))
+                slept = time.perf_counter()
+                await asyncio.sleep(delay)
+                profiling.record_sleep(delay, time.perf_counter() - slept)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Error in behavior simulation for %s: %s", self, e)
+                await asyncio.sleep(max_delay)  # Wait a bit longer after an error
+
+    async def set_user_id(self):
+        user = await self.make_request("get", f"users/email?email={self.email}")
+        self.id = user['data'].get('id')
+
+    async def perform_action(self):
+        """Perform the next step of the role's scenario"""
+        action = profiling.start_action(self)
+        await self.next_action()()
+        if action is not None:
+            profiling.finish_action(self, action)
+
+
+class AsyncStudent(AsyncUserMixin, Student):
+    """Student whose actions run as coroutines"""
+
+    __slots__ = ("session",)
+
+    async def browse_courses(self):
+        """Browse available courses, maybe enroll in one"""
+        logger.info("Student %s is browsing courses", self)
+        courses = (await self.cached_get("courses")).get("data") or []
+
+        # Maybe enroll in a course
+        if self.rng.random() < 0.3 and courses:
+            # Any listed or otherwise known course the student is not enrolled in yet
+            course_id = world_model.model.unenrolled_course(self.id, self.rng)
+            if course_id is not None:
+                await self.enroll_in_course(course_id, self.id)
+
+    async def enroll_in_course(self, course_id, user_id):
+        """Enroll in a specific course"""
+        enrollment_data = {
+            "course_id": course_id,
+            "user_id": user_id
+        }
+        logger.info("Student %s is enrolling in course %s", self.id, course_id)
+        result = await self.make_request("post", "enrollments", enrollment_data)
+
+        if "success" not in result.get("status"):
+            if "already enrolled" in (result.get("details") or ""):
+                world_model.model.enroll(user_id, course_id, created=False)
+            return
+
+        enrollment = result.get("data", [])
+
+        if not enrollment:
+            return
+
+        if "course_id" in enrollment:
+            world_model.model.enroll(user_id, course_id)
+            logger.info("Student %s enrolled in course %s", self, course_id)
+        else:
+            logger.warning("Failed to enroll student %s in course %s", self, course_id)
+
+    async def view_enrolled_course(self):
+        """View details of an enrolled course"""
+        course_id = world_model.model.enrolled_course(self.id, self.rng)
+        if course_id is None:
+            # If not enrolled in any courses, browse instead
+            await self.browse_courses()
+            return
+
+        logger.info("Student %s is viewing course %s", self, course_id)
+        await self.make_request("get", f"courses/{course_id}", parse=False)
+
+        # Also view the course contents
+        await self.make_request("get", f"course-content/{course_id}", parse=False)
+
+    async def make_progress(self):
+        """Make progress in an enrolled course"""
+        logger.info("Student %s makes progress", self)
+        course_id = world_model.model.enrolled_course(self.id, self.rng)
+        if course_id is None:
+            # If not enrolled in any courses, browse instead
+            await self.browse_courses()
+            return
+
+        # Choose a random content item, fetching the course contents unless the model knows them
+        content = world_model.model.content_item(course_id, self.rng) if world_model.skip_lookups() else None
+        if content is None:
+            result = await self.cached_get(f"course-content/{course_id}")
+            if "success" not in result.get("status"):
+                return
+
+            contents = result.get("data", [])
+            if not contents:
+                return
+            content = world_model.to_content_item(self.rng.choice(contents))
+
+        if media.wanted(self.rng):
+            await self.consume_media(content)
+        progress_data = {
+            "user_id": self.id,
+            "course_id": course_id,
+            "content_id": content.id
+        }
+
+        logger.info("Student %s is making progress in course %s", self, course_id)
+        await self.make_request("post", "progress", progress_data, parse=False)
+
+    async def consume_media(self, content: world_model.ContentItem):
+        """Watch or read a content item's media before recording progress on it"""
+        url = media.content_url(content.url)
+        if url is None:
+            return
+        logger.info("Student %s is streaming %s", self, url)
+        started = time.perf_counter()
+        await media.fetch_async(self.session, content.type, url, lambda: self.active)
+        profiling.add_media(self, time.perf_counter() - started)
+
+    async def check_notifications(self):
+        """Check for notifications"""
+        logger.info("Student %s is checking notifications", self)
+        await self.make_request("get", f"notifications/{self.id}", parse=False)
+
+
+class AsyncInstructor(AsyncUserMixin, Instructor):
+    """Instructor whose actions run as coroutines"""
+
+    __slots__ = ("session",)
+
+    async def create_course(self):
+        """Create a new course"""
+        course_data = self.new_course_data()
+
+        logger.info("Instructor %s is creating a new course", self)
+        result = await self.make_request("post", "courses", course_data)
+
+        if "success" not in result.get("status"):
+            return
+
+        data = result.get("data", [])
+        if result and data.get("id") is not None:
+            course_id = data.get("id")
+            world_model.model.add_course(data, self.id, created=True)
+            catalog_cache.invalidate("courses")
+            logger.info("Instructor %s created course %s", self, course_id)
+
+            # Add initial content to the course
+            for i in range(3):  # Add 3 initial content items
+                await self.add_content_to_course(course_id, i + 1)
+        else:
+            logger.warning("Failed to create course for instructor %s", self)
+
+    async def add_content_to_course(self, course_id, order):
+        """Add content to a specific course"""
+        content_item = self.new_content_item(course_id, order)
+
+        logger.info("Instructor %s is adding content to course %s", self, course_id)
+        result = await self.make_request("post", f"course-content/", content_item)
+        if result.get("status") == "success" and result.get("data"):
+            world_model.model.add_content(course_id, result["data"])
+        catalog_cache.invalidate(f"course-content/{course_id}")
+
+    async def check_enrollments(self):
+        """Check enrollments for a course"""
+        course_id = world_model.model.own_course(self.id, self.rng)
+        if course_id is None:
+            await self.create_course()
+            return
+        logger.info("Instructor %s is checking enrollments for course %s", self, course_id)
+        await self.make_request("get", f"enrollments/course/{course_id}", parse=False)
+
+    async def add_content(self):
+        """Add new content to an existing course"""
+        course_id = world_model.model.own_course(self.id, self.rng)
+        if course_id is None:
+            await self.create_course()
+            return
+
+        next_order = world_model.model.next_order(course_id) if world_model.skip_lookups() else None
+        if next_order is None:
+            # Get current content to determine next order
+            result = await self.cached_get(f"course-content/{course_id}")
+
+            if "success" not in result.get("status"):
+                return
+
+            contents = result.get("data", [])
+            next_order = len(contents) + 1
+
+        await self.add_content_to_course(course_id, next_order)
+
+    async def update_course(self):
+        """Update course details"""
+        course_id = world_model.model.own_course(self.id, self.rng)
+        if course_id is None:
+            await self.create_course()
+            return
+
+        # Get current course details
+        result = await self.cached_get(f"courses/{course_id}")
+        if "success" not in result.get("status"):
+            return
+
+        course = result['data']
+        if "id" in course:
+            return
+
+        update_data = {
+            "title": course.get("title", f"Course {course_id}"),  # Keep same title
+            "description": course.get("description", "") + f" Updated on {datetime.now().strftime('%Y-%m-%d')}."
+        }
+
+        logger.info("Instructor %s is updating course %s", self, course_id)
+        await self.make_request("put", f"courses/{course_id}", update_data, parse=False)
+        catalog_cache.invalidate(f"courses/{course_id}", "courses")
+
+    async def send_notification(self):
+        """Send notification to students in a course"""
+        course_id = world_model.model.own_course(self.id, self.rng)
+        if course_id is None:
+            await self.create_course()
+            return
+
+        course_title = world_model.model.title(course_id) if world_model.skip_lookups() else None
+        if course_title is None:
+            # Get course details for title
+            result = await self.make_request("get", f"courses/{course_id}")
+            if "success" not in result.get("status"):
+                return
+
+            course = result.get("data", {})
+            course_title = course.get("title", f"Course {course_id}")
+
+        # Get enrollments to find students
+        enrollments_result = await self.make_request("get", f"enrollments/course/{course_id}")
+
+        if "success" not in enrollments_result.get("status"):
+            return
+
+        enrollments = enrollments_result.get('data', [])
+        if not enrollments:
+            return
+
+        message = self.notification_message(course_title)
+
+        # Send notification to each enrolled student
+        user_ids = [enrollment.get("user_id") for enrollment in enrollments]
+        await fanout.send_notifications_async(self, course_id, user_ids, message)
+
+
+class AsyncAdmin(AsyncUserMixin, Admin):
+    """Admin whose actions run as coroutines"""
+
+    __slots__ = ("session",)
+
+    async def view_all_users(self):
+        """View list of all users"""
+        logger.info("Admin %s is viewing all users", self)
+        await self.make_request("get", "users", parse=False)
+
+    async def view_all_courses(self):
+        """View list of all courses"""
+        logger.info("Admin %s is viewing all courses", self)
+        await self.make_request("get", "courses", parse=False)
+
+    async def check_course_metrics(self):
+        """Check metrics for a specific course"""
+        # First get all courses
+        courses_result = await self.cached_get("courses")
+        if not courses_result.get("success", False):
+            return
+
+        courses = courses_result
+        if not courses:
+            return
+
+
+class AsyncEngine:
+    """Owns the event loop, the shared HTTP session and one task per simulated user"""
+
+    def __init__(self):
+        self.loop = None
+        self.session = None
+        self.tasks = set()
+        self.thread = None
+
+    def start(self):
+        """Start the event loop in a background thread"""
+        ready = threading.Event()
+
+        def run_loop():
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+            ready.set()
+            self.loop.run_forever()
+
+        self.thread = threading.Thread(target=run_loop, daemon=True, name="async-engine")
+        self.thread.start()
+        ready.wait()
+        self.run(self._open_session())
+
+    def run(self, coro):
+        """Run a coroutine on the engine loop and wait for its result"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    async def _open_session(self):
+        self.session = http_pool.create_async_session()
+
+    def attach(self, users: List[BaseUser]):
+        """Give users the shared session"""
+        for user in users:
+            user.session = self.session
+
+    def setup_users(self, users: List[BaseUser], bootstrap_config: Dict = None) -> Dict:
+        """Register, login and identify all users on the engine loop"""
+        from bootstrap import bootstrap_users_async
+
+        self.attach(users)
+        return self.run(bootstrap_users_async(users, bootstrap_config))
+
+    def start_users(self, users: List[BaseUser], min_delay: int, max_delay: int):
+        """Schedule one behavior task per user"""
+        self.attach(users)
+        self.run(self._start_users(users, min_delay, max_delay))
+
+    async def _start_users(self, users: List[BaseUser], min_delay: int, max_delay: int):
+        for user in users:
+            self.tasks.add(asyncio.ensure_future(user.behave(min_delay, max_delay)))
+
+    def start_user(self, user: BaseUser, min_delay: int, max_delay: int) -> asyncio.Task:
+        """Schedule one user's behavior task, e.g. as a load profile ramps up; returns the task"""
+        self.attach([user])
+        return self.run(self._start_user(user, min_delay, max_delay))
+
+    async def _start_user(self, user: BaseUser, min_delay: int, max_delay: int) -> asyncio.Task:
+        task = asyncio.ensure_future(user.behave(min_delay, max_delay))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    def cancel(self, task: asyncio.Task):
+        """Cancel a task from outside the engine loop"""
+        self.loop.call_soon_threadsafe(task.cancel)
+
+    def start_open_loop(self, users: List[BaseUser], schedule, max_backlog: int):
+        """Drive users from an arrival schedule instead of their own behavior loops"""
+        from scheduler import AsyncOpenLoopRunner
+
+        self.attach(users)
+        runner = AsyncOpenLoopRunner(users, schedule, max_backlog=max_backlog)
+        self.run(self._start_task(runner.run()))
+        return runner
+
+    def start_replay(self, users: List[BaseUser], pattern: str, speed: float):
+        """Re-issue a recorded action log instead of running user behaviors"""
+        from workload import AsyncReplayer
+
+        self.attach(users)
+        replayer = AsyncReplayer(pattern, users, speed)
+        self.run(self._start_task(replayer.run()))
+        return replayer
+
+    async def _start_task(self, coro):
+        self.tasks.add(asyncio.ensure_future(coro))
+
+    def stop(self, timeout: float = 5):
+        """Cancel all user tasks, close the session and stop the loop"""
+        if self.loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(timeout=timeout)
+        except Exception as e:
+            logger.warning("Async engine did not shut down cleanly: %s", e)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=timeout)
+
+    async def _shutdown(self):
+        tasks = list(self.tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.tasks = set()
+        if self.session is not None:
+            await self.session.close()
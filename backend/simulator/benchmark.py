@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the E-Learning Platform Simulator
+Drives the simulator against the in-process mock backend and measures how much load it can generate:
+throughput, CPU per request, memory per user and scheduling accuracy per execution mode
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+import yaml
+
+import codec
+import metrics
+from metrics import LatencyHistogram
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; peak RSS is then not reported
+    resource = None
+
+logger = logging.getLogger("elearning-simulator")
+
+RESULTS_VERSION = 1
+
+# Execution modes: (engine, scheduler mode)
+MODES = {
+    "threaded": ("threaded", "closed"),
+    "async": ("async", "closed"),
+    "threaded-open": ("threaded", "open"),
+    "async-open": ("async", "open")
+}
+
+# Share of each role in benchmark populations
+POPULATION_MIX = {"admin": 0.002, "instructor": 0.048, "student": 0.95}
+
+
+class TimerProbe:
+    """Measures how late a periodic sleep wakes up, i.e. how accurately the engine can schedule work"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.lag = LatencyHistogram()  # Microseconds of oversleep
+        self.active = False
+
+    def _record(self, due: float):
+        self.lag.record(max(0, int((time.perf_counter() - due) * 1_000_000)))
+
+    def run_thread(self):
+        self.active = True
+        while self.active:
+            due = time.perf_counter() + self.interval
+            time.sleep(self.interval)
+            self._record(due)
+
+    async def run_async(self):
+        self.active = True
+        while self.active:
+            due = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            self._record(due)
+
+    def stop(self):
+        self.active = False
+
+
+def _peak_rss_mb() -> float:
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def case_config(base: Dict[str, Any], case: Dict[str, Any], api_url: str) -> Dict[str, Any]:
+    """Simulator config for one benchmark case"""
+    engine, mode = MODES[case["mode"]]
+    config = dict(base)
+    config.update({
+        "api_url": api_url,
+        "engine": engine,
+        "shards": 1,
+        "min_delay": case["min_delay"],
+        "max_delay": case["max_delay"],
+        "credential_cache": {"enabled": False},
+        "logging": {**(base.get("logging") or {}), "level": case["log_level"]},
+        "workload": {},
+        "scenario": {**(base.get("scenario") or {}),
+                     "population": {"total": case["users"], "mix": POPULATION_MIX}, "bursts": []},
+        "scheduler": {**(base.get("scheduler") or {}), "mode": mode, "schedule": "constant",
+                      "rate": case["rate"], "poisson": True}
+    })
+    return config
+
+
+def run_case(base: Dict[str, Any], case: Dict[str, Any], api_url: str, results):
+    """Run one benchmark case; executed in a fresh process so CPU and memory readings are its own"""
+    from main import ELearningSimulator
+
+    simulator = ELearningSimulator(config=case_config(base, case, api_url))
+    simulator.report_summary = False
+
+    simulator._user_classes()  # Import the engine's user module first so it is not counted as user memory
+    tracemalloc.start()
+    simulator.create_users()
+    user_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    simulator.setup_users()
+    bootstrap_seconds = time.perf_counter() - started
+
+    simulator.start_simulation()
+    probe = TimerProbe()
+    if simulator.async_engine is not None:
+        asyncio.run_coroutine_threadsafe(probe.run_async(), simulator.async_engine.loop)
+    else:
+        threading.Thread(target=probe.run_thread, daemon=True, name="timer-probe").start()
+
+    time.sleep(case["warmup"])
+    metrics.registry.reset()
+    codec.stats.reset()
+    probe.lag = LatencyHistogram()
+    cpu_started = time.process_time()
+    wall_started = time.perf_counter()
+    time.sleep(case["duration"])
+    snapshot = metrics.registry.snapshot()
+    cpu_seconds = time.process_time() - cpu_started
+    wall_seconds = time.perf_counter() - wall_started
+    probe.stop()
+    scheduler_stats = simulator.open_loop.stats() if simulator.open_loop is not None else None
+    simulator.stop_simulation()
+
+    latency, errors = metrics.overall(snapshot)
+    users = len(simulator.population)
+    result = {
+        **case,
+        "users": users,
+        "requests": latency.count,
+        "requests_per_second": latency.count / wall_seconds,
+        "error_rate": errors / latency.count if latency.count else 0.0,
+        "latency_ms": {"p50": latency.percentile(0.50) / 1000, "p99": latency.percentile(0.99) / 1000},
+        "cpu_seconds": cpu_seconds,
+        "cpu_utilization": cpu_seconds / wall_seconds,
+        "cpu_us_per_request": cpu_seconds * 1_000_000 / latency.count if latency.count else None,
+        "memory_bytes_per_user": user_bytes / users if users else None,
+        "peak_rss_mb": _peak_rss_mb(),
+        "bootstrap_users_per_second": users / bootstrap_seconds if bootstrap_seconds > 0 else None,
+        "timer_lag_ms": {
+            "p50": probe.lag.percentile(0.50) / 1000,
+            "p99": probe.lag.percentile(0.99) / 1000,
+            "max": probe.lag.max / 1000
+        }
+    }
+    if scheduler_stats is not None:
+        result["open_loop"] = {
+            "target_rate": case["rate"],
+            "achieved_ratio": scheduler_stats["issued"] / wall_seconds / case["rate"] if case["rate"] else None,
+            "dropped": scheduler_stats["dropped"],
+            "start_lag_p50_ms": scheduler_stats["lag_p50"],
+            "start_lag_p99_ms": scheduler_stats["lag_p99"]
+        }
+    results.put(result)
+
+
+def _run_isolated(context, target, args, timeout: float):
+    results = context.Queue()
+    process = context.Process(target=target, args=(*args, results), daemon=True)
+    process.start()
+    try:
+        return results.get(timeout=timeout)
+    finally:
+        process.join(timeout=10)
+        if process.is_alive():
+            process.terminate()
+
+
+def run_suite(args) -> Dict[str, Any]:
+    import mock_backend
+
+    try:
+        with open(args.config, "r") as file:
+            base = yaml.safe_load(file)
+    except OSError:
+        base = {}
+    base.setdefault("user_passwords", {"admin": "admin123", "instructor": "instructor123", "student": "student123"})
+    base.setdefault("course_topics", ["Web Development", "Data Science", "Machine Learning"])
+    base.setdefault("content_types", ["video", "pdf", "quiz"])
+
+    # The mock runs in its own process so its CPU time is not charged to the simulator
+    context = multiprocessing.get_context("spawn")
+    ready = context.Queue()
+    stop_mock = context.Event()
+    mock = context.Process(target=mock_backend.serve, args=(0, args.latency, args.jitter, ready, stop_mock),
+                           daemon=True, name="mock-backend")
+    mock.start()
+    api_url = ready.get(timeout=30)
+    logger.info("Mock backend at %s (%sms +/- %sms)", api_url, args.latency, args.jitter)
+
+    cases = []
+    try:
+        for mode in args.modes:
+            for users in args.users:
+                case = {
+                    "name": f"{mode}-{users}",
+                    "mode": mode,
+                    "users": users,
+                    "duration": args.duration,
+                    "warmup": args.warmup,
+                    "min_delay": args.min_delay,
+                    "max_delay": args.max_delay,
+                    # Open modes target the rate the closed-loop think time would give with an instant backend
+                    "rate": args.rate or users * 2 / (args.min_delay + args.max_delay),
+                    "log_level": args.log_level
+                }
+                logger.info("Running %s for %ss...", case["name"], args.duration)
+                result = _run_isolated(context, run_case, (base, case, api_url),
+                                       timeout=args.warmup + args.duration + 600)
+                logger.info("%s: %.0f req/s, %.0fus CPU/request, %.0f B/user, timer lag p99 %.1fms",
+                            case["name"], result["requests_per_second"], result["cpu_us_per_request"] or 0,
+                            result["memory_bytes_per_user"] or 0, result["timer_lag_ms"]["p99"])
+                cases.append(result)
+    finally:
+        stop_mock.set()
+        mock.join(timeout=10)
+
+    return {
+        "version": RESULTS_VERSION,
+        "created": time.time(),
+        "host": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count()
+        },
+        "mock": {"latency_ms": args.latency, "jitter_ms": args.jitter},
+        "cases": cases
+    }
+
+
+def format_results(results: Dict[str, Any]) -> List[str]:
+    lines = [
+        f"{'case':<22} {'users':>7} {'req/s':>9} {'err':>6} {'CPU/req':>9} {'CPU':>6} {'B/user':>8} "
+        f"{'lag p99':>9} {'p99':>9}"
+    ]
+    for case in results["cases"]:
+        lines.append(
+            f"{case['name']:<22} {case['users']:>7} {case['requests_per_second']:>9.1f} {case['error_rate']:>6.1%} "
+            f"{case['cpu_us_per_request'] or 0:>7.0f}us {case['cpu_utilization']:>6.0%} "
+            f"{case['memory_bytes_per_user'] or 0:>8.0f} {case['timer_lag_ms']['p99']:>7.1f}ms "
+            f"{case['latency_ms']['p99']:>7.1f}ms")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the simulator against a local mock backend")
+    parser.add_argument("--config", default="config.yaml", help="Base simulator config")
+    parser.add_argument("--modes", default="threaded,async,threaded-open,async-open",
+                        type=lambda value: [mode for mode in value.split(",") if mode])
+    parser.add_argument("--users", default="100,1000", type=lambda value: [int(n) for n in value.split(",") if n])
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds per case")
+    parser.add_argument("--warmup", type=float, default=5, help="Unmeasured seconds before each case")
+    parser.add_argument("--latency", type=float, default=20, help="Mock backend latency in ms")
+    parser.add_argument("--jitter", type=float, default=5, help="Mock backend latency jitter in ms")
+    parser.add_argument("--min-delay", type=float, default=0.5, help="Minimum think time in seconds")
+    parser.add_argument("--max-delay", type=float, default=1.5, help="Maximum think time in seconds")
+    parser.add_argument("--rate", type=float, default=None, help="Open-loop actions/s (default: users / mean think time)")
+    parser.add_argument("--log-level", default="WARNING", help="Simulator log level during cases")
+    parser.add_argument("--output", default="benchmark-results.json", help="Results file")
+    args = parser.parse_args()
+
+    unknown = [mode for mode in args.modes if mode not in MODES]
+    if unknown:
+        parser.error(f"Unknown modes: {', '.join(unknown)} (expected {', '.join(MODES)})")
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.StreamHandler(sys.stdout)])
+    results = run_suite(args)
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+    for line in format_results(results):
+        logger.info(line)
+    logger.info("Results written to %s", args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
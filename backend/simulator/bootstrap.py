@@ -0,0 +1,149 @@
+"""
+Concurrent user bootstrap for the E-Learning Platform Simulator
+Registers, logs in and looks up the id of every simulated user with bounded concurrency and retries
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, List
+
+import credential_cache
+
+if TYPE_CHECKING:
+    import asyncio
+
+logger = logging.getLogger("elearning-simulator")
+
+# Defaults for the "bootstrap" section of config.yaml
+DEFAULT_BOOTSTRAP_CONFIG = {
+    "concurrency": 50,   # Users bootstrapped at the same time
+    "retries": 3,        # Attempts per user before giving up
+    "backoff_max": 10    # Upper bound in seconds of the jittered exponential backoff
+}
+
+
+class BootstrapError(Exception):
+    """A user could not be logged in or identified"""
+
+
+def _retrying_kwargs(config: Dict[str, Any]) -> Dict[str, Any]:
+    # tenacity imports asyncio, so it is loaded when users are bootstrapped rather than at startup
+    from tenacity import retry_if_exception_type, stop_after_attempt, wait_random_exponential
+
+    return {
+        "retry": retry_if_exception_type(BootstrapError),
+        "stop": stop_after_attempt(config["retries"]),
+        "wait": wait_random_exponential(multiplier=0.5, max=config["backoff_max"]),
+        "reraise": True
+    }
+
+
+def _check_identified(user):
+    if user.id is None:
+        raise BootstrapError(f"No user id returned for {user}")
+
+
+def bootstrap_user(user, config: Dict[str, Any]):
+    """Register, login and look up the id of one user, retrying transient failures"""
+    from tenacity import Retrying
+
+    registered = False
+    for attempt in Retrying(**_retrying_kwargs(config)):
+        with attempt:
+            # A failed registration usually means the account already exists; login decides
+            if not registered:
+                registered = user.register()
+            if not user.login():
+                raise BootstrapError(f"Login failed for {user}")
+            try:
+                user.set_user_id()
+            except (KeyError, TypeError, AttributeError) as e:
+                raise BootstrapError(f"User id lookup failed for {user}: {e}")
+            _check_identified(user)
+    credential_cache.remember(user)
+
+
+async def bootstrap_user_async(user, config: Dict[str, Any], semaphore: "asyncio.Semaphore"):
+    """Coroutine version of bootstrap_user for the async engine"""
+    from tenacity import AsyncRetrying
+
+    async with semaphore:
+        registered = False
+        async for attempt in AsyncRetrying(**_retrying_kwargs(config)):
+            with attempt:
+                if not registered:
+                    registered = await user.register()
+                if not await user.login():
+                    raise BootstrapError(f"Login failed for {user}")
+                try:
+                    await user.set_user_id()
+                except (KeyError, TypeError, AttributeError) as e:
+                    raise BootstrapError(f"User id lookup failed for {user}: {e}")
+                _check_identified(user)
+    credential_cache.remember(user)
+
+
+def _report(users: List, failures: List, started: float) -> Dict[str, Any]:
+    elapsed = time.perf_counter() - started
+    report = {
+        "users": len(users),
+        "succeeded": len(users) - len(failures),
+        "failed": len(failures),
+        "seconds": elapsed,
+        "users_per_second": len(users) / elapsed if elapsed > 0 else 0.0
+    }
+    logger.info("Bootstrapped %d/%d users in %.1fs (%.1f users/s), %d failed", report["succeeded"],
+                report["users"], elapsed, report["users_per_second"], report["failed"])
+    for user, error in failures[:10]:
+        logger.warning("Bootstrap failed for %s: %s", user, error)
+    if len(failures) > 10:
+        logger.warning("... and %d more bootstrap failures", len(failures) - 10)
+    return report
+
+
+def bootstrap_users(users: List, config: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Bootstrap users on a bounded thread pool and report throughput and failures"""
+    config = {**DEFAULT_BOOTSTRAP_CONFIG, **(config or {})}
+    logger.info("Bootstrapping %d users with concurrency %d...", len(users), config["concurrency"])
+    started = time.perf_counter()
+    failures = []
+    # Known accounts skip the backend entirely; an expired token is renewed on first request
+    restored = sum(1 for user in users if credential_cache.restore(user))
+    pending = [user for user in users if user.id is None or not user.token]
+    if restored:
+        logger.info("Restored %d users from the credential cache", restored)
+
+    with ThreadPoolExecutor(max_workers=max(1, config["concurrency"]), thread_name_prefix="bootstrap") as pool:
+        futures = {pool.submit(bootstrap_user, user, config): user for user in pending}
+        for future, user in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                failures.append((user, e))
+
+    credential_cache.save()
+    return _report(users, failures, started)
+
+
+async def bootstrap_users_async(users: List, config: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Bootstrap users as coroutines with at most `concurrency` in flight"""
+    import asyncio
+
+    config = {**DEFAULT_BOOTSTRAP_CONFIG, **(config or {})}
+    logger.info("Bootstrapping %d users with concurrency %d...", len(users), config["concurrency"])
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(max(1, config["concurrency"]))
+    # Known accounts skip the backend entirely; an expired token is renewed on first request
+    restored = sum(1 for user in users if credential_cache.restore(user))
+    pending = [user for user in users if user.id is None or not user.token]
+    if restored:
+        logger.info("Restored %d users from the credential cache", restored)
+
+    results = await asyncio.gather(
+        *(bootstrap_user_async(user, config, semaphore) for user in pending),
+        return_exceptions=True
+    )
+    failures = [(user, result) for user, result in zip(pending, results) if isinstance(result, Exception)]
+    credential_cache.save()
+    return _report(users, failures, started)
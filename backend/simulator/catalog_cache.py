@@ -0,0 +1,91 @@
+"""
+Shared catalog cache for the E-Learning Platform Simulator
+Lets simulated users behave like a caching client app for course and content lookups
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# Defaults for the "catalog_cache" section of config.yaml
+DEFAULT_CATALOG_CACHE_CONFIG = {
+    "enabled": False,    # False models a naive client that re-fetches every time
+    "ttl": 30,           # Seconds a cached response stays valid
+    "max_entries": 1000  # Least recently used entries are evicted beyond this
+}
+
+
+class CatalogCache:
+    """Thread-safe LRU cache of API responses with a per-entry time to live"""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # Endpoint -> (expires_at, result)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, endpoint: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(endpoint)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[endpoint]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(endpoint)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, endpoint: str, result: Dict[str, Any]):
+        with self._lock:
+            self._entries[endpoint] = (time.monotonic() + self.ttl, result)
+            self._entries.move_to_end(endpoint)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *endpoints: str):
+        with self._lock:
+            for endpoint in endpoints:
+                self._entries.pop(endpoint, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+_cache: Optional[CatalogCache] = None
+
+
+def configure(config: Dict[str, Any] = None):
+    """Apply the "catalog_cache" config section"""
+    global _cache
+    config = {**DEFAULT_CATALOG_CACHE_CONFIG, **(config or {})}
+    _cache = CatalogCache(config["ttl"], config["max_entries"]) if config["enabled"] else None
+
+
+def enabled() -> bool:
+    return _cache is not None
+
+
+def lookup(endpoint: str) -> Optional[Dict[str, Any]]:
+    """Cached result for an endpoint; callers must not modify it"""
+    return _cache.get(endpoint) if _cache is not None else None
+
+
+def store(endpoint: str, result: Dict[str, Any]):
+    """Cache a successful response"""
+    if _cache is not None and result.get("status") == "success":
+        _cache.put(endpoint, result)
+
+
+def invalidate(*endpoints: str):
+    """Drop entries made stale by a write"""
+    if _cache is not None:
+        _cache.invalidate(*endpoints)
+
+
+def stats() -> Optional[Dict[str, int]]:
+    return _cache.stats() if _cache is not None else None
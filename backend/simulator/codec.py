@@ -0,0 +1,227 @@
+"""
+JSON encoding and decoding for the E-Learning Platform Simulator
+Uses the fastest installed JSON library and decodes response bodies only when, and as far as, they are read
+"""
+
+import json
+import re
+import threading
+from collections.abc import Mapping
+from typing import Any, Callable, Dict
+
+try:
+    import orjson
+except ImportError:  # Optional; the fastest backend when installed
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # Optional
+    ujson = None
+
+# Defaults for the "codec" section of config.yaml
+DEFAULT_CODEC_CONFIG = {
+    "backend": "auto",  # auto | orjson | ujson | json
+    "lazy": True        # Decode a response body on first access beyond its "status" field
+}
+
+# The backend's envelope starts with its status, so it can be read without decoding the body
+_STATUS_PREFIX = re.compile(rb'\s*\{\s*"status"\s*:\s*"([^"\\]*)"')
+
+_config = dict(DEFAULT_CODEC_CONFIG)
+_loads = json.loads
+_dumps = None
+backend = "json"
+
+
+def _stdlib_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def _ujson_dumps(obj: Any) -> bytes:
+    return ujson.dumps(obj).encode()
+
+
+class CodecStats:
+    """Thread-safe counts of response bodies decoded, left undecoded and skipped, and their bytes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.received_bytes = 0
+            self.decoded = 0
+            self.decoded_bytes = 0
+            self.deferred = 0    # Lazy bodies not decoded (yet)
+            self.skipped = 0     # Bodies of requests made with parse=False
+            self.skipped_bytes = 0
+
+    def record(self, size: int, decoded: bool = False, deferred: bool = False):
+        with self._lock:
+            self.received_bytes += size
+            if decoded:
+                self.decoded += 1
+                self.decoded_bytes += size
+            elif deferred:
+                self.deferred += 1
+            else:
+                self.skipped += 1
+                self.skipped_bytes += size
+
+    def decoded_later(self, size: int):
+        with self._lock:
+            self.deferred -= 1
+            self.decoded += 1
+            self.decoded_bytes += size
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": backend,
+                "received_bytes": self.received_bytes,
+                "decoded": self.decoded,
+                "decoded_bytes": self.decoded_bytes,
+                "deferred": self.deferred,
+                "skipped": self.skipped,
+                "skipped_bytes": self.skipped_bytes
+            }
+
+
+stats = CodecStats()
+
+
+def configure(config: Dict[str, Any] = None):
+    """Apply the "codec" config section"""
+    global _config, _loads, _dumps, backend
+    _config = {**DEFAULT_CODEC_CONFIG, **(config or {})}
+    wanted = _config["backend"]
+    if wanted not in ("auto", "orjson", "ujson", "json"):
+        raise ValueError(f"Unknown JSON backend '{wanted}', expected auto, orjson, ujson or json")
+    if wanted in ("auto", "orjson") and orjson is not None:
+        backend, _loads, _dumps = "orjson", orjson.loads, orjson.dumps
+    elif wanted in ("auto", "ujson") and ujson is not None:
+        backend, _loads, _dumps = "ujson", ujson.loads, _ujson_dumps
+    else:
+        if wanted != "auto" and wanted != "json":
+            raise ValueError(f"JSON backend '{wanted}' is not installed")
+        backend, _loads, _dumps = "json", json.loads, _stdlib_dumps
+
+
+def loads(data: bytes) -> Any:
+    return _loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    """Compact JSON body for a request"""
+    return (_dumps or _stdlib_dumps)(obj)
+
+
+_decode_lock = threading.Lock()  # Held while a LazyResult decodes; decodes are one-off and hold the GIL anyway
+
+
+class LazyResult(Mapping):
+    """Read-only result dict whose JSON body is decoded on first access
+
+    `status` is read from the start of the body when the envelope begins with it, so the
+    common success check costs no decoding; any other key decodes the whole body once.
+    """
+
+    __slots__ = ("_content", "_decoded", "_status", "_on_decode")
+
+    def __init__(self, content: bytes):
+        self._content = content
+        self._decoded = None
+        self._status = None
+        self._on_decode = None  # Called with the body once it is decoded, see when_decoded
+
+    @property
+    def decoded(self) -> bool:
+        return self._decoded is not None
+
+    def _body(self) -> Dict[str, Any]:
+        body = self._decoded
+        if body is not None:
+            return body
+        with _decode_lock:  # Cached results can be read by several users at once; decode them once
+            if self._decoded is not None:
+                return self._decoded
+            content = self._content
+            try:
+                body = _loads(content)
+            except ValueError:
+                body = {"success": True, "raw": content.decode("utf-8", errors="replace")}
+            if not isinstance(body, dict):
+                body = {"success": True, "data": body}
+            self._decoded = body
+            self._content = None
+            callback, self._on_decode = self._on_decode, None
+        stats.decoded_later(len(content))
+        if callback is not None:
+            callback(body)
+        return body
+
+    def get(self, key, default=None):
+        content = self._content
+        if key == "status" and content is not None:
+            if self._status is None:
+                match = _STATUS_PREFIX.match(content)
+                if match is None:
+                    return self._body().get(key, default)
+                self._status = match.group(1).decode()
+            return self._status
+        return self._body().get(key, default)
+
+    def __getitem__(self, key):
+        if key == "status" and self._content is not None:
+            value = self.get(key)
+            if value is not None:
+                return value
+        return self._body()[key]
+
+    def __contains__(self, key) -> bool:
+        return key in self._body()
+
+    def __iter__(self):
+        return iter(self._body())
+
+    def __len__(self) -> int:
+        return len(self._body())
+
+    def __repr__(self) -> str:
+        return repr(self._body())
+
+
+def when_decoded(result, callback: Callable[[Dict[str, Any]], None]):
+    """Call callback with a result's body now if it is decoded, else when a reader first decodes it"""
+    if isinstance(result, LazyResult):
+        with _decode_lock:
+            if not result.decoded:
+                result._on_decode = callback
+                return
+    callback(result)
+
+
+def parse(content: bytes, lazy: bool = None):
+    """Result of a successful response body: a LazyResult, or the decoded dict when lazy parsing is off"""
+    if lazy is None:
+        lazy = _config["lazy"]
+    if lazy:
+        stats.record(len(content), deferred=True)
+        return LazyResult(content)
+    stats.record(len(content), decoded=True)
+    try:
+        return _loads(content)
+    except ValueError:
+        return {"success": True, "raw": content.decode("utf-8", errors="replace")}
+
+
+def skip(content: bytes, status_code: int) -> Dict[str, Any]:
+    """Result of a response whose body the caller does not read: only its size is counted"""
+    stats.record(len(content))
+    success = status_code < 400
+    return {"success": success, "status": "success" if success else "error", "bytes": len(content)}
+
+
+configure()
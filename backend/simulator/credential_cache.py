@@ -0,0 +1,146 @@
+"""
+Persistent credential cache for the E-Learning Platform Simulator
+Keeps user ids and JWTs on disk between runs so warm restarts skip registration and login
+"""
+
+import base64
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; shards then rely on the read-merge-write alone
+    fcntl = None
+
+logger = logging.getLogger("elearning-simulator")
+
+# Defaults for the "credential_cache" section of config.yaml
+DEFAULT_CREDENTIAL_CACHE_CONFIG = {
+    "enabled": True,
+    "path": ".credentials.json"
+}
+
+# Tokens this close to expiry (seconds) are renewed before the next request
+TOKEN_REFRESH_MARGIN = 30
+
+
+def token_expiry(token: str) -> Optional[float]:
+    """Expiry timestamp from a JWT's payload, or None if it has none or cannot be read"""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+def token_expired(expires_at: Optional[float]) -> bool:
+    return expires_at is not None and time.time() >= expires_at - TOKEN_REFRESH_MARGIN
+
+
+class CredentialCache:
+    """Thread-safe {api_url: {email: {id, token}}} store backed by a JSON file"""
+
+    def __init__(self, path: str, api_url: str):
+        self.path = path
+        self.api_url = api_url
+        self._lock = threading.Lock()
+        self._data = {}
+        self._updates = {}  # Entries changed since the last save
+
+    def _read(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, "r") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable credential cache %s: %s", self.path, e)
+            return {}
+
+    def load(self):
+        self._data = self._read()
+        logger.info("Loaded %d cached credentials from %s", len(self._data.get(self.api_url, {})), self.path)
+
+    def get(self, email: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._data.get(self.api_url, {}).get(email)
+
+    def put(self, email: str, user_id, token: str):
+        with self._lock:
+            entry = {"id": user_id, "token": token}
+            self._data.setdefault(self.api_url, {})[email] = entry
+            self._updates[email] = entry
+
+    @contextlib.contextmanager
+    def _file_lock(self):
+        """Serialize saves from several shard processes sharing one cache file"""
+        if fcntl is None:
+            yield
+            return
+        with open(f"{self.path}.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def save(self):
+        """Merge changed entries into the file on disk and replace it atomically"""
+        with self._lock:
+            if not self._updates:
+                return
+            updates = self._updates
+            self._updates = {}
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with self._file_lock():
+                data = self._read()
+                data.setdefault(self.api_url, {}).update(updates)
+                with open(tmp_path, "w") as file:
+                    json.dump(data, file)
+                os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning("Could not write credential cache %s: %s", self.path, e)
+
+
+_cache: Optional[CredentialCache] = None
+
+
+def configure(config: Dict[str, Any], api_url: str):
+    """Apply the "credential_cache" config section"""
+    global _cache
+    config = {**DEFAULT_CREDENTIAL_CACHE_CONFIG, **(config or {})}
+    if not config["enabled"]:
+        _cache = None
+        return
+    _cache = CredentialCache(config["path"], api_url)
+    _cache.load()
+
+
+def restore(user) -> bool:
+    """Give a user its cached id and token; an expired token is renewed on first use"""
+    if _cache is None:
+        return False
+    entry = _cache.get(user.email)
+    if not entry or entry.get("id") is None or not entry.get("token"):
+        return False
+    user.id = entry["id"]
+    user.set_token(entry["token"])
+    return True
+
+
+def remember(user):
+    """Store a user's current id and token"""
+    if _cache is not None and user.id is not None and user.token:
+        _cache.put(user.email, user.id, user.token)
+
+
+def save():
+    if _cache is not None:
+        _cache.save()
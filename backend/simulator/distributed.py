@@ -0,0 +1,302 @@
+"""
+Distributed mode for the E-Learning Platform Simulator
+A controller hands each agent (a simulator process on this or another machine) a disjoint slice of the
+user population and of the schedule, starts and stops them together and merges the metrics they stream
+back. Messages are newline-delimited JSON over TCP. Agents authenticate with a shared token, as the
+assignment carries the whole simulator config, user passwords included.
+"""
+
+import hmac
+import json
+import logging
+import os
+import secrets
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import metrics
+
+logger = logging.getLogger("elearning-simulator")
+
+PROTOCOL_VERSION = 1
+
+# Shared token when neither the config nor the command line sets one
+TOKEN_ENV = "SIMULATOR_AGENT_TOKEN"
+
+# Defaults for the "distributed" section of config.yaml
+DEFAULT_DISTRIBUTED_CONFIG = {
+    "host": "127.0.0.1",   # Address the controller listens on; 0.0.0.0 for agents on other machines
+    "port": 5557,
+    "token": None,         # Shared secret agents present; None reads SIMULATOR_AGENT_TOKEN, else one is generated
+    "agents": 2,           # Agents the controller waits for before assigning users
+    "join_timeout": 300,   # Seconds for the agents to connect, and then to register and log in their users
+    "start_delay": 2,      # Seconds between the start message and the common start
+    "report_interval": 2,  # Seconds between an agent's metric reports
+    "stop_timeout": 30     # Seconds to wait for the agents' final reports
+}
+
+
+class Connection:
+    """One end of a controller-agent connection; send may be called from several threads"""
+
+    def __init__(self, sock: socket.socket, peer: str):
+        self.sock = sock
+        self.peer = peer
+        self._reader = sock.makefile("rb")
+        self._send_lock = threading.Lock()
+
+    def send(self, message: Dict[str, Any]):
+        data = json.dumps(message, separators=(",", ":")).encode() + b"\n"
+        with self._send_lock:
+            self.sock.sendall(data)
+
+    def receive(self, timeout: float = None) -> Optional[Dict[str, Any]]:
+        """Next message; None once the peer closed the connection"""
+        self.sock.settimeout(timeout)
+        line = self._reader.readline()
+        return json.loads(line) if line else None
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._reader.close()
+        self.sock.close()
+
+
+def encode_stats(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """collect_stats() output in JSON-safe form; metric series keys are (method, endpoint, status) tuples"""
+    return {**stats, "metrics": {**stats["metrics"],
+                                 "series": [[*key, data] for key, data in stats["metrics"]["series"].items()]}}
+
+
+def decode_stats(stats: Dict[str, Any]) -> Dict[str, Any]:
+    series = {(method, endpoint, status): data for method, endpoint, status, data in stats["metrics"]["series"]}
+    return {**stats, "metrics": {**stats["metrics"], "series": series}}
+
+
+class AgentController:
+    """Controller side of distributed mode, used by the simulator in place of a sharding.ShardCoordinator"""
+
+    kind = "agent"
+
+    def __init__(self, config: Dict[str, Any], plans: List[Dict[str, Tuple[int, int]]], settings: Dict[str, Any]):
+        self.config = config  # Simulator config sent to every agent
+        self.plans = plans    # User index ranges, one per agent
+        self.settings = {**DEFAULT_DISTRIBUTED_CONFIG, **(settings or {})}
+        self.token = self.settings["token"] or os.environ.get(TOKEN_ENV)
+        if not self.token:
+            self.token = secrets.token_urlsafe(16)
+            logger.info("No agent token configured; start the agents with --token %s", self.token)
+        self.agents: List[Connection] = []
+        self.latest = {}  # Agent index -> last stats, with its metrics accumulated from the reported deltas
+        self.stopping = False
+        self._lock = threading.Lock()
+        self._readers = []
+
+    def prepare(self):
+        """Wait for the agents, assign their users and wait until all of them are set up"""
+        deadline = time.monotonic() + self.settings["join_timeout"]
+        try:
+            self._accept(deadline)
+            for index, (agent, plan) in enumerate(zip(self.agents, self.plans)):
+                agent.send({"type": "assign", "index": index, "agents": len(self.agents), "config": self.config,
+                            "user_ranges": plan, "report_interval": self.settings["report_interval"]})
+                logger.info("Assigned users %s to agent %d (%s)", plan, index, agent.peer)
+            for index, agent in enumerate(self.agents):
+                message = agent.receive(max(0.1, deadline - time.monotonic()))
+                if message is None or message.get("type") != "ready":
+                    raise RuntimeError(f"Agent {index} ({agent.peer}) failed while setting up its users: {message}")
+                logger.info("Agent %d ready: %s users set up", index, message.get("users"))
+        except (OSError, ValueError, RuntimeError):
+            self._close()
+            raise
+
+    def _accept(self, deadline: float):
+        server = socket.create_server((self.settings["host"], self.settings["port"]))
+        logger.info("Waiting for %d agents on %s:%s", len(self.plans), self.settings["host"], self.settings["port"])
+        try:
+            while len(self.agents) < len(self.plans):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise RuntimeError(f"Only {len(self.agents)} of {len(self.plans)} agents connected in time")
+                server.settimeout(remaining)
+                try:
+                    sock, address = server.accept()
+                except socket.timeout:
+                    continue
+                agent = Connection(sock, f"{address[0]}:{address[1]}")
+                try:
+                    hello = agent.receive(10)
+                except (OSError, ValueError):
+                    hello = None
+                if not hello or hello.get("type") != "hello" or hello.get("version") != PROTOCOL_VERSION:
+                    logger.warning("Rejected connection from %s: not a version %s agent", agent.peer, PROTOCOL_VERSION)
+                    agent.close()
+                    continue
+                if not hmac.compare_digest(str(hello.get("token") or "").encode(), self.token.encode()):
+                    logger.warning("Rejected connection from %s: wrong token", agent.peer)
+                    agent.close()
+                    continue
+                agent.peer = f"{hello.get('name')} pid {hello.get('pid')}, {agent.peer}"
+                self.agents.append(agent)
+                logger.info("Agent %d/%d connected: %s", len(self.agents), len(self.plans), agent.peer)
+        finally:
+            server.close()
+
+    def start(self):
+        """Start every agent at the same moment and collect their reports"""
+        start_delay = self.settings["start_delay"]
+        for agent in self.agents:
+            agent.send({"type": "start", "start_in": start_delay})
+        for index, agent in enumerate(self.agents):
+            reader = threading.Thread(target=self._read, args=(index, agent), daemon=True, name=f"agent-{index}")
+            reader.start()
+            self._readers.append(reader)
+        # Return at the common start, so the run's own timers line up with the agents'
+        time.sleep(start_delay)
+        logger.info("Started %d agents", len(self.agents))
+
+    def signal(self, signum: int):
+        """Signals stay local; an agent's sampling profiler is switched by signalling its own process"""
+
+    def _read(self, index: int, agent: Connection):
+        while True:
+            try:
+                message = agent.receive()
+            except (OSError, ValueError) as e:
+                message = None
+                if not self.stopping:
+                    logger.warning("Agent %d: %s", index, e)
+            if message is None:
+                if not self.stopping:
+                    logger.warning("Lost agent %d (%s); keeping its last report", index, agent.peer)
+                return
+            if message["type"] == "stats":
+                self._merge(index, decode_stats(message["stats"]))
+            elif message["type"] == "done":
+                return
+
+    def _merge(self, index: int, stats: Dict[str, Any]):
+        """Add a report's metric delta to the agent's running totals"""
+        with self._lock:
+            previous = self.latest.get(index)
+            if previous is not None:
+                stats["metrics"] = metrics.merge_snapshots([previous["metrics"], stats["metrics"]])
+            self.latest[index] = stats
+
+    def shard_stats(self) -> List[Dict[str, Any]]:
+        """Latest stats of every agent that has reported"""
+        with self._lock:
+            return list(self.latest.values())
+
+    def stop(self, timeout: float = None):
+        """Stop every agent and wait for its final report"""
+        self.stopping = True
+        for agent in self.agents:
+            try:
+                agent.send({"type": "stop"})
+            except OSError:
+                pass  # Already gone
+        deadline = time.monotonic() + (timeout if timeout is not None else self.settings["stop_timeout"])
+        for index, reader in enumerate(self._readers):
+            reader.join(max(0.0, deadline - time.monotonic()))
+            if reader.is_alive():
+                logger.warning("Agent %d did not send its final report in time", index)
+        self._close()
+
+    def _close(self):
+        for agent in self.agents:
+            agent.close()
+
+
+def _connect(host: str, port: int, timeout: float) -> Connection:
+    """Connect to the controller, retrying while it is not listening yet"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            sock = socket.create_connection((host, port), timeout=5)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            return Connection(sock, f"{host}:{port}")
+        except OSError as e:
+            if time.monotonic() >= deadline:
+                raise ConnectionError(f"Could not reach the controller at {host}:{port}: {e}") from e
+            time.sleep(1)
+
+
+def run_agent(host: str, port: int, make_simulator: Callable, connect_timeout: float = 60,
+              token: str = None) -> int:
+    """Serve one controller: set up the assigned users, run them from the common start until told to stop"""
+    controller = _connect(host, port, connect_timeout)
+    controller.send({"type": "hello", "version": PROTOCOL_VERSION, "name": socket.gethostname(), "pid": os.getpid(),
+                     "token": token or os.environ.get(TOKEN_ENV)})
+    logger.info("Connected to the controller at %s:%s", host, port)
+
+    assignment = controller.receive()  # Arrives once every agent has joined
+    if assignment is None or assignment.get("type") != "assign":
+        logger.error("Controller closed the connection before assigning users: %s", assignment)
+        controller.close()
+        return 1
+    index = assignment["index"]
+    user_ranges = {role: tuple(bounds) for role, bounds in assignment["user_ranges"].items()}
+    logger.info("Agent %d of %d: users %s", index, assignment["agents"], user_ranges)
+
+    simulator = make_simulator(assignment["config"], index, user_ranges)
+    simulator.create_users()
+    simulator.setup_users()
+    controller.send({"type": "ready", "users": sum(stop - start for start, stop in user_ranges.values())})
+
+    message = controller.receive()
+    if message is None or message.get("type") != "start":
+        logger.info("Controller ended the run before it started")
+        controller.close()
+        return 0
+    # Relative to the receipt, so the agents' clocks need not agree
+    time.sleep(max(0.0, message["start_in"]))
+    # The first report starts here, so the agent's user setup stays out of the run's metrics
+    previous = simulator.collect_stats()["metrics"]
+    simulator.start_simulation()
+
+    stop_event = threading.Event()
+
+    def listen():
+        try:
+            message = controller.receive()
+        except (OSError, ValueError):
+            message = None
+        if message is None:
+            logger.warning("Lost the controller; stopping")
+        stop_event.set()
+
+    threading.Thread(target=listen, daemon=True, name="controller").start()
+
+    def report():
+        nonlocal previous
+        stats = simulator.collect_stats()
+        current = stats["metrics"]
+        # Only the samples recorded since the last report travel; the controller adds them up
+        stats["metrics"] = metrics.diff_snapshots(current, previous)
+        previous = current
+        controller.send({"type": "stats", "stats": encode_stats(stats)})
+
+    try:
+        while not stop_event.wait(assignment["report_interval"]):
+            report()
+            if simulator.finished.is_set():
+                break  # The agent's share of the load profile has ended
+    except OSError as e:
+        logger.warning("Could not report to the controller: %s", e)
+    except KeyboardInterrupt:
+        logger.info("Received keyboard interrupt, stopping agent...")
+    finally:
+        simulator.stop_simulation()
+        try:
+            report()
+            controller.send({"type": "done"})
+        except OSError:
+            pass
+        controller.close()
+    return 0
@@ -0,0 +1,403 @@
+"""
+Metrics export for the E-Learning Platform Simulator
+Serves a Prometheus text endpoint and streams per-interval time-series rows to a rolling CSV or Parquet file
+"""
+
+import csv
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import metrics
+import resilience
+from metrics import LatencyHistogram
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Optional; only needed for format "parquet"
+    pyarrow = None
+
+logger = logging.getLogger("elearning-simulator")
+
+# Defaults for the "exporters" section of config.yaml
+DEFAULT_EXPORTERS_CONFIG = {
+    "prometheus": {
+        "enabled": False,
+        "host": "127.0.0.1",
+        "port": 9464
+    },
+    "timeseries": {
+        "enabled": False,
+        "path": "simulator-metrics.csv",
+        "format": "csv",                # csv | parquet (needs pyarrow)
+        "interval": 1,                  # Seconds per row
+        "max_bytes": 100 * 1024 * 1024,  # Roll over to a new file beyond this size
+        "backups": 5                    # Rolled-over files kept as <path>.1 ... <path>.N
+    }
+}
+
+# Upper bounds (seconds) of the Prometheus latency histogram buckets
+PROMETHEUS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+TIMESERIES_FIELDS = ["timestamp", "scope", "method", "endpoint", "role", "requests", "rps", "errors",
+                     "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+
+
+def _label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _cumulative_buckets(histogram: LatencyHistogram) -> List[int]:
+    """Samples at or below each PROMETHEUS_BUCKETS bound; O(buckets) however long the run"""
+    bounds_us = [bound * 1_000_000 for bound in PROMETHEUS_BUCKETS]
+    counts = [0] * len(bounds_us)
+    for index, n in histogram.counts.items():
+        highest = metrics.bucket_range(index)[1]
+        for i, bound in enumerate(bounds_us):
+            if highest <= bound:
+                counts[i] += n
+                break
+    for i in range(1, len(counts)):
+        counts[i] += counts[i - 1]
+    return counts
+
+
+def prometheus_text(stats: Dict[str, Any]) -> str:
+    """Render a collect_stats() snapshot in the Prometheus text exposition format"""
+    lines = [
+        "# HELP simulator_requests_total Requests sent by the simulator",
+        "# TYPE simulator_requests_total counter",
+    ]
+    histograms = {}
+    for (method, endpoint, status), data in stats["metrics"]["series"].items():
+        histogram = LatencyHistogram.from_dict(data)
+        lines.append(f'simulator_requests_total{{method="{method}",endpoint="{_label(endpoint)}",status="{status}"}} '
+                     f'{histogram.count}')
+        merged = histograms.setdefault((method, endpoint), LatencyHistogram())
+        merged.merge(histogram)
+
+    lines += [
+        "# HELP simulator_request_duration_seconds Request latency as seen by the simulator",
+        "# TYPE simulator_request_duration_seconds histogram",
+    ]
+    for (method, endpoint), histogram in sorted(histograms.items()):
+        labels = f'method="{method}",endpoint="{_label(endpoint)}"'
+        for bound, count in zip(PROMETHEUS_BUCKETS, _cumulative_buckets(histogram)):
+            lines.append(f'simulator_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+        lines.append(f'simulator_request_duration_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+        lines.append(f'simulator_request_duration_seconds_sum{{{labels}}} {histogram.total / 1_000_000}')
+        lines.append(f'simulator_request_duration_seconds_count{{{labels}}} {histogram.count}')
+
+    lines += [
+        "# HELP simulator_role_requests_total Requests by simulated user role",
+        "# TYPE simulator_role_requests_total counter",
+    ]
+    roles = stats["metrics"].get("roles", {})
+    for role, (requests, _) in sorted(roles.items()):
+        lines.append(f'simulator_role_requests_total{{role="{role}"}} {requests}')
+    lines += [
+        "# HELP simulator_role_errors_total Failed requests by simulated user role",
+        "# TYPE simulator_role_errors_total counter",
+    ]
+    for role, (_, errors) in sorted(roles.items()):
+        lines.append(f'simulator_role_errors_total{{role="{role}"}} {errors}')
+
+    lines += [
+        "# HELP simulator_users Simulated users by role",
+        "# TYPE simulator_users gauge",
+    ]
+    for role, (_, total) in sorted(stats["users"].items()):
+        lines.append(f'simulator_users{{role="{role}"}} {total}')
+    lines += [
+        "# HELP simulator_active_users Simulated users that have sent at least one request",
+        "# TYPE simulator_active_users gauge",
+    ]
+    for role, (active, _) in sorted(stats["users"].items()):
+        lines.append(f'simulator_active_users{{role="{role}"}} {active}')
+
+    lines += [
+        "# HELP simulator_connections_total HTTP connections opened and reused",
+        "# TYPE simulator_connections_total counter",
+    ]
+    for kind, count in sorted(stats["connections"].items()):
+        lines.append(f'simulator_connections_total{{kind="{kind}"}} {count}')
+
+    if "scheduler" in stats:
+        scheduler = stats["scheduler"]
+        lines += [
+            "# TYPE simulator_open_loop_issued_total counter",
+            f"simulator_open_loop_issued_total {scheduler['issued']}",
+            "# TYPE simulator_open_loop_dropped_total counter",
+            f"simulator_open_loop_dropped_total {scheduler['dropped']}",
+            "# TYPE simulator_open_loop_backlog gauge",
+            f"simulator_open_loop_backlog {scheduler['backlog']}",
+        ]
+    if "catalog" in stats:
+        lines += ["# TYPE simulator_catalog_cache_total counter"]
+        for kind in ("hits", "misses"):
+            lines.append(f'simulator_catalog_cache_total{{result="{kind}"}} {stats["catalog"][kind]}')
+    if "world" in stats:
+        lines += [
+            "# HELP simulator_world_checks_total Responses checked against the world model",
+            "# TYPE simulator_world_checks_total counter",
+            f"simulator_world_checks_total {stats['world']['checks']}",
+            "# HELP simulator_world_violations_total Responses inconsistent with the world model",
+            "# TYPE simulator_world_violations_total counter",
+        ]
+        for kind, count in sorted(stats["world"]["violations"].items()):
+            lines.append(f'simulator_world_violations_total{{kind="{kind}"}} {count}')
+    if "codec" in stats:
+        bodies = stats["codec"]
+        lines += [
+            "# HELP simulator_response_bytes_total Response body bytes received",
+            "# TYPE simulator_response_bytes_total counter",
+            f"simulator_response_bytes_total {bodies['received_bytes']}",
+            "# HELP simulator_response_bodies_total Response bodies by how much of them was decoded",
+            "# TYPE simulator_response_bodies_total counter",
+        ]
+        for kind in ("decoded", "deferred", "skipped"):
+            lines.append(f'simulator_response_bodies_total{{parse="{kind}"}} {bodies[kind]}')
+    if "resilience" in stats:
+        guard = stats["resilience"]
+        lines += [
+            "# HELP simulator_circuit_breaker_state Breaker state per endpoint (0 closed, 1 half-open, 2 open)",
+            "# TYPE simulator_circuit_breaker_state gauge",
+        ]
+        for key, state in sorted(guard["breakers"].items()):
+            method, endpoint = key.split(" ", 1)
+            lines.append(f'simulator_circuit_breaker_state{{method="{method}",endpoint="{_label(endpoint)}"}} '
+                         f'{resilience.STATE_VALUES[state]}')
+        lines += [
+            "# TYPE simulator_circuit_breaker_opened_total counter",
+            f"simulator_circuit_breaker_opened_total {guard['opened']}",
+            "# HELP simulator_requests_not_sent_total Requests failed fast by an open breaker or shed by the limiter",
+            "# TYPE simulator_requests_not_sent_total counter",
+            f'simulator_requests_not_sent_total{{reason="breaker"}} {guard["rejected"]}',
+            f'simulator_requests_not_sent_total{{reason="shed"}} {guard["shed"]}',
+            "# TYPE simulator_retries_total counter",
+            f"simulator_retries_total {guard['retries']}",
+        ]
+        if "limit" in guard:
+            lines += ["# TYPE simulator_in_flight_limit gauge", f"simulator_in_flight_limit {guard['limit']}",
+                      "# TYPE simulator_in_flight gauge", f"simulator_in_flight {guard['in_flight']}"]
+    if "media" in stats:
+        lines += [
+            "# HELP simulator_media_bytes_total Lesson media bytes streamed, by content type",
+            "# TYPE simulator_media_bytes_total counter",
+        ]
+        for kind, entry in sorted(stats["media"].items()):
+            lines.append(f'simulator_media_bytes_total{{type="{_label(kind)}"}} {entry["bytes"]}')
+        lines += ["# TYPE simulator_media_fetches_total counter"]
+        for kind, entry in sorted(stats["media"].items()):
+            lines.append(f'simulator_media_fetches_total{{type="{_label(kind)}",result="ok"}} '
+                         f'{entry["fetches"] - entry["failed"]}')
+            lines.append(f'simulator_media_fetches_total{{type="{_label(kind)}",result="failed"}} {entry["failed"]}')
+        lines += [
+            "# HELP simulator_media_ttfb_seconds Time to the first media byte",
+            "# TYPE simulator_media_ttfb_seconds histogram",
+        ]
+        for kind, entry in sorted(stats["media"].items()):
+            histogram = LatencyHistogram.from_dict(entry["ttfb"])
+            labels = f'type="{_label(kind)}"'
+            for bound, count in zip(PROMETHEUS_BUCKETS, _cumulative_buckets(histogram)):
+                lines.append(f'simulator_media_ttfb_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'simulator_media_ttfb_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f'simulator_media_ttfb_seconds_sum{{{labels}}} {histogram.total / 1_000_000}')
+            lines.append(f'simulator_media_ttfb_seconds_count{{{labels}}} {histogram.count}')
+    if "load" in stats:
+        lines += [
+            "# HELP simulator_load_target Load the load profile asks for (users in closed mode, actions/s in open mode)",
+            "# TYPE simulator_load_target gauge",
+            f"simulator_load_target {stats['load']['load']}",
+        ]
+        if "running" in stats["load"]:
+            lines += ["# TYPE simulator_running_users gauge", f"simulator_running_users {stats['load']['running']}"]
+    return "\n".join(lines) + "\n"
+
+
+class PrometheusExporter:
+    """Local /metrics endpoint rendering the latest stats on each scrape"""
+
+    def __init__(self, collect: Callable[[], Dict[str, Any]], host: str, port: int):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Only loaded when enabled
+
+        self.collect = collect
+
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = prometheus_text(exporter.collect()).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True, name="prometheus-exporter")
+
+    def start(self):
+        self.thread.start()
+        host, port = self.server.server_address[:2]
+        logger.info("Prometheus metrics at http://%s:%s/metrics", host, port)
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _CsvSink:
+    def __init__(self, path: str):
+        self.file = open(path, "w", newline="")
+        self.writer = csv.DictWriter(self.file, fieldnames=TIMESERIES_FIELDS)
+        self.writer.writeheader()
+
+    def write(self, rows: List[Dict[str, Any]]):
+        self.writer.writerows(rows)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class _ParquetSink:
+    def __init__(self, path: str):
+        self.path = path
+        self.writer = None
+
+    def write(self, rows: List[Dict[str, Any]]):
+        if not rows:
+            return
+        table = pyarrow.Table.from_pylist(rows)
+        if self.writer is None:
+            self.writer = pyarrow.parquet.ParquetWriter(self.path, table.schema)
+        # One row group per interval keeps memory flat; columns are cast to the first group's types
+        self.writer.write_table(table.cast(self.writer.schema))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class TimeSeriesWriter:
+    """Writes one row per endpoint and per role for every interval, from the difference of two cumulative snapshots
+
+    `collect` returns a metrics snapshot only, such as metrics.registry.snapshot. Each interval only touches
+    the series and histogram buckets that exist, so the cost stays flat however long the run and however
+    many users there are.
+    """
+
+    def __init__(self, collect: Callable[[], Dict[str, Any]], path: str, format: str = "csv", interval: float = 1,
+                 max_bytes: int = 100 * 1024 * 1024, backups: int = 5):
+        if format not in ("csv", "parquet"):
+            raise ValueError(f"Unknown time series format '{format}', expected 'csv' or 'parquet'")
+        if format == "parquet" and pyarrow is None:
+            raise ValueError("Time series format 'parquet' needs the pyarrow package")
+        self.collect = collect
+        self.path = path
+        self.format = format
+        self.interval = interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.sink = None
+        self.active = False
+        self.thread = threading.Thread(target=self._run, daemon=True, name="timeseries-exporter")
+
+    def _open(self):
+        self.sink = _CsvSink(self.path) if self.format == "csv" else _ParquetSink(self.path)
+
+    def _roll_over(self):
+        """Close the current file and shift it to <path>.1, dropping the oldest backup"""
+        self.sink.close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        self._open()
+
+    @staticmethod
+    def rows(snapshot: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Time-series rows for one interval snapshot (see metrics.diff_snapshots)"""
+        timestamp = round(snapshot["taken"], 3)
+        elapsed = max(snapshot["taken"] - snapshot["started"], 1e-9)
+        rows = []
+        for row in metrics.summarize(snapshot):
+            rows.append({
+                "timestamp": timestamp, "scope": "endpoint", "method": row["method"], "endpoint": row["endpoint"],
+                "role": "", "requests": row["count"], "rps": round(row["rps"], 3),
+                "errors": round(row["count"] * row["error_rate"]), "p50_ms": row["p50"], "p95_ms": row["p95"],
+                "p99_ms": row["p99"], "max_ms": row["max"]
+            })
+        for role, (requests, errors) in sorted(snapshot.get("roles", {}).items()):
+            rows.append({
+                "timestamp": timestamp, "scope": "role", "method": "", "endpoint": "", "role": role,
+                "requests": requests, "rps": round(requests / elapsed, 3), "errors": errors,
+                "p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None
+            })
+        return rows
+
+    def start(self):
+        self._open()
+        self.active = True
+        self.thread.start()
+        logger.info("Writing %ss metrics time series to %s", self.interval, self.path)
+
+    def _run(self):
+        previous = self.collect()
+        next_tick = time.monotonic() + self.interval
+        while self.active:
+            time.sleep(max(0.0, next_tick - time.monotonic()))
+            next_tick += self.interval
+            try:
+                current = self.collect()
+                self.sink.write(self.rows(metrics.diff_snapshots(current, previous)))
+                previous = current
+                if self.max_bytes and os.path.getsize(self.path) >= self.max_bytes:
+                    self._roll_over()
+            except Exception as e:
+                logger.error("Error writing metrics time series: %s", e)
+
+    def stop(self):
+        self.active = False
+        self.thread.join(timeout=self.interval + 1)
+        self.sink.close()
+
+
+_exporters: List[Any] = []
+
+
+def start(config: Optional[Dict[str, Any]], collect: Callable[[], Dict[str, Any]],
+          collect_metrics: Callable[[], Dict[str, Any]]):
+    """Start the exporters enabled in the "exporters" config section
+
+    collect returns the full stats for Prometheus scrapes; collect_metrics only the metrics snapshot the
+    time series is written from every interval.
+    """
+    config = config or {}
+    prometheus = {**DEFAULT_EXPORTERS_CONFIG["prometheus"], **(config.get("prometheus") or {})}
+    timeseries = {**DEFAULT_EXPORTERS_CONFIG["timeseries"], **(config.get("timeseries") or {})}
+    if prometheus["enabled"]:
+        _exporters.append(PrometheusExporter(collect, prometheus["host"], prometheus["port"]))
+    if timeseries["enabled"]:
+        _exporters.append(TimeSeriesWriter(
+            collect_metrics, timeseries["path"], timeseries["format"], timeseries["interval"],
+            timeseries["max_bytes"], timeseries["backups"]))
+    for exporter in _exporters:
+        exporter.start()
+
+
+def stop():
+    while _exporters:
+        _exporters.pop().stop()
@@ -0,0 +1,125 @@
+"""
+Notification fan-out for the E-Learning Platform Simulator
+Sends an instructor's course notification to every enrolled student one by one, concurrently or in batches
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import metrics
+
+logger = logging.getLogger("elearning-simulator")
+
+# Defaults for the "notifications" section of config.yaml
+DEFAULT_FANOUT_CONFIG = {
+    "fanout": "sequential",  # sequential | concurrent | bulk
+    "window": 32,            # Notification requests in flight per fan-out (concurrent and bulk)
+    "batch_size": 500,       # Students per POST notifications/bulk request
+    "workers": 128           # Threaded engine: threads shared by all fan-outs
+}
+
+_config = dict(DEFAULT_FANOUT_CONFIG)
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def configure(config: Dict[str, Any] = None):
+    """Apply the "notifications" config section"""
+    global _config
+    config = {**DEFAULT_FANOUT_CONFIG, **(config or {})}
+    if config["fanout"] not in ("sequential", "concurrent", "bulk"):
+        raise ValueError(f"Unknown notification fan-out '{config['fanout']}', expected sequential, concurrent or bulk")
+    _config = config
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=_config["workers"], thread_name_prefix="fanout")
+        return _executor
+
+
+def close():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+            _executor = None
+
+
+def plan(user_ids: List, message: str) -> Tuple[str, List[Dict[str, Any]]]:
+    """Endpoint and request payloads that deliver `message` to every user"""
+    if _config["fanout"] == "bulk":
+        size = max(1, _config["batch_size"])
+        return "notifications/bulk", [
+            {"user_ids": user_ids[i:i + size], "message": message} for i in range(0, len(user_ids), size)
+        ]
+    return "notifications", [{"user_id": user_id, "message": message} for user_id in user_ids]
+
+
+def _window() -> int:
+    return 1 if _config["fanout"] == "sequential" else max(1, _config["window"])
+
+
+def _record(started: float, results: List[Dict[str, Any]]) -> int:
+    """Record the completion time of a whole fan-out as its own FANOUT series"""
+    failed = sum(1 for result in results if result.get("status") != "success")
+    metrics.registry.record("fanout", "notifications", 500 if failed else 200, time.perf_counter() - started)
+    return failed
+
+
+def send_notifications(user, course_id, user_ids: List, message: str) -> int:
+    """Notify every user of a course from a threaded user; returns the number of failed requests"""
+    endpoint, payloads = plan(user_ids, message)
+    window = _window()
+    logger.info("Instructor %s is notifying %d students in course %s (%s, %d requests)",
+                user, len(user_ids), course_id, _config["fanout"], len(payloads))
+    started = time.perf_counter()
+    if window == 1:
+        results = [user.make_request("post", endpoint, payload, parse=False) for payload in payloads]
+    else:
+        # The posts run on several threads at once: take the open-loop start for the whole fan-out and renew
+        # the token once here, so the posts leave the user's state alone
+        started = user.intended_start or started
+        user.intended_start = None
+        user.renew_expired_token()
+        # Bounded in-flight window over a pool shared by all instructors
+        slots = threading.BoundedSemaphore(window)
+        futures = []
+        for payload in payloads:
+            slots.acquire()
+            future = _get_executor().submit(user.shared_request, "post", endpoint, payload)
+            future.add_done_callback(lambda _: slots.release())
+            futures.append(future)
+        results = [future.result() for future in futures]
+    return _record(started, results)
+
+
+async def send_notifications_async(user, course_id, user_ids: List, message: str) -> int:
+    """Coroutine version of send_notifications for the async engine"""
+    endpoint, payloads = plan(user_ids, message)
+    window = _window()
+    logger.info("Instructor %s is notifying %d students in course %s (%s, %d requests)",
+                user, len(user_ids), course_id, _config["fanout"], len(payloads))
+    started = time.perf_counter()
+    if window == 1:
+        results = [await user.make_request("post", endpoint, payload, parse=False) for payload in payloads]
+    else:
+        import asyncio
+
+        # As in send_notifications, the concurrent posts leave the user's state alone
+        started = user.intended_start or started
+        user.intended_start = None
+        await user.renew_expired_token()
+        slots = asyncio.Semaphore(window)
+
+        async def post(payload):
+            async with slots:
+                return await user.shared_request("post", endpoint, payload)
+
+        results = await asyncio.gather(*(post(payload) for payload in payloads))
+    return _record(started, results)
@@ -0,0 +1,199 @@
+"""
+Shared HTTP connection pool for the E-Learning Platform Simulator
+Keeps connections to the backend alive between requests and counts how often they are reused
+"""
+
+import threading
+from typing import TYPE_CHECKING, Any, Dict
+
+import profiling
+
+if TYPE_CHECKING:
+    import requests
+
+# requests (and urllib3 below it) is imported with the first session, so processes that never
+# send a request through it, such as async-engine shards, do not pay for the import
+
+# Defaults for the "http" section of config.yaml
+DEFAULT_HTTP_CONFIG = {
+    "pool_size": 100,         # Total connections kept open (number of cached host pools for the threaded engine)
+    "per_host_limit": 100,    # Connections kept open per backend host
+    "pool_block": False,      # Threaded engine: wait for a free connection instead of opening a throwaway one
+    "keep_alive": True,       # Reuse connections between requests
+    "keepalive_timeout": 30,  # Async engine: seconds an idle connection stays in the pool
+    "timeout": 5              # Request timeout in seconds
+}
+
+
+class ConnectionStats:
+    """Thread-safe counters of connections created vs. reused"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    def record(self, reused: bool):
+        """Count one request sent on a new or an already open connection"""
+        with self._lock:
+            if reused:
+                self.reused += 1
+            else:
+                self.created += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        """Return the current counts"""
+        with self._lock:
+            return {"created": self.created, "reused": self.reused}
+
+    def reset(self):
+        with self._lock:
+            self.created = 0
+            self.reused = 0
+
+
+stats = ConnectionStats()
+
+_config = dict(DEFAULT_HTTP_CONFIG)
+_session = None
+_session_lock = threading.Lock()
+
+
+class _CountingPoolMixin:
+    """Records whether each request goes out on a fresh or a pooled connection"""
+
+    def _make_request(self, conn, *args, **kwargs):
+        # A connection without a socket is connected by this request
+        reused = getattr(conn, "sock", None) is not None
+        stats.record(reused=reused)
+        timer = profiling.thread_timer()
+        if timer is None:
+            return super()._make_request(conn, *args, **kwargs)
+        send = super()._make_request
+        return profiling.time_exchange(timer, conn, reused, lambda: send(conn, *args, **kwargs))
+
+
+_adapter_class = None
+
+
+def _pooled_adapter_class():
+    """HTTPAdapter whose host pools feed the shared connection stats, defined on first use"""
+    global _adapter_class
+    if _adapter_class is None:
+        from requests.adapters import HTTPAdapter
+        from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+        class CountingHTTPConnectionPool(_CountingPoolMixin, HTTPConnectionPool):
+            pass
+
+        class CountingHTTPSConnectionPool(_CountingPoolMixin, HTTPSConnectionPool):
+            pass
+
+        class PooledAdapter(HTTPAdapter):
+            def init_poolmanager(self, *args, **kwargs):
+                super().init_poolmanager(*args, **kwargs)
+                self.poolmanager.pool_classes_by_scheme = {
+                    "http": CountingHTTPConnectionPool,
+                    "https": CountingHTTPSConnectionPool
+                }
+
+        _adapter_class = PooledAdapter
+    return _adapter_class
+
+
+def __getattr__(name: str):
+    # http_pool.RequestException: the threaded engine's transport error, resolved without importing
+    # requests at module load (an except clause only evaluates it once something was raised)
+    if name == "RequestException":
+        import requests
+        return requests.RequestException
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def configure(http_config: Dict[str, Any] = None):
+    """Apply the "http" config section; the pool is rebuilt on next use"""
+    global _config, _session
+    with _session_lock:
+        _config = {**DEFAULT_HTTP_CONFIG, **(http_config or {})}
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def get_config() -> Dict[str, Any]:
+    return _config
+
+
+def request_timeout() -> float:
+    return _config["timeout"]
+
+
+def get_session() -> "requests.Session":
+    """Return the process-wide pooled session used by the threaded engine"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _create_session()
+    return _session
+
+
+def _create_session() -> "requests.Session":
+    import requests
+
+    session = requests.Session()
+    adapter = _pooled_adapter_class()(
+        pool_connections=_config["pool_size"],
+        pool_maxsize=_config["per_host_limit"],
+        pool_block=_config["pool_block"]
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if not _config["keep_alive"]:
+        session.headers["Connection"] = "close"
+    if profiling.enabled():
+        session.hooks["response"].append(profiling.on_response)
+    return session
+
+
+def create_async_session():
+    """Create an aiohttp session with the configured pool limits for the async engine"""
+    import aiohttp
+
+    async def on_connection_create_end(session, context, params):
+        stats.record(reused=False)
+
+    async def on_connection_reuseconn(session, context, params):
+        stats.record(reused=True)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+
+    if _config["keep_alive"]:
+        connector = aiohttp.TCPConnector(
+            limit=_config["pool_size"],
+            limit_per_host=_config["per_host_limit"],
+            keepalive_timeout=_config["keepalive_timeout"]
+        )
+    else:
+        connector = aiohttp.TCPConnector(
+            limit=_config["pool_size"],
+            limit_per_host=_config["per_host_limit"],
+            force_close=True
+        )
+
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=_config["timeout"]),
+        trace_configs=[trace_config, profiling.trace_config()] if profiling.enabled() else [trace_config]
+    )
+
+
+def close():
+    """Close the shared session and its pooled connections"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
@@ -0,0 +1,322 @@
+"""
+Load profiles for the E-Learning Platform Simulator
+Shapes the load over a run (ramp, staircase, spike, fixed-length soak) instead of starting every user at
+t=0 and running until Ctrl-C, and searches for the highest load that still meets the latency and error SLOs
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+import metrics
+from scheduler import ArrivalSchedule, ConstantSchedule, RampSchedule, StepSchedule
+
+logger = logging.getLogger("elearning-simulator")
+
+# Defaults for the "load_profile" section of config.yaml. A load is a number of running users in closed
+# mode and actions per second in open mode; None means full load (every user, or the scheduler rate)
+DEFAULT_LOAD_PROFILE_CONFIG = {
+    "profile": "none",      # none | ramp | staircase | spike | soak | saturation
+    "duration": None,       # Stop the run after this many seconds (required for soak)
+    "tick": 1.0,            # Seconds between load adjustments
+    "start": 0,             # Ramp: initial load
+    "end": None,            # Ramp: final load, held once reached
+    "ramp_duration": 300,   # Ramp: seconds from start to end
+    "steps": [],            # Staircase: list of {load, duration}; the last step is held afterwards
+    "base": None,           # Spike: load outside the spike
+    "peak": None,           # Spike: load during the spike
+    "spike_at": 300,        # Spike: seconds in when the spike starts
+    "spike_duration": 60,   # Spike: seconds the spike lasts
+    "level": None,          # Soak: constant load
+    "saturation": {
+        "start": 10,        # Load of the first step
+        "step": 10,         # Load added per step
+        "step_duration": 60,  # Seconds per step
+        "warmup": 10,       # Seconds at the start of each step left out of its measurement
+        "max": None,        # Give up without a breach beyond this load (default: full load)
+        "min_requests": 100,  # Steps with fewer requests are not judged
+        "p99_ms": 1000,     # SLO: 99th percentile latency
+        "error_rate": 0.01  # SLO: share of failed requests
+    }
+}
+
+PROFILES = ("none", "ramp", "staircase", "spike", "soak", "saturation")
+
+
+class SpikeSchedule(ArrivalSchedule):
+    """Base load with a single rectangular spike"""
+
+    def __init__(self, base: float, peak: float, spike_at: float, spike_duration: float, **kwargs):
+        super().__init__(**kwargs)
+        self.base = base
+        self.peak = peak
+        self.spike_at = spike_at
+        self.spike_duration = spike_duration
+
+    def rate_at(self, elapsed: float) -> float:
+        if self.spike_at <= elapsed < self.spike_at + self.spike_duration:
+            return self.peak
+        return self.base
+
+
+class SaturationSearch(ArrivalSchedule):
+    """Raises the load one step at a time until a step breaks the p99 or error-rate SLO
+
+    Each step is judged on the requests completed during it, after its warmup, so the result is
+    the highest load whose own traffic met the SLOs.
+    """
+
+    def __init__(self, config: Dict[str, Any], full_load: float, collect: Callable[[], Dict[str, Any]], **kwargs):
+        super().__init__(**kwargs)
+        self.config = {**DEFAULT_LOAD_PROFILE_CONFIG["saturation"], **(config or {})}
+        self.max_load = self.config["max"] if self.config["max"] is not None else full_load
+        self.collect = collect  # Returns a metrics snapshot
+        self.load = float(self.config["start"])
+        self.steps: List[Dict[str, Any]] = []
+        self.breaking_point: Optional[Dict[str, Any]] = None
+        self.on_change: Optional[Callable[[float], None]] = None  # Applies a new load without waiting a tick
+        self.done = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def rate_at(self, elapsed: float) -> float:
+        return self.load
+
+    def start(self):
+        self.thread = threading.Thread(target=self._search, daemon=True, name="saturation-search")
+        self.thread.start()
+
+    def _search(self):
+        step_duration = self.config["step_duration"]
+        warmup = min(self.config["warmup"], step_duration)
+        while not self.stopped.is_set():
+            logger.info("Saturation search: load %g", self.load)
+            if self.stopped.wait(warmup):
+                return
+            started = self.collect()
+            if self.stopped.wait(step_duration - warmup):
+                return
+            step = self._judge(metrics.diff_snapshots(self.collect(), started))
+            self.steps.append(step)
+            logger.info("Saturation search: load %g -> %.1f req/s, p99 %.1fms, errors %.2f%%%s",
+                        step["load"], step["throughput"], step["p99_ms"], step["error_rate"] * 100,
+                        f" (SLO breached: {', '.join(step['breaches'])})" if step["breaches"] else "")
+            if step["breaches"]:
+                self.breaking_point = step
+                break
+            if self.load >= self.max_load:
+                break
+            self.load = min(self.load + self.config["step"], self.max_load)
+            if self.on_change is not None:
+                self.on_change(self.load)
+        for line in self.report():
+            logger.info(line)
+        self.done.set()
+
+    def _judge(self, snapshot: Dict[str, Any]) -> Dict[str, Any]:
+        """Throughput, p99 and error rate of one step and the SLOs it breached"""
+        latency, errors = metrics.overall(snapshot)
+        elapsed = max(snapshot["taken"] - snapshot["started"], 1e-9)
+        p99_ms = latency.percentile(0.99) / 1000
+        error_rate = errors / latency.count if latency.count else 0.0
+        breaches = []
+        if latency.count >= self.config["min_requests"]:
+            if p99_ms > self.config["p99_ms"]:
+                breaches.append(f"p99 {p99_ms:.1f}ms > {self.config['p99_ms']}ms")
+            if error_rate > self.config["error_rate"]:
+                breaches.append(f"error rate {error_rate:.2%} > {self.config['error_rate']:.2%}")
+        return {
+            "load": self.load,
+            "requests": latency.count,
+            "throughput": latency.count / elapsed,
+            "p99_ms": p99_ms,
+            "error_rate": error_rate,
+            "breaches": breaches
+        }
+
+    def sustainable(self) -> Optional[Dict[str, Any]]:
+        """Last step that met the SLOs"""
+        passed = [step for step in self.steps if not step["breaches"]]
+        return passed[-1] if passed else None
+
+    def report(self) -> List[str]:
+        lines = ["--- SATURATION SEARCH ---"]
+        best = self.sustainable()
+        if best is not None:
+            lines.append(f"Max sustainable load: {best['load']:g} ({best['throughput']:.1f} req/s, "
+                         f"p99 {best['p99_ms']:.1f}ms, errors {best['error_rate']:.2%})")
+        else:
+            lines.append("No load step met the SLOs")
+        if self.breaking_point is not None:
+            lines.append(f"Breaking point: {self.breaking_point['load']:g} "
+                         f"({'; '.join(self.breaking_point['breaches'])})")
+        else:
+            lines.append(f"No SLO breach up to load {self.load:g}")
+        lines.append("-------------------------")
+        return lines
+
+    def stats(self) -> Dict[str, Any]:
+        best = self.sustainable()
+        return {
+            "load": self.load,
+            "steps": len(self.steps),
+            "sustainable_load": best["load"] if best else None,
+            "breaking_load": self.breaking_point["load"] if self.breaking_point else None
+        }
+
+    def stop(self):
+        if not self.stopped.is_set() and not self.done.is_set() and self.steps:
+            # Interrupted: report the steps measured so far
+            for line in self.report():
+                logger.info(line)
+        self.stopped.set()
+
+
+def merge_config(config: Dict[str, Any] = None) -> Dict[str, Any]:
+    merged = {**DEFAULT_LOAD_PROFILE_CONFIG, **(config or {})}
+    merged["saturation"] = {**DEFAULT_LOAD_PROFILE_CONFIG["saturation"], **(merged.get("saturation") or {})}
+    if merged["profile"] not in PROFILES:
+        raise ValueError(f"Unknown load profile '{merged['profile']}', expected {', '.join(PROFILES)}")
+    if merged["profile"] == "soak" and not merged["duration"]:
+        raise ValueError("Soak profile needs a duration")
+    if merged["profile"] == "staircase" and not merged["steps"]:
+        raise ValueError("Staircase profile needs at least one step")
+    return merged
+
+
+def build_profile(config: Dict[str, Any], full_load: float, collect: Callable[[], Dict[str, Any]] = None,
+                  **kwargs) -> Optional[ArrivalSchedule]:
+    """Load over time described by a merged "load_profile" section, or None for the default flat load
+
+    Profiles are arrival schedules, so open mode uses them as is; closed mode reads rate_at() as a user count.
+    """
+    kind = config["profile"]
+
+    def load(value):
+        return full_load if value is None else value
+
+    kwargs.setdefault("duration", config["duration"])
+    if kind == "none":
+        return None
+    if kind == "ramp":
+        return RampSchedule(config["start"], load(config["end"]), config["ramp_duration"], **kwargs)
+    if kind == "staircase":
+        return StepSchedule([{"rate": step["load"], "duration": step["duration"]} for step in config["steps"]],
+                            **kwargs)
+    if kind == "spike":
+        return SpikeSchedule(load(config["base"]), load(config["peak"]), config["spike_at"],
+                             config["spike_duration"], **kwargs)
+    if kind == "soak":
+        return ConstantSchedule(load(config["level"]), **kwargs)
+    return SaturationSearch(config["saturation"], full_load, collect, **kwargs)
+
+
+def scale_config(config: Dict[str, Any], factor: float) -> Dict[str, Any]:
+    """Scale every load in a "load_profile" section, e.g. to split it across shards"""
+    scaled = dict(config)
+    for key in ("start", "end", "base", "peak", "level"):
+        if scaled.get(key) is not None:
+            scaled[key] = scaled[key] * factor
+    if scaled.get("steps"):
+        scaled["steps"] = [{**step, "load": step["load"] * factor} for step in scaled["steps"]]
+    return scaled
+
+
+class UserController:
+    """Keeps a target number of closed-loop users running, starting and parking them as the target moves
+
+    Parked users finish their current action and think time before they can be started again, so a
+    user never runs twice at once.
+    """
+
+    def __init__(self, users: List, start_user: Callable, is_running: Callable, stop_user: Callable):
+        self.start_user = start_user  # user -> handle (thread or task)
+        self.is_running = is_running  # handle -> bool
+        self.stop_user = stop_user    # (user, handle) -> None
+        self.idle = deque(users)
+        self.running = []
+        self.draining = []
+        self.handles = {}
+        self.target = 0
+        self._lock = threading.Lock()
+
+    def set_target(self, target: float):
+        with self._lock:
+            self.target = max(0, int(round(target)))
+            still_draining = []
+            for user in self.draining:
+                if self.is_running(self.handles[user]):
+                    still_draining.append(user)
+                else:
+                    self.idle.append(user)
+            self.draining = still_draining
+            while len(self.running) < self.target and self.idle:
+                user = self.idle.popleft()
+                user.active = True
+                self.handles[user] = self.start_user(user)
+                self.running.append(user)
+            while len(self.running) > self.target:
+                user = self.running.pop()  # Most recently started first
+                self.stop_user(user, self.handles[user])
+                self.draining.append(user)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"target": self.target, "running": len(self.running)}
+
+
+class ProfileRunner:
+    """Applies a load profile every tick and ends the run after its duration or a finished search"""
+
+    def __init__(self, profile: Optional[ArrivalSchedule], apply: Optional[Callable[[float], None]],
+                 duration: Optional[float], tick: float, on_finish: Callable[[], None]):
+        self.profile = profile
+        self.apply = apply  # Closed mode: sets the running user count; open mode reads the profile itself
+        self.duration = duration
+        self.tick = tick
+        self.on_finish = on_finish
+        self.load = None
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if isinstance(self.profile, SaturationSearch):
+            self.profile.on_change = self._apply
+            self.profile.start()
+        self.thread = threading.Thread(target=self._run, daemon=True, name="load-profile")
+        self.thread.start()
+
+    def _run(self):
+        started = time.perf_counter()
+        while True:
+            elapsed = time.perf_counter() - started
+            if self.duration is not None and elapsed >= self.duration:
+                logger.info("Load profile finished after %ss", self.duration)
+                break
+            if isinstance(self.profile, SaturationSearch) and self.profile.done.is_set():
+                break
+            if self.profile is not None:
+                load = self.profile.rate_at(elapsed)
+                if load != self.load:
+                    self._apply(load)
+            if self.stopped.wait(self.tick):
+                return
+        self.on_finish()
+
+    def _apply(self, load: float):
+        self.load = load
+        if self.apply is not None:
+            self.apply(load)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {"load": self.load or 0}
+        if isinstance(self.profile, SaturationSearch):
+            stats["saturation"] = self.profile.stats()
+        return stats
+
+    def stop(self):
+        self.stopped.set()
+        if isinstance(self.profile, SaturationSearch):
+            self.profile.stop()
@@ -0,0 +1,197 @@
+"""
+Asynchronous logging for the E-Learning Platform Simulator
+User threads only enqueue log records; a background listener formats and writes them, with
+per-message sampling and rate limits and an optional JSON-lines output
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# Defaults for the "logging" section of config.yaml
+DEFAULT_LOGGING_CONFIG = {
+    "level": "INFO",
+    "format": "text",    # text | json (one JSON object per line)
+    "file": None,        # Write to this file instead of stdout
+    "queue_size": 100000,  # Records waiting for the writer; new records are dropped when it is full
+    "sampling": {},      # Message text -> N: keep 1 in N records whose message contains the text
+    "rate_limits": {}    # Message text -> records per second allowed through
+}
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+
+class _Rule:
+    """Sampling and rate limit state for one message text"""
+
+    __slots__ = ("every", "rate", "seen", "tokens", "refilled")
+
+    def __init__(self, every: int = 1, rate: Optional[float] = None):
+        self.every = max(1, int(every))
+        self.rate = rate
+        self.seen = 0
+        self.tokens = rate or 0.0
+        self.refilled = time.monotonic()
+
+
+class ThrottleFilter(logging.Filter):
+    """Drops all but 1 in N, or more than R per second, of the records matching a configured message text
+
+    Rules are matched against the unformatted message template, so the lookup for a call site is
+    cached after its first record and the check stays O(1).
+    """
+
+    def __init__(self, sampling: Dict[str, int], rate_limits: Dict[str, float]):
+        super().__init__()
+        self.patterns = {}
+        for text, every in (sampling or {}).items():
+            self.patterns.setdefault(text, _Rule()).every = max(1, int(every))
+        for text, rate in (rate_limits or {}).items():
+            rule = self.patterns.setdefault(text, _Rule())
+            rule.rate = float(rate)
+            rule.tokens = float(rate)
+        self._rules = {}  # Message template -> matching rule or None
+        self._lock = threading.Lock()
+        self.suppressed = 0
+
+    def _rule_for(self, template: str) -> Optional[_Rule]:
+        try:
+            return self._rules[template]
+        except KeyError:
+            rule = next((rule for text, rule in self.patterns.items() if text in template), None)
+            self._rules[template] = rule
+            return rule
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not self.patterns or record.levelno >= logging.WARNING:
+            return True
+        rule = self._rule_for(str(record.msg))
+        if rule is None:
+            return True
+        with self._lock:
+            rule.seen += 1
+            keep = (rule.seen - 1) % rule.every == 0
+            if keep and rule.rate is not None:
+                now = time.monotonic()
+                rule.tokens = min(rule.rate, rule.tokens + (now - rule.refilled) * rule.rate)
+                rule.refilled = now
+                if rule.tokens >= 1.0:
+                    rule.tokens -= 1.0
+                else:
+                    keep = False
+            if not keep:
+                self.suppressed += 1
+        return keep
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "process": record.process,
+            "msg": record.getMessage()
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that neither formats on the caller's thread nor waits for queue space"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        # The queue is thread-safe on its own, so skip the handler lock every emitting thread would contend on
+        if not self.filter(record):
+            return False
+        self.emit(record)
+        return True
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The listener runs in this process, so the record can be handed over unformatted
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_handler: Optional[NonBlockingQueueHandler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+_throttle: Optional[ThrottleFilter] = None
+_lock = threading.Lock()
+
+
+def configure(config: Dict[str, Any] = None):
+    """Route all logging through a queue to a background writer, per the "logging" config section"""
+    global _handler, _listener, _throttle
+    config = {**DEFAULT_LOGGING_CONFIG, **(config or {})}
+    if config["format"] not in ("text", "json"):
+        raise ValueError(f"Unknown log format '{config['format']}', expected 'text' or 'json'")
+
+    with _lock:
+        previous = _listener
+        if config["file"]:
+            output = logging.FileHandler(config["file"])
+        else:
+            output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(JsonFormatter() if config["format"] == "json" else logging.Formatter(TEXT_FORMAT))
+
+        _handler = NonBlockingQueueHandler(queue.Queue(maxsize=config["queue_size"]))
+        _throttle = ThrottleFilter(config["sampling"], config["rate_limits"])
+        _handler.addFilter(_throttle)
+        listener = logging.handlers.QueueListener(_handler.queue, output, respect_handler_level=False)
+        listener.start()
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_handler)
+        root.setLevel(config["level"].upper() if isinstance(config["level"], str) else config["level"])
+
+        # Swap writers only after the new handler is in place so no record is lost in between
+        _listener = previous
+        _stop_listener()
+        _listener = listener
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()  # Writes out everything still queued
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def stats() -> Dict[str, int]:
+    """Records dropped because the queue was full and suppressed by sampling or rate limits"""
+    return {
+        "dropped": _handler.dropped if _handler is not None else 0,
+        "suppressed": _throttle.suppressed if _throttle is not None else 0
+    }
+
+
+def shutdown():
+    """Flush queued records and stop the writer"""
+    with _lock:
+        _stop_listener()
+
+
+atexit.register(shutdown)
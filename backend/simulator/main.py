@@ -4,552 +4,132 @@ E-Learning Platform Simulator
 A simple simulator that generates user activity for an e-learning platform
 """
 
-import yaml
 import time
-import random
-import requests
-import json
+
+_IMPORTS_STARTED = time.perf_counter()  # Module imports are the first startup phase
+
+import argparse
 import logging
-from datetime import datetime
 import threading
 import sys
 import os
-from typing import Dict, List, Any
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[logging.StreamHandler(sys.stdout)]
-)
+import random
+import signal
+from typing import Dict, Any, List, Tuple
+
+import bootstrap
+import catalog_cache
+import codec
+import credential_cache
+import distributed
+import exporters
+import fanout
+import http_pool
+import load_profiles
+import log_pipeline
+import media
+import metrics
+import profiling
+import resilience
+import results
+import scenario
+import scheduler
+import sharding
+import startup
+import workload
+import world_model
+from population import Population
+from users import Admin, Instructor, Student
+
+# Configure logging; the config file's "logging" section is applied once it is loaded
+log_pipeline.configure()
 logger = logging.getLogger("elearning-simulator")
 
 
-class BaseUser:
-    """Base class for all user types with common functionality"""
-
-    def __init__(self, name: str, email: str, password: str, role: str, api_url: str):
-        """Initialize a user with basic information"""
-        self.name = name
-        self.email = email
-        self.password = password
-        self.role = role
-        self.api_url = api_url
-        self.token = None
-        self.user_data = None  # Will store user data returned from API
-        self.last_activity = None
-        self.active = True
-        self.id = None
-
-    def __str__(self):
-        return f"{self.name} ({self.role})"
-
-    def register(self) -> bool:
-        """Register user with the backend"""
-        user_data = {
-            "name": self.name,
-            "email": self.email,
-            "password": self.password,
-            "role": self.role
-        }
-
-        try:
-            response = requests.post(
-                f"{self.api_url}/users/register",
-                json=user_data,
-                timeout=5
-            )
-
-            if response.status_code < 400:
-                try:
-                    self.user_data = response.json().get("user")
-                    logger.info(f"Registered user: {self}")
-                    return True
-                except json.JSONDecodeError:
-                    self.user_data = {"name": self.name, "email": self.email}
-                    logger.warning(f"User registration returned non-JSON response for {self}")
-                    return True
-            else:
-                logger.warning(f"Failed to register user {self}: {response.text}")
-                return False
-
-        except requests.RequestException as e:
-            logger.error(f"Error registering user {self}: {e}")
-            return False
-
-    def login(self) -> bool:
-        """Authenticate with the backend to get a token"""
-        login_data = {
-            "email": self.email,
-            "password": self.password
-        }
-
-        try:
-            response = requests.post(
-                f"{self.api_url}/users/login",
-                json=login_data,
-                timeout=5
-            )
-
-            if response.status_code < 400:
-                try:
-                    data = response.json()
-                    self.token = data.get("data")
-                    if self.token:
-                        logger.info(f"User logged in: {self}")
-                        return True
-                    else:
-                        logger.warning(f"Login successful but no token received for {self}")
-                        return False
-                except json.JSONDecodeError:
-                    logger.warning(f"Login returned non-JSON response for {self}")
-                    return False
-            else:
-                logger.warning(f"Failed to login user {self}: {response.text}")
-                return False
-
-        except requests.RequestException as e:
-            logger.error(f"Error logging in user {self}: {e}")
-            return False
-
-    def make_request(self, method: str, endpoint: str, data: Dict = None) -> Dict:
-        """Make an authenticated API request"""
-        url = f"{self.api_url}/{endpoint}"
-        headers = {'Content-Type': 'application/json'}
-        if self.token:
-            headers["Authorization"] = f"Bearer {self.token}"
-
-        try:
-            if method.lower() == "get":
-                response = requests.get(url, headers=headers, timeout=5)
-            elif method.lower() == "post":
-                response = requests.post(url, json=data, headers=headers, timeout=5)
-            elif method.lower() == "put":
-                response = requests.put(url, json=data, headers=headers, timeout=5)
-            elif method.lower() == "delete":
-                response = requests.delete(url, headers=headers, timeout=5)
-            else:
-                logger.error(f"Unsupported HTTP method: {method}")
-                return {"success": False, "error": "Unsupported HTTP method"}
-
-            # Record activity timestamp
-            self.last_activity = datetime.now()
-
-            if response.status_code >= 400:
-                logger.warning(f"API Error {response.status_code}: {response.text}")
-                return {"success": False, "error": f"HTTP {response.status_code}", "details": response.text}
-
-            if response.content:
-                try:
-                    return response.json()
-                except json.JSONDecodeError:
-                    return {"success": True, "raw": response.text}
-            return {"success": True}
-
-        except requests.RequestException as e:
-            logger.error(f"Request error ({method} {endpoint}): {e}")
-            return {"success": False, "error": str(e)}
-
-    def behave(self, min_delay: int, max_delay: int):
-        """Base behavior loop for all users"""
-        logger.info(f"Starting behavior simulation for {self}")
-        self.set_user_id()
-        while self.active:
-            try:
-                # Perform role-specific behavior (implemented by subclasses)
-                self.perform_action()
-
-                # Random delay between actions
-                delay = random.uniform(min_delay, max_delay)
-                time.sleep(delay)
-
-            except Exception as e:
-                logger.error(f"Error in behavior simulation for {self}: {e}")
-                time.sleep(max_delay)  # Wait a bit longer after an error
-
-    def set_user_id(self):
-        user = self.make_request("get", f"users/email?email={self.email}")
-        self.id = user['data'].get('id')
-
-    def perform_action(self):
-        """To be implemented by subclasses"""
-        pass
-
-    def stop(self):
-        """Stop this user's behavior simulation"""
-        self.active = False
-
-
-class Student(BaseUser):
-    """Student user that enrolls in courses and makes progress"""
-
-    def __init__(self, name: str, email: str, password: str, api_url: str):
-        super().__init__(name, email, password, "student", api_url)
-        self.enrolled_courses = []  # List of course IDs
-
-    def perform_action(self):
-        """Perform a random student action"""
-        # Select a random action
-
-        actions = [
-            self.browse_courses,
-            self.view_enrolled_course,
-            self.make_progress,
-            self.check_notifications
-        ]
-        # Weight actions - make progress more frequent
-        weights = [0.1, 0.1, 0.4, 0.4]
-
-        # Choose and perform an action
-        action = random.choices(actions, weights=weights, k=1)[0]
-        action()
-
-    def browse_courses(self):
-        """Browse available courses, maybe enroll in one"""
-        logger.info(f"Student {self} is browsing courses")
-        courses = self.make_request("get", "courses")
-
-        # Maybe enroll in a course
-        if random.random() < 0.3 and len(courses) > 0:
-            if courses:
-                # Filter out courses already enrolled in
-                available_courses = [c for c in courses if c["id"] not in self.enrolled_courses]
-                if available_courses:
-                    course = random.choice(available_courses)
-                    self.enroll_in_course(course["id"], self.id)
-
-    def enroll_in_course(self, course_id, user_id):
-        """Enroll in a specific course"""
-        enrollment_data = {
-            "course_id": course_id,
-            "user_id": user_id
-        }
-        logger.info(f"Student {self.id} is enrolling in course {course_id}")
-        result = self.make_request("post", "enrollments", enrollment_data)
-
-        if "success" not in result.get("status"):
-            return
-
-        enrollment = result.get("data", [])
-
-        if not enrollment:
-            return
-
-        if "course_id" in enrollment:
-            self.enrolled_courses.append(course_id)
-            logger.info(f"Student {self} enrolled in course {course_id}")
-        else:
-            logger.warning(f"Failed to enroll student {self} in course {course_id}")
-
-    def view_enrolled_course(self):
-        """View details of an enrolled course"""
-        if not self.enrolled_courses:
-            # If not enrolled in any courses, browse instead
-            self.browse_courses()
-            return
-
-        course_id = random.choice(self.enrolled_courses)
-        logger.info(f"Student {self} is viewing course {course_id}")
-        self.make_request("get", f"courses/{course_id}")
-
-        # Also view the course contents
-        self.make_request("get", f"course-content/{course_id}")
-
-    def make_progress(self):
-        """Make progress in an enrolled course"""
-        logger.info(f"Student {self} makes progress")
-        if not self.enrolled_courses:
-            # If not enrolled in any courses, browse instead
-            self.browse_courses()
-            return
-
-        course_id = random.choice(self.enrolled_courses)
-
-        # Get course contents
-        result = self.make_request("get", f"course-content/{course_id}")
-        if "success" not in result.get("status"):
-            return
-
-        contents = result.get("data", [])
-        if not contents:
-            return
-
-        # Choose a random content item
-        content = random.choice(contents)
-        content_id = content["id"]
-
-        # Record progress
-        # time_spent = random.randint(60, 900)  # 1-15 minutes
-        progress_data = {
-            "user_id": self.id,
-            "course_id": course_id,
-            "content_id": content_id
-        }
-
-        logger.info(f"Student {self} is making progress in course {course_id}")
-        self.make_request("post", "progress", progress_data)
-
-    def check_notifications(self):
-        """Check for notifications"""
-        logger.info(f"Student {self} is checking notifications")
-        notifications = self.make_request("get", f"notifications/{self.id}")
-
-
-class Instructor(BaseUser):
-    """Instructor user that creates and manages courses"""
-
-    def __init__(self, name: str, email: str, password: str, api_url: str, course_topics: List[str],
-                 content_types: List[str]):
-        super().__init__(name, email, password, "instructor", api_url)
-        self.course_topics = course_topics
-        self.content_types = content_types
-        self.courses = []  # List of course IDs created by this instructor
-
-    def perform_action(self):
-        """Perform a random instructor action"""
-        # Select a random action
-        actions = [
-            self.create_course,
-            self.check_enrollments,
-            self.add_content,
-            self.update_course,
-            self.send_notification
-        ]
-
-        # Weight actions - creating content and checking progress more frequent
-        weights = [0.1, 0.15, 0.2, 0.25, 0.3]
-
-        # Choose and perform an action
-        action = random.choices(actions, weights=weights, k=1)[0]
-        action()
-
-    def create_course(self):
-        """Create a new course"""
-        topic = random.choice(self.course_topics)
-        difficulty = random.choice(["Beginner", "Intermediate", "Advanced"])
-
-        course_data = {
-            "title": f"{topic} {difficulty} Course",
-            "description": f"Learn {topic} from scratch to expert level. This is a {difficulty.lower()} level course.",
-            "instructor_id": str(self.id)
-        }
-
-        logger.info(f"Instructor {self} is creating a new course")
-        result = self.make_request("post", "courses", course_data)
-
-        if "success" not in result.get("status"):
-            return
-
-        data = result.get("data", [])
-        if result:
-            course_id = data.get("id")
-            self.courses.append(course_id)
-            logger.info(f"Instructor {self} created course {course_id}")
-
-            # Add initial content to the course
-            for i in range(3):  # Add 3 initial content items
-                self.add_content_to_course(course_id, i + 1)
-        else:
-            logger.warning(f"Failed to create course for instructor {self}")
-
-    def add_content_to_course(self, course_id, order):
-        """Add content to a specific course"""
-        content_type = random.choice(self.content_types)
-        content_data = {}
-        if content_type == "video":
-            content_data = {
-                "url": f"https://example.com/video/{course_id}/lesson{order}"
-            }
-        elif content_type == "pdf":
-            content_data = {
-                "url": f"https://example.com/pdf/{course_id}/document{order}.pdf"
-            }
-        else:
-            content_data = {
-                "url": f"https://example.com/img/{course_id}/image{order}.png"
-            }
-
-        content_item = {
-            "course_id": course_id,
-            "type": content_type,
-            "content": content_data,
-            "order": order
-        }
-
-        logger.info(f"Instructor {self} is adding content to course {course_id}")
-        self.make_request("post", f"course-content/", content_item)
-
-    def check_enrollments(self):
-        """Check enrollments for a course"""
-        if not self.courses:
-            self.create_course()
-            return
-
-        course_id = random.choice(self.courses)
-        logger.info(f"Instructor {self} is checking enrollments for course {course_id}")
-        self.make_request("get", f"enrollments/course/{course_id}")
-
-    def add_content(self):
-        """Add new content to an existing course"""
-        if not self.courses:
-            self.create_course()
-            return
-
-        course_id = random.choice(self.courses)
-
-        # Get current content to determine next order
-        result = self.make_request("get", f"course-content/{course_id}")
-
-        if "success" not in result.get("status"):
-            return
-
-        contents = result.get("data", [])
-        next_order = len(contents) + 1
-
-        self.add_content_to_course(course_id, next_order)
-
-    def update_course(self):
-        """Update course details"""
-        if not self.courses:
-            self.create_course()
-            return
-
-        course_id = random.choice(self.courses)
-
-        # Get current course details
-        result = self.make_request("get", f"courses/{course_id}")
-        if "success" not in result.get("status"):
-            return
-
-        course = result['data']
-        if "id" in course:
-            return
-
-        update_data = {
-            "title": course.get("title", f"Course {course_id}"),  # Keep same title
-            "description": course.get("description", "") + f" Updated on {datetime.now().strftime('%Y-%m-%d')}."
-        }
-
-        logger.info(f"Instructor {self} is updating course {course_id}")
-        self.make_request("put", f"courses/{course_id}", update_data)
-
-    def send_notification(self):
-        """Send notification to students in a course"""
-        if not self.courses:
-            self.create_course()
-            return
-
-        course_id = random.choice(self.courses)
-
-        # Get course details for title
-        result = self.make_request("get", f"courses/{course_id}")
-        if "success" not in result.get("status"):
-            return
-
-        course = result.get("data", {})
-        course_title = course.get("title", f"Course {course_id}")
-
-        # Get enrollments to find students
-        enrollments_result = self.make_request("get", f"enrollments/course/{course_id}")
-
-        if "success" not in enrollments_result.get("status"):
-            return
-
-        enrollments = enrollments_result.get('data', [])
-        if not enrollments:
-            return
-
-        message_templates = [
-            f"Don't forget to complete the latest module in {course_title}!",
-            f"New live session for {course_title} scheduled next week!",
-            f"Office hours available for {course_title} students tomorrow.",
-            f"Important deadline approaching for {course_title} assignment!"
-        ]
-
-        message = random.choice(message_templates)
-
-        # Send notification to each enrolled student
-        for enrollment in enrollments:
-            notification_data = {
-                "user_id": enrollment.get("user_id"),
-                "message": message
-            }
-
-            logger.info(f"Instructor {self} is sending notification to student in course {course_id}")
-            self.make_request("post", "notifications", notification_data)
-
-
-class Admin(BaseUser):
-    """Admin user that monitors the platform"""
-
-    def __init__(self, name: str, email: str, password: str, api_url: str):
-        super().__init__(name, email, password, "admin", api_url)
-
-    def perform_action(self):
-        """Perform a random admin action"""
-        # Select a random action
-        actions = [
-            self.view_all_users,
-            self.view_all_courses,
-            self.check_course_metrics
-        ]
-
-        # Equal weights for admin actions
-        weights = [0.33, 0.33, 0.34]
-
-        # Choose and perform an action
-        action = random.choices(actions, weights=weights, k=1)[0]
-        action()
-
-    def view_all_users(self):
-        """View list of all users"""
-        logger.info(f"Admin {self} is viewing all users")
-        self.make_request("get", "users")
-
-    def view_all_courses(self):
-        """View list of all courses"""
-        logger.info(f"Admin {self} is viewing all courses")
-        self.make_request("get", "courses")
-
-    def check_course_metrics(self):
-        """Check metrics for a specific course"""
-        # First get all courses
-        courses_result = self.make_request("get", "courses")
-        if not courses_result.get("success", False):
-            return
-
-        courses = courses_result
-        if not courses:
-            return
-
-
 class ELearningSimulator:
     """Main simulator class that manages all users and activities"""
 
-    def __init__(self, config_path: str = "config.yaml"):
+    def __init__(self, config_path: str = "config.yaml", config: Dict[str, Any] = None, config_cache: bool = True):
         """Initialize the simulator with configuration"""
-        self.config = self._load_config(config_path)
+        self.config_source = "given"
+        self.config = config if config is not None else self._load_config(config_path, config_cache)
         self.api_url = self.config["api_url"]
-
-        # User lists
-        self.admins = []
-        self.instructors = []
-        self.students = []
+        if self.config.get("logging"):
+            log_pipeline.configure(self.config["logging"])
+        http_pool.configure(self.config.get("http"))
+        credential_cache.configure(self.config.get("credential_cache"), self.api_url)
+        catalog_cache.configure(self.config.get("catalog_cache"))
+        fanout.configure(self.config.get("notifications"))
+        resilience.configure(self.config.get("resilience"))
+        codec.configure(self.config.get("codec"))
+        media.configure(self.config.get("media"))
+        world_model.configure(self.config.get("world_model"))
+        profiling.configure(self.config.get("profiling"))
+        self.engine = self.config.get("engine", "threaded")
+        if self.engine not in ("threaded", "async"):
+            raise ValueError(f"Unknown engine '{self.engine}', expected 'threaded' or 'async'")
+        self.async_engine = None
+
+        # Worker processes; 0 means one per CPU core
+        self.shards = int(self.config.get("shards", 1)) or os.cpu_count() or 1
+        self.coordinator = None
+        self.controller = False  # Distributed mode: agents run the users, this process coordinates them
+        self.distributed_config = {**distributed.DEFAULT_DISTRIBUTED_CONFIG, **(self.config.get("distributed") or {})}
+        self.report_summary = True  # Shard workers leave the summary to the coordinator
+        self.summary_interval = self.config.get("summary_interval", 60)
+        self.scheduler_config = {**scheduler.DEFAULT_SCHEDULER_CONFIG, **self.config.get("scheduler", {})}
+        if self.scheduler_config["mode"] not in ("closed", "open"):
+            raise ValueError(f"Unknown scheduler mode '{self.scheduler_config['mode']}', expected 'closed' or 'open'")
+        self.open_loop = None
+        self.bootstrap_report = None
+        self.workload_config = {**workload.DEFAULT_WORKLOAD_CONFIG, **(self.config.get("workload") or {})}
+        self.seed = self.workload_config["seed"]
+        self.shard_index = 0
+        self.replayer = None
+        self.load_profile_config = load_profiles.merge_config(self.config.get("load_profile"))
+        if self.load_profile_config["profile"] == "saturation" and self.shards > 1:
+            raise ValueError("The saturation search judges one process's metrics; run it with shards: 1")
+        self.profile_runner = None
+        self.user_controller = None
+        self.finished = threading.Event()  # Set when a load profile ends the run
+        self.results_config = {**results.DEFAULT_RESULTS_CONFIG, **(self.config.get("results") or {})}
+        self.results_baseline = None  # Metrics at the end of the results warmup
+        self.results_timer = None
+
+        # User lists, views of the population store
+        self.population = Population()
+        self.admins = self.population.groups["admin"]
+        self.instructors = self.population.groups["instructor"]
+        self.students = self.population.groups["student"]
+
+        scenario.configure(self.config.get("scenario"), self.config["min_delay"], self.config["max_delay"])
+        population = (self.config.get("scenario") or {}).get("population")
+        if population:
+            # A population mix overrides the per-role user counts
+            counts = scenario.population_counts(population)
+            self.config = {**self.config, **{f"num_{role}s": counts.get(role, 0) for role in sharding.ROLES}}
+
+        # Index range of each role's users owned by this process
+        self.user_ranges = {
+            "admin": (0, self.config["num_admins"]),
+            "instructor": (0, self.config["num_instructors"]),
+            "student": (0, self.config["num_students"])
+        }
 
         # Activity tracking
         self.active = True
         self.threads = {}
 
-    def _load_config(self, config_path: str) -> Dict[str, Any]:
+    def _load_config(self, config_path: str, use_cache: bool = True) -> Dict[str, Any]:
         """Load configuration from YAML file"""
         try:
-            with open(config_path, 'r') as file:
-                config = yaml.safe_load(file)
-                logger.info(f"Loaded configuration from {config_path}")
-                return config
+            config, self.config_source = startup.load_config(config_path, use_cache)
+            logger.info(f"Loaded configuration from {config_path}")
+            return config
         except Exception as e:
             logger.error(f"Failed to load config from {config_path}: {e}")
             logger.info("Using default configuration")
+            self.config_source = "defaults"
             # Default configuration
             return {
                 "api_url": "http://localhost:3000/api",
@@ -564,26 +144,58 @@ class ELearningSimulator:
                     "student": "student123"
                 },
                 "min_delay": 3,
-                "max_delay": 8
+                "max_delay": 8,
+                "engine": "threaded"
             }
 
+    def _user_classes(self):
+        """Return the (admin, instructor, student) classes for the configured engine"""
+        if self.engine == "async":
+            from async_users import AsyncAdmin, AsyncInstructor, AsyncStudent
+            return AsyncAdmin, AsyncInstructor, AsyncStudent
+        return Admin, Instructor, Student
+
     def create_users(self):
         """Create all users based on configuration"""
+        if self.controller:
+            # Each agent creates its own slice of the population, and may shard it across its own cores
+            agents = self.distributed_config["agents"]
+            if self.load_profile_config["profile"] == "saturation":
+                raise ValueError("The saturation search judges one process's metrics; run it without agents")
+            self.shards = agents  # Splits the schedule and the load profile between the agents
+            agent_config = {**self._shard_config(), "shards": self.config.get("shards", 1)}
+            plans = sharding.partition(self.user_ranges, agents)
+            self.coordinator = distributed.AgentController(agent_config, plans, self.distributed_config)
+            total = sum(stop - start for start, stop in self.user_ranges.values())
+            logger.info(f"Partitioned {total} users across {agents} agents")
+            return
+
+        if self.shards > 1:
+            # Each shard process creates its own slice of the population
+            plans = sharding.partition(self.user_ranges, self.shards)
+            self.coordinator = sharding.ShardCoordinator(run_shard, self._shard_config(), plans)
+            total = sum(stop - start for start, stop in self.user_ranges.values())
+            logger.info(f"Partitioned {total} users across {self.shards} shards")
+            return
+
         logger.info("Creating simulated users...")
+        admin_cls, instructor_cls, student_cls = self._user_classes()
+        for role, user_cls in (("admin", admin_cls), ("instructor", instructor_cls), ("student", student_cls)):
+            scenario.check_actions(role, user_cls)
 
         # Create admin users
-        for i in range(self.config["num_admins"]):
-            admin = Admin(
+        for i in range(*self.user_ranges["admin"]):
+            admin = admin_cls(
                 name=f"Admin {i + 1}",
                 email=f"admin{i + 1}@example.com",
                 password=self.config["user_passwords"]["admin"],
                 api_url=self.api_url
             )
-            self.admins.append(admin)
+            self.population.add(admin)
 
         # Create instructor users
-        for i in range(self.config["num_instructors"]):
-            instructor = Instructor(
+        for i in range(*self.user_ranges["instructor"]):
+            instructor = instructor_cls(
                 name=f"Instructor {i + 1}",
                 email=f"instructor{i + 1}@example.com",
                 password=self.config["user_passwords"]["instructor"],
@@ -591,56 +203,165 @@ class ELearningSimulator:
                 course_topics=self.config["course_topics"],
                 content_types=self.config["content_types"]
             )
-            self.instructors.append(instructor)
+            self.population.add(instructor)
 
         # Create student users
-        for i in range(self.config["num_students"]):
-            student = Student(
+        for i in range(*self.user_ranges["student"]):
+            student = student_cls(
                 name=f"Student {i + 1}",
                 email=f"student{i + 1}@example.com",
                 password=self.config["user_passwords"]["student"],
                 api_url=self.api_url
             )
-            self.students.append(student)
+            self.population.add(student)
+
+        if self.seed is not None:
+            # Seeded by email, so a user makes the same choices whichever shard owns it
+            for user in self.population.all():
+                user.rng = workload.user_rng(self.seed, user.email)
 
         logger.info(
             f"Created {len(self.admins)} admins, {len(self.instructors)} instructors, and {len(self.students)} students")
 
+    def _shard_config(self) -> Dict[str, Any]:
+        """Config handed to shard workers, which run a single process each"""
+        shard_config = {**self.config, "shards": 1}
+        if "scheduler" in self.config:
+            # Each shard offers its share of the target arrival rate
+            shard_config["scheduler"] = scheduler.scale_schedule_config(self.config["scheduler"], 1 / self.shards)
+        if "load_profile" in self.config:
+            shard_config["load_profile"] = load_profiles.scale_config(self.config["load_profile"], 1 / self.shards)
+        return shard_config
+
     def setup_users(self):
-        """Register and login all users"""
-        all_users = self.admins + self.instructors + self.students
+        """Register, login and look up the id of all users concurrently"""
+        if self.coordinator is not None:
+            # Shards register and login their own users once started, agents before the common start
+            self.coordinator.prepare()
+            return
 
-        # Register users
-        logger.info("Registering users...")
-        for user in all_users:
-            user.register()
+        all_users = self.population.all()
+        bootstrap_config = self.config.get("bootstrap")
 
-        # Login users
-        logger.info("Logging in users...")
-        for user in all_users:
-            user.login()
+        if self.engine == "async":
+            self.bootstrap_report = self._get_async_engine().setup_users(all_users, bootstrap_config)
+        else:
+            self.bootstrap_report = bootstrap.bootstrap_users(all_users, bootstrap_config)
 
     def start_simulation(self):
         """Start the simulation with all users"""
         logger.info("Starting simulation...")
         self.active = True
+        scenario.start()
 
         min_delay = self.config["min_delay"]
         max_delay = self.config["max_delay"]
 
-        # Start threads for each user
-        all_users = self.admins + self.instructors + self.students
-        for user in all_users:
-            thread = threading.Thread(
-                target=user.behave,
-                args=(min_delay, max_delay),
-                daemon=True,
-                name=f"{user.role}-{user.name}"
-            )
-            self.threads[user.name] = thread
-            thread.start()
+        if self.coordinator is not None:
+            self.coordinator.start()
+            self._start_summary_thread()
+            self._start_results_warmup()
+            exporters.start(self.config.get("exporters"), self.collect_stats, self.collect_metrics)
+            if self.load_profile_config["duration"]:
+                # Shards follow their own share of the profile; the coordinator only ends the run
+                self._start_profile_runner(None, None)
+            logger.info(f"Simulation running in {self.shards} {self.coordinator.kind}s...")
+            return
 
-        # Start a summary thread
+        all_users = self.population.all()
+        profile_config = self.load_profile_config
+        profile = None
+        if self.report_summary:
+            self._start_results_warmup()
+        if self.workload_config["record"]:
+            workload.start_recording(self.workload_config["record"], {"seed": self.seed, "engine": self.engine})
+
+        if self.workload_config["replay"]:
+            # The recorded request stream replaces generated actions
+            pattern = self.workload_config["replay"]
+            speed = self.workload_config["replay_speed"]
+            logger.info(f"Replaying {pattern} at {speed}x speed")
+            if self.engine == "async":
+                self.replayer = self._get_async_engine().start_replay(all_users, pattern, speed)
+            else:
+                self.replayer = workload.Replayer(pattern, all_users, speed,
+                                                  self.workload_config["replay_workers"])
+                self.replayer.start()
+        elif self.scheduler_config["mode"] == "open":
+            # Actions are issued at the target arrival rate by whichever user is free
+            rng = random.Random(f"{self.seed}:scheduler:{self.shard_index}") if self.seed is not None else None
+            # A load profile replaces the scheduler's own schedule; its loads are actions per second
+            profile = load_profiles.build_profile(profile_config, self.scheduler_config["rate"],
+                                                  metrics.registry.snapshot, rng=rng,
+                                                  poisson=self.scheduler_config["poisson"])
+            schedule = profile or scheduler.build_schedule(self.scheduler_config, rng)
+            if scenario.has_bursts():
+                schedule = scheduler.BurstSchedule(schedule, scenario.multiplier_at)
+            if self.engine == "async":
+                self.open_loop = self._get_async_engine().start_open_loop(
+                    all_users, schedule, self.scheduler_config["max_backlog"])
+            else:
+                self.open_loop = scheduler.OpenLoopRunner(
+                    all_users, schedule, self.scheduler_config["workers"], self.scheduler_config["max_backlog"])
+                self.open_loop.start()
+        elif profile_config["profile"] != "none":
+            # The profile decides how many users run at a time; its loads are user counts
+            profile = load_profiles.build_profile(profile_config, len(all_users), metrics.registry.snapshot)
+            self.user_controller = self._user_controller(all_users, min_delay, max_delay)
+        elif self.engine == "async":
+            # One coroutine per user on the shared event loop
+            self._get_async_engine().start_users(all_users, min_delay, max_delay)
+        else:
+            # Start threads for each user
+            for user in all_users:
+                self._start_user_thread(user, min_delay, max_delay)
+
+        if profile is not None or profile_config["duration"]:
+            self._start_profile_runner(profile, self.user_controller.set_target if self.user_controller else None)
+
+        if self.report_summary:
+            self._start_summary_thread()
+            exporters.start(self.config.get("exporters"), self.collect_stats, self.collect_metrics)
+
+        logger.info("Simulation running...")
+
+    def _start_user_thread(self, user, min_delay: int, max_delay: int) -> threading.Thread:
+        thread = threading.Thread(
+            target=user.behave,
+            args=(min_delay, max_delay),
+            daemon=True,
+            name=f"{user.role}-{user.name}"
+        )
+        self.threads[user.name] = thread
+        thread.start()
+        return thread
+
+    def _user_controller(self, users, min_delay: int, max_delay: int) -> load_profiles.UserController:
+        """Controller starting and parking closed-loop users on the configured engine"""
+        if self.engine == "async":
+            engine = self._get_async_engine()
+
+            def stop_task(user, task):
+                user.stop()
+                engine.cancel(task)
+
+            return load_profiles.UserController(
+                users, lambda user: engine.start_user(user, min_delay, max_delay),
+                lambda task: not task.done(), stop_task)
+        return load_profiles.UserController(
+            users, lambda user: self._start_user_thread(user, min_delay, max_delay),
+            lambda thread: thread.is_alive(), lambda user, thread: user.stop())
+
+    def _start_profile_runner(self, profile, apply):
+        name = self.load_profile_config["profile"]
+        duration = self.load_profile_config["duration"]
+        logger.info(f"Load profile: {name}" + (f", stopping after {duration}s" if duration else ""))
+        self.profile_runner = load_profiles.ProfileRunner(
+            profile, apply, duration, self.load_profile_config["tick"], self.finished.set)
+        self.profile_runner.start()
+
+    def _start_summary_thread(self):
+        """Start a summary thread"""
         summary_thread = threading.Thread(
             target=self._print_summary,
             daemon=True,
@@ -649,23 +370,151 @@ class ELearningSimulator:
         self.threads["summary"] = summary_thread
         summary_thread.start()
 
-        logger.info("Simulation running...")
+    def _start_results_warmup(self):
+        """Leave user setup, and then the first seconds of the run, out of its stored results"""
+        if not self.results_config["enabled"]:
+            return
+
+        self.results_baseline = self.collect_metrics()
+        if not self.results_config["warmup"]:
+            return
+
+        def mark():
+            self.results_baseline = self.collect_metrics()
+            self.results_timer = None
+
+        self.results_timer = threading.Timer(self.results_config["warmup"], mark)
+        self.results_timer.daemon = True
+        self.results_timer.start()
+
+    def save_results(self):
+        """Store the run's summary for later comparison"""
+        snapshot = self.collect_stats()["metrics"]
+        if self.results_timer is not None:
+            logger.warning("Run ended within the results warmup; storing it from its start")
+        if self.results_baseline is not None:
+            snapshot = metrics.diff_snapshots(snapshot, self.results_baseline)
+        summary = results.summarize_run(snapshot, self.config, self.results_config["label"],
+                                        {"shards": self.shards})
+        if not summary["requests"]:
+            logger.info("No requests recorded; not storing run results")
+            return
+        try:
+            path = results.save(summary, self.results_config["directory"])
+        except OSError as e:
+            logger.warning(f"Could not store run results: {e}")
+            return
+        logger.info(f"Run results stored as {summary['id']} ({path})")
+
+    def _get_async_engine(self):
+        """Start the asyncio engine on first use"""
+        if self.async_engine is None:
+            from async_users import AsyncEngine
+            self.async_engine = AsyncEngine()
+            self.async_engine.start()
+        return self.async_engine
+
+    def collect_metrics(self) -> Dict[str, Any]:
+        """Metrics snapshot alone, for periodic readers that need not walk the users or the world model"""
+        if self.coordinator is not None:
+            return metrics.merge_snapshots([stats["metrics"] for stats in self.coordinator.shard_stats()])
+        return metrics.registry.snapshot()
+
+    def collect_stats(self) -> Dict[str, Any]:
+        """Snapshot of this process's activity, or the merged shard stats when sharded"""
+        if self.coordinator is not None:
+            return merge_stats(self.coordinator.shard_stats())
+
+        stats = {
+            "users": self.population.activity_counts(),
+            "connections": http_pool.stats.snapshot(),
+            "metrics": metrics.registry.snapshot(),
+            "resilience": resilience.stats(),
+            "codec": codec.stats.snapshot(),
+            "world": world_model.model.stats()
+        }
+        if profiling.enabled():
+            stats["profile"] = profiling.stats.snapshot()
+        if self.open_loop is not None:
+            stats["scheduler"] = self.open_loop.stats()
+        if catalog_cache.enabled():
+            stats["catalog"] = catalog_cache.stats()
+        if self.replayer is not None:
+            stats["replay"] = self.replayer.stats()
+        if media.enabled():
+            stats["media"] = media.stats.snapshot()
+        if self.profile_runner is not None:
+            stats["load"] = self.profile_runner.stats()
+            if self.user_controller is not None:
+                stats["load"].update(self.user_controller.stats())
+        return stats
 
     def _print_summary(self):
         """Print a summary of activity periodically"""
+        previous = metrics.empty_snapshot()
+        previous_media = {}
         while self.active:
-            time.sleep(60)  # Every minute
-            all_users = self.admins + self.instructors + self.students
+            time.sleep(self.summary_interval)
+            stats = self.collect_stats()
+            users = stats["users"]
 
-            active_users = sum(1 for user in all_users if user.last_activity is not None)
+            active_users = sum(active for active, _ in users.values())
+            total_users = sum(total for _, total in users.values())
 
             logger.info(f"--- ACTIVITY SUMMARY ---")
-            logger.info(f"Active users: {active_users}/{len(all_users)}")
-            logger.info(f"- Admins: {sum(1 for u in self.admins if u.last_activity is not None)}/{len(self.admins)}")
+            if self.coordinator is not None:
+                logger.info(f"{self.coordinator.kind.capitalize()}s reporting: "
+                            f"{len(self.coordinator.shard_stats())}/{self.shards}")
+            logger.info(f"Active users: {active_users}/{total_users}")
+            logger.info(f"- Admins: {users['admin'][0]}/{users['admin'][1]}")
+            logger.info(f"- Instructors: {users['instructor'][0]}/{users['instructor'][1]}")
+            logger.info(f"- Students: {users['student'][0]}/{users['student'][1]}")
+            connections = stats["connections"]
+            logger.info(f"Connections: {connections['created']} created, {connections['reused']} reused")
+            if "scheduler" in stats:
+                sched = stats["scheduler"]
+                logger.info(
+                    f"Open loop: {sched['issued']} issued, {sched['dropped']} dropped, backlog {sched['backlog']}, "
+                    f"start lag p50 {sched['lag_p50']:.1f}ms p99 {sched['lag_p99']:.1f}ms")
+            if "catalog" in stats:
+                catalog = stats["catalog"]
+                lookups = catalog["hits"] + catalog["misses"]
+                hit_rate = catalog["hits"] / lookups if lookups else 0.0
+                logger.info(f"Catalog cache: {catalog['hits']} hits, {catalog['misses']} misses ({hit_rate:.0%})")
+            if "replay" in stats:
+                logger.info(f"Replay: {stats['replay']['issued']} issued, {stats['replay']['skipped']} skipped")
+            world = stats["world"]
+            violations = sum(world["violations"].values())
             logger.info(
-                f"- Instructors: {sum(1 for u in self.instructors if u.last_activity is not None)}/{len(self.instructors)}")
+                f"World model: {world['courses']} courses, {world['enrollments']} enrollments, "
+                f"{world['content']} content items; {violations} inconsistencies in {world['checks']} checked responses")
+            for kind, count in sorted(world["violations"].items()):
+                logger.info(f"- {kind}: {count}")
+            bodies = stats["codec"]
             logger.info(
-                f"- Students: {sum(1 for u in self.students if u.last_activity is not None)}/{len(self.students)}")
+                f"Response bodies ({bodies['backend']}): {bodies['received_bytes'] / 1024:.0f} KiB received, "
+                f"{bodies['decoded']} decoded, {bodies['deferred']} left undecoded, {bodies['skipped']} skipped")
+            guard = stats["resilience"]
+            tripped = {key: state for key, state in guard["breakers"].items() if state != resilience.CLOSED}
+            if tripped or guard["rejected"] or guard["shed"] or guard["retries"]:
+                limit = f", in-flight limit {guard['limit']}" if "limit" in guard else ""
+                logger.info(
+                    f"Resilience: {len(tripped)} breakers not closed, {guard['rejected']} rejected, "
+                    f"{guard['shed']} shed, {guard['retries']} retries{limit}")
+                for key, state in sorted(tripped.items()):
+                    logger.info(f"- {key}: {state}")
+            if "media" in stats:
+                for line in media.summary_lines(stats["media"], previous_media, self.summary_interval):
+                    logger.info(line)
+                previous_media = stats["media"]
+            if "load" in stats:
+                load = stats["load"]
+                running = f", {load['running']} users running" if "running" in load else ""
+                logger.info(f"Load profile: load {load['load']:.1f}{running}")
+            # Latency and throughput over the last interval
+            for line in metrics.format_summary(metrics.summarize(metrics.diff_snapshots(stats["metrics"], previous))):
+                logger.info(line)
+            previous = stats["metrics"]
             logger.info(f"-----------------------")
 
     def stop_simulation(self):
@@ -673,44 +522,220 @@ class ELearningSimulator:
         logger.info("Stopping simulation...")
         self.active = False
 
+        exporters.stop()
+        if self.results_timer is not None:
+            self.results_timer.cancel()
+        if self.profile_runner is not None:
+            self.profile_runner.stop()
+        if self.coordinator is not None:
+            self.coordinator.stop()
+
+        if self.open_loop is not None:
+            self.open_loop.stop()
+        if self.replayer is not None:
+            self.replayer.stop()
+
         # Stop all user behaviors
-        all_users = self.admins + self.instructors + self.students
+        all_users = self.population.all()
         for user in all_users:
             user.stop()
 
+        if self.async_engine is not None:
+            self.async_engine.stop()
+        fanout.close()
+        http_pool.close()
+        credential_cache.save()  # Keep tokens renewed during the run
+        workload.stop_recording()
+
         # Wait for threads to finish
         for name, thread in self.threads.items():
             if thread.is_alive():
                 logger.info(f"Waiting for thread {name} to finish...")
                 thread.join(timeout=2)
 
+        log_stats = log_pipeline.stats()
+        if log_stats["dropped"] or log_stats["suppressed"]:
+            logger.info(f"Log records: {log_stats['suppressed']} sampled out, {log_stats['dropped']} dropped (queue full)")
+        profiling.stop_profiler()
+        if self.report_summary and profiling.enabled():
+            stats = self.collect_stats()
+            if "profile" in stats:
+                for line in profiling.report_lines(stats["profile"]):
+                    logger.info(line)
+        if self.report_summary and self.results_config["enabled"]:
+            self.save_results()
         logger.info("Simulation stopped")
 
 
+def merge_stats(snapshots: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine collect_stats() snapshots from several shards"""
+    merged = {
+        "users": {role: [0, 0] for role in sharding.ROLES},
+        "connections": {"created": 0, "reused": 0}
+    }
+    for snapshot in snapshots:
+        for role, (active, total) in snapshot["users"].items():
+            merged["users"][role][0] += active
+            merged["users"][role][1] += total
+        for key, value in snapshot["connections"].items():
+            merged["connections"][key] += value
+    merged["metrics"] = metrics.merge_snapshots([snapshot["metrics"] for snapshot in snapshots])
+    merged["resilience"] = resilience.merge_stats([snapshot["resilience"] for snapshot in snapshots])
+    merged["world"] = world_model.merge_stats([snapshot["world"] for snapshot in snapshots])
+    merged["codec"] = {"backend": snapshots[0]["codec"]["backend"] if snapshots else codec.backend}
+    for key in ("received_bytes", "decoded", "decoded_bytes", "deferred", "skipped", "skipped_bytes"):
+        merged["codec"][key] = sum(snapshot["codec"][key] for snapshot in snapshots)
+    schedulers = [snapshot["scheduler"] for snapshot in snapshots if "scheduler" in snapshot]
+    if schedulers:
+        merged["scheduler"] = {
+            "issued": sum(s["issued"] for s in schedulers),
+            "dropped": sum(s["dropped"] for s in schedulers),
+            "backlog": sum(s["backlog"] for s in schedulers),
+            # Shard lag histograms are not shipped; report the worst shard
+            "lag_p50": max(s["lag_p50"] for s in schedulers),
+            "lag_p99": max(s["lag_p99"] for s in schedulers)
+        }
+    catalogs = [snapshot["catalog"] for snapshot in snapshots if "catalog" in snapshot]
+    if catalogs:
+        merged["catalog"] = {key: sum(c[key] for c in catalogs) for key in ("hits", "misses", "entries")}
+    replays = [snapshot["replay"] for snapshot in snapshots if "replay" in snapshot]
+    if replays:
+        # Every shard reads the whole log and skips the entries of users it does not own
+        issued = sum(r["issued"] for r in replays)
+        read = min(r["issued"] + r["skipped"] for r in replays)
+        merged["replay"] = {"issued": issued, "skipped": max(0, read - issued)}
+    streams = [snapshot["media"] for snapshot in snapshots if "media" in snapshot]
+    if streams:
+        merged["media"] = media.merge_stats(streams)
+    profiles = [snapshot["profile"] for snapshot in snapshots if "profile" in snapshot]
+    if profiles:
+        merged["profile"] = profiling.merge_stats(profiles)
+    loads = [snapshot["load"] for snapshot in snapshots if "load" in snapshot]
+    if loads:
+        merged["load"] = {key: sum(load[key] for load in loads) for key in loads[0] if key != "saturation"}
+    return merged
+
+
+def run_shard(config: Dict[str, Any], index: int, user_ranges: Dict[str, Tuple[int, int]],
+              stop_event, stats_queue, report_interval: float = 5):
+    """Entry point of a shard worker process"""
+    # Ctrl-C is handled by the coordinator, which stops shards through stop_event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    workload_config = config.get("workload") or {}
+    if workload_config.get("record"):
+        # One action log per shard; replay them together with a glob such as "workload.jsonl.*"
+        config = {**config, "workload": {**workload_config, "record": f"{workload_config['record']}.{index}"}}
+
+    simulator = ELearningSimulator(config=config)
+    profiling.install_signal()
+    simulator.user_ranges = user_ranges
+    simulator.shard_index = index
+    simulator.report_summary = False
+    simulator.create_users()
+    simulator.setup_users()
+    # The shard's user setup stays out of the run's metrics
+    baseline = simulator.collect_stats()["metrics"]
+    simulator.start_simulation()
+
+    def report():
+        stats = simulator.collect_stats()
+        stats["metrics"] = metrics.diff_snapshots(stats["metrics"], baseline)
+        stats_queue.put((index, stats))
+
+    try:
+        while not stop_event.wait(report_interval):
+            report()
+    finally:
+        simulator.stop_simulation()
+        report()
+
+
+def agent_simulator(config: Dict[str, Any], index: int, user_ranges: Dict[str, Tuple[int, int]]):
+    """Simulator of a distributed-mode agent, for the users its controller assigned"""
+    workload_config = config.get("workload") or {}
+    if workload_config.get("record"):
+        config = {**config, "workload": {**workload_config, "record": f"{workload_config['record']}.agent{index}"}}
+
+    simulator = ELearningSimulator(config=config)
+    profiling.install_signal()
+    simulator.user_ranges = user_ranges
+    simulator.shard_index = index
+    simulator.report_summary = False  # The controller reports for the whole run
+    return simulator
+
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="E-Learning Platform Simulator")
+    parser.add_argument("config", nargs="?", default="config.yaml", help="Config file")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Report the time spent in each startup phase once the simulation has started")
+    parser.add_argument("--startup-budget", type=float, default=None, metavar="SECONDS",
+                        help="Warn when startup takes longer than this")
+    parser.add_argument("--no-config-cache", action="store_true", help="Always parse the YAML config")
+    parser.add_argument("--controller", action="store_true",
+                        help="Run the users on agents (see the distributed section) and report for all of them")
+    parser.add_argument("--agents", type=int, default=None, help="Agents the controller waits for")
+    parser.add_argument("--agent", default=None, metavar="HOST:PORT",
+                        help="Run as an agent of the controller at HOST:PORT; the config comes from the controller")
+    parser.add_argument("--token", default=None,
+                        help="Shared token of a controller and its agents (default: $SIMULATOR_AGENT_TOKEN)")
+    parser.add_argument("--label", default=None, help="Label stored with the run's results, e.g. the version under test")
+    parser.add_argument("--sample-profile", type=float, default=None, metavar="SECONDS",
+                        help="Run the sampling profiler for this long from the start of the simulation (0: until stopped)")
+    return parser.parse_args(argv)
+
+
 def main():
     """Main function to run the simulator"""
     try:
+        profiler = startup.StartupProfiler(_IMPORTS_STARTED)
+        profiler.record("imports", time.perf_counter() - _IMPORTS_STARTED)
+        args = parse_args()
+        if args.agent:
+            host, _, port = args.agent.rpartition(":")
+            logger.info("Starting E-Learning Platform Simulator agent")
+            return distributed.run_agent(host or "127.0.0.1", int(port), agent_simulator, token=args.token)
         logger.info("Starting E-Learning Platform Simulator")
 
-        # Read config path from command line
-        config_path = "config.yaml"
-        if len(sys.argv) > 1:
-            config_path = sys.argv[1]
-
         # Initialize and run simulator
-        simulator = ELearningSimulator(config_path)
+        started = time.perf_counter()
+        simulator = ELearningSimulator(args.config, config_cache=not args.no_config_cache)
+        if args.label:
+            simulator.results_config["label"] = args.label
+        if args.controller:
+            simulator.controller = True
+            if args.agents:
+                simulator.distributed_config["agents"] = args.agents
+            if args.token:
+                simulator.distributed_config["token"] = args.token
+        # The profiling signal also reaches the shards, which profile themselves
+        profiling.install_signal(lambda signum: simulator.coordinator and simulator.coordinator.signal(signum))
+        profiler.record("config", time.perf_counter() - started, f"config from {simulator.config_source}")
 
         # Create and setup users
-        simulator.create_users()
-        simulator.setup_users()
+        with profiler.phase("create users"):
+            simulator.create_users()
+        with profiler.phase("setup users", "backend round trips"):
+            simulator.setup_users()
 
         # Start simulation
-        simulator.start_simulation()
-
-        # Keep the main thread running until interrupted
+        with profiler.phase("start simulation"):
+            simulator.start_simulation()
+        if args.sample_profile is not None:
+            profiling.toggle_profiler(args.sample_profile)
+
+        if args.profile_startup:
+            for line in profiler.report(args.startup_budget):
+                logger.info(line)
+        if profiler.over_budget(args.startup_budget):
+            logger.warning(f"Startup took {profiler.total():.2f}s, over the {args.startup_budget}s budget")
+
+        # Keep the main thread running until interrupted or the load profile ends the run
         try:
-            while True:
-                time.sleep(1)
+            while not simulator.finished.wait(1):
+                pass
+            simulator.stop_simulation()
         except KeyboardInterrupt:
             logger.info("Received keyboard interrupt, stopping simulation...")
             simulator.stop_simulation()
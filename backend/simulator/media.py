@@ -0,0 +1,258 @@
+"""
+Lesson media streaming for the E-Learning Platform Simulator
+Fetches the media behind a content item the way a player does, as range-requested segments or one
+streamed download read at the content type's bitrate, and reports time to first byte and bytes per second
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+import http_pool
+from metrics import LatencyHistogram
+
+logger = logging.getLogger("elearning-simulator")
+
+# Defaults for the "media" section of config.yaml
+DEFAULT_MEDIA_CONFIG = {
+    "enabled": False,
+    "base_url": None,         # Replaces the scheme and host of content URLs, e.g. a local stand-in; None fetches them as is
+    "probability": 1.0,       # Share of progress actions that stream the content first
+    "mode": "range",          # range: successive Range requests of segment_bytes | stream: one GET read incrementally
+    "segment_bytes": 1048576,  # Range mode: bytes per request
+    "chunk_size": 65536,      # Bytes per socket read; the bitrate is enforced at this granularity
+    "timeout": 30,            # Seconds to connect and between reads; a slow stream is not cut off as a whole
+    "types": {                # Per content type: bitrate (0 = as fast as possible) and bytes read per view (0 = all)
+        "video": {"bitrate_kbps": 2500, "max_bytes": 4194304},
+        "pdf": {"bitrate_kbps": 0, "max_bytes": 2097152},
+        "default": {"bitrate_kbps": 0, "max_bytes": 524288}
+    }
+}
+
+MODES = ("range", "stream")
+
+_config = dict(DEFAULT_MEDIA_CONFIG)
+
+
+class Transfer:
+    """Progress of one media fetch: bytes read, time to first byte and the pacing that holds it to its bitrate"""
+
+    __slots__ = ("kind", "limit", "bytes_per_second", "started", "first_byte_at", "received")
+
+    def __init__(self, kind: str, limit: int, bitrate_kbps: float):
+        self.kind = kind
+        self.limit = limit  # 0 = read until the end of the file
+        self.bytes_per_second = bitrate_kbps * 125
+        self.started = time.perf_counter()
+        self.first_byte_at = None
+        self.received = 0
+
+    def add(self, size: int) -> float:
+        """Count a chunk; returns the seconds to wait before reading on to stay at the bitrate"""
+        now = time.perf_counter()
+        if self.first_byte_at is None:
+            self.first_byte_at = now
+        self.received += size
+        stats.add_bytes(self.kind, size)
+        if not self.bytes_per_second:
+            return 0.0
+        # Playback starts with the first byte; read no further ahead of it than the bitrate allows
+        return max(0.0, self.first_byte_at + self.received / self.bytes_per_second - now)
+
+    def remaining(self) -> Optional[int]:
+        """Bytes still to read, or None when the whole file is wanted"""
+        return self.limit - self.received if self.limit else None
+
+    def done(self) -> bool:
+        return bool(self.limit) and self.received >= self.limit
+
+    def next_range(self) -> str:
+        """Range header of the next segment"""
+        size = _config["segment_bytes"]
+        if self.limit:
+            size = min(size, self.limit - self.received)
+        return f"bytes={self.received}-{self.received + size - 1}"
+
+    def trim(self, chunk: bytes) -> bytes:
+        """Drop the part of a chunk past the byte limit"""
+        remaining = self.remaining()
+        return chunk if remaining is None or len(chunk) <= remaining else chunk[:remaining]
+
+
+class MediaStats:
+    """Thread-safe per-content-type fetch counts, bytes, transfer time and time-to-first-byte histograms"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.types: Dict[str, Dict[str, Any]] = {}
+
+    def _entry(self, kind: str) -> Dict[str, Any]:
+        entry = self.types.get(kind)
+        if entry is None:
+            entry = self.types[kind] = {"fetches": 0, "failed": 0, "bytes": 0, "seconds": 0.0,
+                                        "ttfb": LatencyHistogram()}
+        return entry
+
+    def add_bytes(self, kind: str, size: int):
+        """Count bytes as they arrive, so a long stream shows up in every interval it spans"""
+        with self._lock:
+            self._entry(kind)["bytes"] += size
+
+    def record(self, transfer: Transfer, ok: bool):
+        """Count a finished fetch"""
+        elapsed = time.perf_counter() - transfer.started
+        with self._lock:
+            entry = self._entry(transfer.kind)
+            entry["fetches"] += 1
+            entry["failed"] += 0 if ok else 1
+            entry["seconds"] += elapsed
+            if transfer.first_byte_at is not None:
+                entry["ttfb"].record(int((transfer.first_byte_at - transfer.started) * 1_000_000))
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {kind: {**entry, "ttfb": entry["ttfb"].to_dict()} for kind, entry in self.types.items()}
+
+
+stats = MediaStats()
+
+
+def configure(config: Dict[str, Any] = None):
+    """Apply the "media" config section"""
+    global _config
+    merged = {**DEFAULT_MEDIA_CONFIG, **(config or {})}
+    merged["types"] = {**DEFAULT_MEDIA_CONFIG["types"], **((config or {}).get("types") or {})}
+    if merged["mode"] not in MODES:
+        raise ValueError(f"Unknown media mode '{merged['mode']}', expected {' or '.join(MODES)}")
+    _config = merged
+
+
+def enabled() -> bool:
+    return _config["enabled"]
+
+
+def wanted(rng) -> bool:
+    """Whether this progress action streams its content"""
+    return _config["enabled"] and rng.random() < _config["probability"]
+
+
+def content_url(url: Optional[str]) -> Optional[str]:
+    """URL of a content item's media, moved to base_url when one is set"""
+    if not url or not _config["base_url"]:
+        return url
+    parts = urlsplit(url)
+    return _config["base_url"].rstrip("/") + parts.path + (f"?{parts.query}" if parts.query else "")
+
+
+def _transfer(kind: str) -> Transfer:
+    settings = _config["types"].get(kind) or _config["types"]["default"]
+    return Transfer(kind, settings.get("max_bytes", 0), settings.get("bitrate_kbps", 0))
+
+
+def fetch(kind: str, url: str, keep_going: Callable[[], bool]) -> bool:
+    """Stream a media file on the threaded engine's pooled session; returns whether it succeeded"""
+    transfer = _transfer(kind)
+    session = http_pool.get_session()
+    timeout = _config["timeout"]
+    ok = False
+    try:
+        while keep_going() and not transfer.done():
+            headers = {"Range": transfer.next_range()} if _config["mode"] == "range" else None
+            with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+                if response.status_code == 416:  # Asked past the end of the file
+                    ok = True
+                    break
+                if response.status_code >= 400:
+                    logger.warning("Media fetch of %s failed with status %s", url, response.status_code)
+                    break
+                read_before = transfer.received
+                for chunk in response.iter_content(_config["chunk_size"]):
+                    delay = transfer.add(len(transfer.trim(chunk)))
+                    if transfer.done() or not keep_going():
+                        break
+                    if delay:
+                        time.sleep(delay)
+            ok = True
+            # A full (200) response, a short segment or the single streamed GET ends the file
+            if response.status_code != 206 or _config["mode"] == "stream" \
+                    or transfer.received - read_before < _config["segment_bytes"]:
+                break
+    except http_pool.RequestException as e:
+        logger.warning("Media fetch of %s failed: %s", url, e)
+        ok = False
+    stats.record(transfer, ok)
+    return ok
+
+
+async def fetch_async(session, kind: str, url: str, keep_going: Callable[[], bool]) -> bool:
+    """Coroutine version of fetch for the async engine, on the user's aiohttp session"""
+    import asyncio
+
+    import aiohttp
+
+    transfer = _transfer(kind)
+    # The session's total timeout would cut off a long paced stream; bound each read instead
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=_config["timeout"], sock_read=_config["timeout"])
+    ok = False
+    try:
+        while keep_going() and not transfer.done():
+            headers = {"Range": transfer.next_range()} if _config["mode"] == "range" else None
+            async with session.get(url, headers=headers, timeout=timeout) as response:
+                if response.status == 416:
+                    ok = True
+                    break
+                if response.status >= 400:
+                    logger.warning("Media fetch of %s failed with status %s", url, response.status)
+                    break
+                read_before = transfer.received
+                async for chunk in response.content.iter_chunked(_config["chunk_size"]):
+                    delay = transfer.add(len(transfer.trim(chunk)))
+                    if transfer.done() or not keep_going():
+                        break
+                    if delay:
+                        await asyncio.sleep(delay)
+            ok = True
+            if response.status != 206 or _config["mode"] == "stream" \
+                    or transfer.received - read_before < _config["segment_bytes"]:
+                break
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.warning("Media fetch of %s failed: %s", url, e)
+        ok = False
+    stats.record(transfer, ok)
+    return ok
+
+
+def summary_lines(snapshot: Dict[str, Any], previous: Dict[str, Any], interval: float):
+    """Summary of media streamed in total and per content type; previous is the last interval's snapshot"""
+    total = sum(entry["bytes"] for entry in snapshot.values())
+    rate = (total - sum(entry["bytes"] for entry in previous.values())) / interval
+    fetches = sum(entry["fetches"] for entry in snapshot.values())
+    failed = sum(entry["failed"] for entry in snapshot.values())
+    lines = [f"Media: {fetches} fetches ({failed} failed), {total / 1048576:.1f} MiB, "
+             f"{rate / 1048576:.2f} MiB/s over the interval"]
+    for kind, entry in sorted(snapshot.items()):
+        ttfb = LatencyHistogram.from_dict(entry["ttfb"])
+        # Bytes of finished and running fetches over the time of finished ones; close enough once many finished
+        per_stream = entry["bytes"] / entry["seconds"] if entry["seconds"] else 0.0
+        lines.append(f"- {kind}: {entry['fetches']} fetches, {per_stream / 1024:.0f} KiB/s per stream, "
+                     f"TTFB p50 {ttfb.percentile(0.5) / 1000:.1f}ms p99 {ttfb.percentile(0.99) / 1000:.1f}ms")
+    return lines
+
+
+def merge_stats(snapshots) -> Dict[str, Any]:
+    """Combine stats.snapshot() from several shards"""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for snapshot in snapshots:
+        for kind, entry in snapshot.items():
+            target = merged.setdefault(kind, {"fetches": 0, "failed": 0, "bytes": 0, "seconds": 0.0,
+                                              "ttfb": LatencyHistogram()})
+            for key in ("fetches", "failed", "bytes", "seconds"):
+                target[key] += entry[key]
+            target["ttfb"].merge(LatencyHistogram.from_dict(entry["ttfb"]))
+    return {kind: {**entry, "ttfb": entry["ttfb"].to_dict()} for kind, entry in merged.items()}
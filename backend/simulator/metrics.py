@@ -0,0 +1,273 @@
+"""
+Request metrics for the E-Learning Platform Simulator
+Per-endpoint latency histograms with bounded memory, plus throughput and error-rate reporting
+"""
+
+import re
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+# Log-linear buckets: 2**SUB_BUCKET_BITS buckets per power of two, about 3% relative error
+SUB_BUCKET_BITS = 5
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+
+# Path segments that identify a single resource and are collapsed to ":id"
+_ID_SEGMENT = re.compile(r"^(\d+|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}|[^/@]+@[^/@]+)$")
+
+SeriesKey = Tuple[str, str, int]  # (method, normalized endpoint, status); status 0 = no response
+
+# Series that time a group of requests (e.g. a notification fan-out) rather than a single one
+AGGREGATE_METHODS = ("FANOUT",)
+
+
+def bucket_index(value: int) -> int:
+    """Bucket holding a non-negative integer value"""
+    if value < SUB_BUCKET_COUNT:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return (shift + 1) * SUB_BUCKET_COUNT + (value >> shift) - SUB_BUCKET_COUNT
+
+
+def bucket_range(index: int) -> Tuple[int, int]:
+    """Lowest and highest value stored in a bucket"""
+    if index < SUB_BUCKET_COUNT:
+        return index, index
+    shift = index // SUB_BUCKET_COUNT - 1
+    lowest = (index % SUB_BUCKET_COUNT + SUB_BUCKET_COUNT) << shift
+    return lowest, lowest + (1 << shift) - 1
+
+
+def bucket_value(index: int) -> int:
+    """Representative (midpoint) value of a bucket"""
+    lowest, highest = bucket_range(index)
+    return (lowest + highest) // 2
+
+
+def normalize_endpoint(endpoint: str) -> str:
+    """Collapse ids in an endpoint so `courses/123` becomes `courses/:id`"""
+    path = endpoint.split("?", 1)[0].strip("/")
+    return "/".join(":id" if _ID_SEGMENT.match(segment) else segment for segment in path.split("/"))
+
+
+class LatencyHistogram:
+    """Sparse HDR-style histogram of latencies in microseconds"""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = {}  # Bucket index -> number of samples
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value_us: int):
+        index = bucket_index(value_us)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value_us
+        if value_us > self.max:
+            self.max = value_us
+
+    def merge(self, other: "LatencyHistogram"):
+        for index, n in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def subtract(self, earlier: "LatencyHistogram") -> "LatencyHistogram":
+        """Histogram of the samples recorded since `earlier` was copied from this one"""
+        delta = LatencyHistogram()
+        for index, n in self.counts.items():
+            n -= earlier.counts.get(index, 0)
+            if n > 0:
+                delta.counts[index] = n
+        delta.count = self.count - earlier.count
+        delta.total = self.total - earlier.total
+        # The exact interval maximum is not kept; use the highest bucket that moved
+        delta.max = min(self.max, bucket_range(max(delta.counts))[1]) if delta.counts else 0
+        return delta
+
+    def percentile(self, q: float) -> int:
+        """Value at quantile q (0-1) in microseconds"""
+        if not self.count:
+            return 0
+        rank = max(1, int(q * self.count + 0.5))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(bucket_value(index), self.max)
+        return self.max
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"counts": dict(self.counts), "count": self.count, "total": self.total, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencyHistogram":
+        histogram = cls()
+        histogram.counts = {int(index): n for index, n in data["counts"].items()}
+        histogram.count = data["count"]
+        histogram.total = data["total"]
+        histogram.max = data["max"]
+        return histogram
+
+
+class MetricsRegistry:
+    """Thread-safe store of one latency histogram per (method, endpoint, status)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.roles = {}  # Role -> [requests, errors]
+        self.started = time.time()
+
+    def record(self, method: str, endpoint: str, status: int, latency: float, role: str = None):
+        """Record one request; latency is in seconds"""
+        key = (method.upper(), normalize_endpoint(endpoint), status)
+        value_us = int(latency * 1_000_000) if latency > 0 else 0
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = LatencyHistogram()
+            histogram.record(value_us)
+            if role is not None:
+                counts = self.roles.get(role)
+                if counts is None:
+                    counts = self.roles[role] = [0, 0]
+                counts[0] += 1
+                if is_error(status):
+                    counts[1] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Cumulative, picklable copy of every series"""
+        with self._lock:
+            series = {key: histogram.to_dict() for key, histogram in self.histograms.items()}
+            roles = {role: list(counts) for role, counts in self.roles.items()}
+        return {"started": self.started, "taken": time.time(), "series": series, "roles": roles}
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+            self.roles = {}
+            self.started = time.time()
+
+
+registry = MetricsRegistry()
+
+
+def empty_snapshot() -> Dict[str, Any]:
+    now = time.time()
+    return {"started": now, "taken": now, "series": {}, "roles": {}}
+
+
+def merge_snapshots(snapshots: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine snapshots taken in different processes"""
+    if not snapshots:
+        return empty_snapshot()
+    merged = {}
+    roles = {}
+    for snapshot in snapshots:
+        for key, data in snapshot["series"].items():
+            histogram = LatencyHistogram.from_dict(data)
+            if key in merged:
+                merged[key].merge(histogram)
+            else:
+                merged[key] = histogram
+        for role, (requests, errors) in snapshot.get("roles", {}).items():
+            counts = roles.setdefault(role, [0, 0])
+            counts[0] += requests
+            counts[1] += errors
+    return {
+        "started": min(s["started"] for s in snapshots),
+        "taken": max(s["taken"] for s in snapshots),
+        "series": {key: histogram.to_dict() for key, histogram in merged.items()},
+        "roles": roles
+    }
+
+
+def diff_snapshots(current: Dict[str, Any], previous: Dict[str, Any]) -> Dict[str, Any]:
+    """Samples recorded between two cumulative snapshots"""
+    series = {}
+    for key, data in current["series"].items():
+        histogram = LatencyHistogram.from_dict(data)
+        if key in previous["series"]:
+            histogram = histogram.subtract(LatencyHistogram.from_dict(previous["series"][key]))
+        if histogram.count:
+            series[key] = histogram.to_dict()
+    roles = {}
+    for role, (requests, errors) in current.get("roles", {}).items():
+        before = previous.get("roles", {}).get(role, (0, 0))
+        roles[role] = [requests - before[0], errors - before[1]]
+    # Samples cannot predate the current snapshot, e.g. shards that started after the baseline was taken
+    started = max(previous["taken"], current["started"])
+    return {"started": started, "taken": current["taken"], "series": series, "roles": roles}
+
+
+def is_error(status: int) -> bool:
+    return status == 0 or status >= 400
+
+
+def overall(snapshot: Dict[str, Any]) -> Tuple[LatencyHistogram, int]:
+    """Latency histogram and error count of every individual request in a snapshot"""
+    histogram = LatencyHistogram()
+    errors = 0
+    for (method, _, status), data in snapshot["series"].items():
+        if method in AGGREGATE_METHODS:
+            continue
+        series = LatencyHistogram.from_dict(data)
+        histogram.merge(series)
+        if is_error(status):
+            errors += series.count
+    return histogram, errors
+
+
+def summarize(snapshot: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Per-endpoint throughput, error rate and latency quantiles (ms) for a snapshot"""
+    elapsed = max(snapshot["taken"] - snapshot["started"], 1e-9)
+    endpoints = {}
+    for (method, endpoint, status), data in snapshot["series"].items():
+        histogram = LatencyHistogram.from_dict(data)
+        entry = endpoints.setdefault((method, endpoint), [LatencyHistogram(), 0])
+        entry[0].merge(histogram)
+        if is_error(status):
+            entry[1] += histogram.count
+
+    rows = []
+    for (method, endpoint), (histogram, errors) in sorted(endpoints.items(), key=lambda item: -item[1][0].count):
+        rows.append({
+            "method": method,
+            "endpoint": endpoint,
+            "count": histogram.count,
+            "rps": histogram.count / elapsed,
+            "error_rate": errors / histogram.count,
+            "p50": histogram.percentile(0.50) / 1000,
+            "p95": histogram.percentile(0.95) / 1000,
+            "p99": histogram.percentile(0.99) / 1000,
+            "max": histogram.max / 1000
+        })
+    return rows
+
+
+def format_summary(rows: List[Dict[str, Any]]) -> List[str]:
+    """Render summarize() rows as aligned text lines"""
+    if not rows:
+        return ["No requests recorded"]
+    requests = [row for row in rows if row["method"] not in AGGREGATE_METHODS]
+    total = sum(row["count"] for row in requests)
+    errors = sum(row["count"] * row["error_rate"] for row in requests)
+    rps = sum(row["rps"] for row in requests)
+    lines = [
+        f"Requests: {total} ({rps:.1f} req/s), error rate {errors / total if total else 0.0:.1%}",
+        f"{'endpoint':<34} {'count':>7} {'req/s':>7} {'err':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"
+    ]
+    for row in rows:
+        name = f"{row['method']} {row['endpoint']}"
+        lines.append(
+            f"{name:<34} {row['count']:>7} {row['rps']:>7.1f} {row['error_rate']:>6.1%} "
+            f"{row['p50']:>6.1f}ms {row['p95']:>6.1f}ms {row['p99']:>6.1f}ms {row['max']:>6.1f}ms")
+    return lines
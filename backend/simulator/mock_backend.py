@@ -0,0 +1,363 @@
+"""
+In-process mock of the E-Learning Platform API
+Serves the routes the simulator uses from memory, with configurable latency, so the simulator can be
+benchmarked without the Node/DB stack
+"""
+
+import argparse
+import asyncio
+import base64
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict
+
+from aiohttp import web
+
+logger = logging.getLogger("elearning-simulator")
+
+# Courses returned by GET courses; the real backend returns all of them, which makes a long
+# benchmark slower the longer it runs
+MAX_LISTED_COURSES = 100
+
+# Size of the generated file behind /media/<kind>/..., when no media directory is served
+MEDIA_SIZES = {"video": 64 * 1048576, "pdf": 4 * 1048576}
+DEFAULT_MEDIA_SIZE = 512 * 1024
+MEDIA_CHUNK = 65536
+_MEDIA_PATTERN = bytes(range(256)) * (MEDIA_CHUNK // 256)
+
+
+def _token(user_id: int, ttl: float) -> str:
+    """Unsigned JWT-shaped token; the simulator only reads its expiry"""
+    def encode(data):
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+    return f"{encode({'alg': 'none'})}.{encode({'userId': user_id, 'exp': int(time.time() + ttl)})}.mock"
+
+
+def _success(data: Any = None, status: int = 200, message: str = "OK", meta: Dict[str, Any] = None) -> web.Response:
+    body = {"status": "success", "statusCode": status, "message": message, "data": data, "meta": meta, "links": None}
+    return web.json_response(body, status=status)
+
+
+def _error(status: int, message: str) -> web.Response:
+    return web.json_response({"status": "error", "statusCode": status, "message": message}, status=status)
+
+
+class MockBackend:
+    """aiohttp server running the mock API on its own event loop thread"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 route_latency_ms: Dict[str, float] = None, token_ttl: float = 3600, media_root: str = None):
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.route_latency_ms = route_latency_ms or {}  # e.g. "GET courses/{id}" -> ms, overriding latency_ms
+        self.token_ttl = token_ttl
+        self.media_root = media_root  # Directory served under /media; None serves generated bytes
+        self.rng = random.Random()
+        self.ids = itertools.count(1)
+        self.users = {}          # Email -> user
+        self.users_by_id = {}
+        self.courses = {}        # Id -> course
+        self.content = {}        # Course id -> content items
+        self.enrollments = {}    # Course id -> enrollments
+        self.notifications = {}  # User id -> notifications
+        self.progress = set()    # (user id, course id, content id)
+        self.requests = 0
+        self.loop = None
+        self.thread = None
+        self.runner = None
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self._latency])
+        app.add_routes([
+            web.post("/api/users/register", self.register),
+            web.post("/api/users/bulk", self.register_bulk),
+            web.post("/api/users/login", self.login),
+            web.get("/api/users/email", self.user_by_email),
+            web.get("/api/users", self.list_users),
+            web.get("/api/courses", self.list_courses),
+            web.post("/api/courses", self.create_course),
+            web.post("/api/courses/bulk", self.create_courses),
+            web.get("/api/courses/{id}", self.get_course),
+            web.put("/api/courses/{id}", self.update_course),
+            web.post("/api/course-content", self.create_content),
+            web.post("/api/course-content/", self.create_content),
+            web.post("/api/course-content/bulk", self.create_contents),
+            web.get("/api/course-content/{id}", self.get_content),
+            web.post("/api/enrollments", self.create_enrollment),
+            web.post("/api/enrollments/bulk", self.create_enrollments),
+            web.get("/api/enrollments/course/{id}", self.course_enrollments),
+            web.post("/api/progress", self.create_progress),
+            web.post("/api/progress/bulk", self.create_progress_bulk),
+            web.post("/api/notifications", self.create_notification),
+            web.post("/api/notifications/bulk", self.create_notifications),
+            web.get("/api/notifications/{id}", self.user_notifications)
+        ])
+        if self.media_root:
+            # Serves Range requests (206) from the files themselves
+            app.add_routes([web.static("/media", self.media_root)])
+        else:
+            app.add_routes([web.get("/media/{kind}/{path:.*}", self.media)])
+        return app
+
+    @web.middleware
+    async def _latency(self, request: web.Request, handler):
+        if request.path.startswith("/media/"):
+            return await handler(request)  # A file host, not the API
+        self.requests += 1
+        resource = request.match_info.route.resource
+        route = (resource.canonical if resource is not None else request.path)[len("/api/"):]
+        delay = self.route_latency_ms.get(f"{request.method} {route}", self.latency_ms)
+        if self.jitter_ms:
+            delay += self.rng.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        try:
+            return await handler(request)
+        except ConnectionResetError:
+            # The simulator closed the connection mid-request, e.g. while stopping
+            return _error(400, "Connection lost")
+
+    def _authorized(self, request: web.Request) -> bool:
+        return request.headers.get("Authorization", "").startswith("Bearer ")
+
+    async def register(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        if data.get("email") in self.users:
+            return _error(400, "User already exists")
+        user = {"id": next(self.ids), "name": data.get("name"), "email": data.get("email"), "role": data.get("role")}
+        self.users[user["email"]] = user
+        self.users_by_id[user["id"]] = user
+        return _success(None, 201, "User registered successfully")
+
+    async def register_bulk(self, request: web.Request) -> web.Response:
+        if not self._authorized(request):
+            return _error(401, "Unauthorized")
+        users = (await request.json())["users"]
+        existing = [self.users[user["email"]] for user in users if user["email"] in self.users]
+        created = []
+        for data in users:
+            if data["email"] not in self.users:
+                user = {"id": next(self.ids), "name": data["name"], "email": data["email"], "role": data["role"]}
+                self.users[user["email"]] = user
+                self.users_by_id[user["id"]] = user
+                created.append(user)
+        data = [{"id": user["id"], "email": user["email"], "role": user["role"]} for user in existing + created]
+        return _success(data, 201, "Users registered successfully",
+                        {"requested": len(users), "created": len(created), "existing": len(existing)})
+
+    async def login(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        user = self.users.get(data.get("email"))
+        if user is None:
+            return _error(400, "Invalid email or password")
+        return _success(_token(user["id"], self.token_ttl), 201, "User loged in successfully")
+
+    async def user_by_email(self, request: web.Request) -> web.Response:
+        user = self.users.get(request.query.get("email"))
+        return _success(user, 201) if user else _error(404, "User not found")
+
+    async def list_users(self, request: web.Request) -> web.Response:
+        return _success(list(self.users_by_id.values()), 201)
+
+    async def list_courses(self, request: web.Request) -> web.Response:
+        courses = list(self.courses.values())[-MAX_LISTED_COURSES:]
+        return _success(courses)
+
+    async def create_course(self, request: web.Request) -> web.Response:
+        if not self._authorized(request):
+            return _error(401, "Unauthorized")
+        course = {**await request.json(), "id": next(self.ids)}
+        self.courses[course["id"]] = course
+        return _success(course, 201)
+
+    async def create_courses(self, request: web.Request) -> web.Response:
+        if not self._authorized(request):
+            return _error(401, "Unauthorized")
+        created = []
+        for data in (await request.json())["courses"]:
+            course = {**data, "id": next(self.ids)}
+            self.courses[course["id"]] = course
+            created.append(course)
+        return _success(created, 201, "Courses created successfully", {"created": len(created)})
+
+    async def get_course(self, request: web.Request) -> web.Response:
+        course = self.courses.get(int(request.match_info["id"]))
+        return _success(course) if course else _error(404, "Course not found")
+
+    async def update_course(self, request: web.Request) -> web.Response:
+        course = self.courses.get(int(request.match_info["id"]))
+        if course is None:
+            return _error(404, "Course not found")
+        course.update(await request.json())
+        return _success(course)
+
+    async def create_content(self, request: web.Request) -> web.Response:
+        item = {**await request.json(), "id": next(self.ids)}
+        self.content.setdefault(int(item.get("course_id") or 0), []).append(item)
+        return _success(item, 201)
+
+    async def create_contents(self, request: web.Request) -> web.Response:
+        created = []
+        for data in (await request.json())["items"]:
+            item = {**data, "id": next(self.ids)}
+            self.content.setdefault(int(item["course_id"]), []).append(item)
+            created.append(item)
+        return _success(created, 201, "Content created successfully", {"created": len(created)})
+
+    async def get_content(self, request: web.Request) -> web.Response:
+        return _success(self.content.get(int(request.match_info["id"]), []), 201)
+
+    async def create_enrollment(self, request: web.Request) -> web.Response:
+        enrollment = {**await request.json(), "id": next(self.ids)}
+        self.enrollments.setdefault(int(enrollment.get("course_id") or 0), []).append(enrollment)
+        return _success(enrollment, 201)
+
+    async def create_enrollments(self, request: web.Request) -> web.Response:
+        enrollments = (await request.json())["enrollments"]
+        created = 0
+        for data in enrollments:
+            course = self.enrollments.setdefault(int(data["course_id"]), [])
+            if not any(enrollment.get("user_id") == data["user_id"] for enrollment in course):
+                course.append({**data, "id": next(self.ids)})
+                created += 1
+        return _success(None, 201, "Enrollments created successfully",
+                        {"requested": len(enrollments), "created": created, "skipped": len(enrollments) - created})
+
+    async def course_enrollments(self, request: web.Request) -> web.Response:
+        return _success(self.enrollments.get(int(request.match_info["id"]), []))
+
+    async def create_progress(self, request: web.Request) -> web.Response:
+        return _success({**await request.json(), "id": next(self.ids)}, 201)
+
+    async def create_progress_bulk(self, request: web.Request) -> web.Response:
+        records = (await request.json())["records"]
+        keys = {(record["user_id"], record["course_id"], record["content_id"]) for record in records}
+        created = len(keys - self.progress)
+        self.progress |= keys
+        return _success(None, 201, "Progress recorded successfully",
+                        {"requested": len(records), "created": created, "skipped": len(records) - created})
+
+    async def create_notification(self, request: web.Request) -> web.Response:
+        notification = {**await request.json(), "id": next(self.ids)}
+        self.notifications.setdefault(notification.get("user_id"), []).append(notification)
+        return _success(notification, 201)
+
+    async def create_notifications(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        created = []
+        for user_id in data.get("user_ids") or []:
+            notification = {"user_id": user_id, "message": data.get("message"), "id": next(self.ids)}
+            self.notifications.setdefault(user_id, []).append(notification)
+            created.append(notification)
+        return _success(created, 201)
+
+    async def user_notifications(self, request: web.Request) -> web.Response:
+        return _success(self.notifications.get(int(request.match_info["id"]), [])[-20:])
+
+    async def media(self, request: web.Request) -> web.StreamResponse:
+        """Generated media file of its kind's size, honoring a single Range"""
+        size = MEDIA_SIZES.get(request.match_info["kind"], DEFAULT_MEDIA_SIZE)
+        start, end = 0, size - 1
+        status = 200
+        requested = request.http_range  # slice(first, last + 1); a suffix range has a negative start
+        if requested.start is not None or requested.stop is not None:
+            start = requested.start or 0
+            start = max(0, size + start) if start < 0 else start
+            end = min(size, requested.stop or size) - 1
+            if start >= size:
+                return web.Response(status=416, headers={"Content-Range": f"bytes */{size}"})
+            status = 206
+        response = web.StreamResponse(status=status, headers={
+            "Content-Type": "application/octet-stream", "Accept-Ranges": "bytes",
+            "Content-Length": str(end - start + 1)})
+        if status == 206:
+            response.headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        await response.prepare(request)
+        position = start
+        try:
+            while position <= end:
+                length = min(MEDIA_CHUNK, end - position + 1)
+                await response.write(_MEDIA_PATTERN[:length])
+                position += length
+            await response.write_eof()
+        except ConnectionResetError:
+            pass  # A player that read what it wanted and closed the connection
+        return response
+
+    async def _start(self):
+        self.runner = web.AppRunner(self.app(), access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port, backlog=4096)
+        await site.start()
+        self.port = self.runner.addresses[0][1]
+
+    def start(self) -> str:
+        """Serve on a background thread; returns the api_url to point the simulator at"""
+        ready = threading.Event()
+
+        def run_loop():
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+            self.loop.run_until_complete(self._start())
+            ready.set()
+            self.loop.run_forever()
+
+        self.thread = threading.Thread(target=run_loop, daemon=True, name="mock-backend")
+        self.thread.start()
+        ready.wait()
+        return self.api_url
+
+    @property
+    def api_url(self) -> str:
+        return f"http://{self.host}:{self.port}/api"
+
+    def stop(self):
+        if self.loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result(timeout=5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+        if not self.thread.is_alive():
+            self.loop.close()
+
+
+def serve(port: int, latency_ms: float = 0.0, jitter_ms: float = 0.0, ready=None, stop_event=None,
+          host: str = "127.0.0.1", media_root: str = None):
+    """Run a mock backend until stop_event is set; entry point for a separate mock process"""
+    backend = MockBackend(host, port, latency_ms, jitter_ms, media_root=media_root)
+    api_url = backend.start()
+    if ready is not None:
+        ready.put(api_url)
+    try:
+        if stop_event is None:
+            while True:
+                time.sleep(1)
+        stop_event.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        backend.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock E-Learning Platform API for simulator benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3000)
+    parser.add_argument("--latency", type=float, default=0.0, help="Added latency per request in ms")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform +/- jitter on the latency in ms")
+    parser.add_argument("--media-root", default=None,
+                        help="Directory served under /media (default: generated files of a fixed size per kind)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    logger.info("Mock backend listening on http://%s:%s/api", args.host, args.port)
+    serve(args.port, args.latency, args.jitter, host=args.host, media_root=args.media_root)
+
+
+if __name__ == "__main__":
+    main()
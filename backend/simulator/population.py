@@ -0,0 +1,40 @@
+"""
+Population store for the E-Learning Platform Simulator
+Holds this process's users by role, with per-role activity columns so summaries need no per-user loop
+"""
+
+from array import array
+from typing import Dict, List
+
+from sharding import ROLES
+
+
+class Population:
+    """Users grouped by role; each role's last-activity timestamps sit in one contiguous array"""
+
+    def __init__(self):
+        self.groups: Dict[str, List] = {role: [] for role in ROLES}
+        self.activity: Dict[str, array] = {role: array("d") for role in ROLES}
+        self._all = None
+
+    def add(self, user):
+        """Add a user and move its activity timestamp into the role's column"""
+        column = self.activity[user.role]
+        column.append(user.activity_column[user.activity_slot])
+        user.activity_column = column
+        user.activity_slot = len(column) - 1
+        self.groups[user.role].append(user)
+        self._all = None
+
+    def all(self) -> List:
+        """Every user, admins first; built once rather than on every call"""
+        if self._all is None:
+            self._all = [user for role in ROLES for user in self.groups[role]]
+        return self._all
+
+    def __len__(self) -> int:
+        return sum(len(group) for group in self.groups.values())
+
+    def activity_counts(self) -> Dict[str, List[int]]:
+        """[active, total] users per role; counting runs inside array.count rather than a Python loop"""
+        return {role: [len(column) - column.count(0.0), len(column)] for role, column in self.activity.items()}
@@ -0,0 +1,443 @@
+"""
+Profiling hooks for the E-Learning Platform Simulator
+Times the phases of sampled requests (simulator work, self-imposed waits and the backend's share) and
+the actions around them, and runs an on-demand sampling profiler over every thread's Python stack
+"""
+
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import metrics
+from metrics import LatencyHistogram
+
+logger = logging.getLogger("elearning-simulator")
+
+# Defaults for the "profiling" section of config.yaml
+DEFAULT_PROFILING_CONFIG = {
+    "sample_rate": 0.0,           # Share of actions whose requests are timed phase by phase; 0 turns timing off
+    "sampler_interval": 0.01,     # Seconds between stack samples of the sampling profiler
+    "sampler_duration": 30,       # Seconds a switched-on profiler runs; 0 runs until switched off again
+    "sampler_signal": "SIGUSR1",  # Signal that switches the profiler on and off; null for none
+    "sampler_output": "profile",  # Reports go to <prefix>-<pid>-<time>.txt, stacks to .folded (flame graph input)
+    "top": 25                     # Functions listed in the profiler report
+}
+
+# Request phases by where the time goes. The threaded engine cannot tell DNS from connect; both count as connect.
+SIMULATOR_PHASES = ("prepare", "client", "decode", "record")  # Work in the simulator and its HTTP client
+WAITING_PHASES = ("queue", "retry")                           # In-flight limit and pool waits, retry backoff
+BACKEND_PHASES = ("dns", "connect", "wait", "transfer")       # Network and server, up to the body's last byte
+PHASES = SIMULATOR_PHASES + WAITING_PHASES + BACKEND_PHASES
+
+_config = dict(DEFAULT_PROFILING_CONFIG)
+_local = threading.local()  # Threaded engine: the timer of the request the thread is sending, for client hooks
+_rng = random.Random()  # Apart from the users' generators, so sampling leaves seeded runs unchanged
+
+
+class RequestTimer:
+    """Seconds spent in each phase of one request"""
+
+    __slots__ = ("started", "last", "phases", "spans")
+
+    def __init__(self):
+        self.started = self.last = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.spans: Dict[str, float] = {}
+
+    def mark(self, phase: str):
+        """Count the time since the previous mark towards a phase"""
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self.last
+        self.last = now
+
+    def add(self, phase: str, seconds: float):
+        """Count time measured inside another phase, e.g. connect inside the HTTP call"""
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def begin(self, span: str):
+        self.spans[span] = time.perf_counter()
+
+    def end(self, span: str):
+        started = self.spans.pop(span, None)
+        if started is not None:
+            self.add(span, time.perf_counter() - started)
+
+    def finish(self) -> Dict[str, float]:
+        """Phases with the HTTP call split into client stack, pool wait, connect, server wait and transfer"""
+        phases = self.phases
+        http = phases.pop("http", 0.0)              # From the client call to the response headers
+        exchange = phases.pop("exchange", None)     # Async engine: the client's own timing of that stretch
+        pool = phases.pop("pool", 0.0)
+        connect = phases.get("connect", 0.0)        # Includes DNS
+        if exchange is not None:
+            phases["wait"] = max(0.0, exchange - pool - connect)
+        if phases.get("dns"):
+            phases["connect"] = max(0.0, connect - phases["dns"])
+        phases["queue"] = phases.get("queue", 0.0) + pool
+        phases["client"] = max(0.0, http - pool - connect - phases.get("wait", 0.0))
+        return phases
+
+
+class ActionTimer:
+    """Time of one sampled action and of the requests and media streams in it"""
+
+    __slots__ = ("started", "requests", "media")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.requests = 0.0
+        self.media = 0.0
+
+
+class ProfileStats:
+    """Thread-safe phase histograms per endpoint, action timings and think-time lateness"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.endpoints: Dict[str, Dict[str, LatencyHistogram]] = {}
+            self.actions: Dict[str, Dict[str, LatencyHistogram]] = {}
+            self.lateness = LatencyHistogram()
+
+    def record_request(self, key: str, phases: Dict[str, float], total: float):
+        with self._lock:
+            entry = self.endpoints.get(key)
+            if entry is None:
+                entry = self.endpoints[key] = {phase: LatencyHistogram() for phase in PHASES + ("total",)}
+            for phase, seconds in phases.items():
+                entry[phase].record(int(seconds * 1_000_000))
+            entry["total"].record(int(total * 1_000_000))
+
+    def record_action(self, name: str, total: float, requests: float, media: float):
+        with self._lock:
+            entry = self.actions.get(name)
+            if entry is None:
+                entry = self.actions[name] = {key: LatencyHistogram() for key in ("total", "requests", "other")}
+            entry["total"].record(int(total * 1_000_000))
+            entry["requests"].record(int(requests * 1_000_000))
+            entry["other"].record(int(max(0.0, total - requests - media) * 1_000_000))
+
+    def record_lateness(self, seconds: float):
+        with self._lock:
+            self.lateness.record(int(max(0.0, seconds) * 1_000_000))
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "endpoints": {key: {phase: h.to_dict() for phase, h in entry.items()}
+                              for key, entry in self.endpoints.items()},
+                "actions": {name: {key: h.to_dict() for key, h in entry.items()} for name, entry in self.actions.items()},
+                "lateness": self.lateness.to_dict()
+            }
+
+
+stats = ProfileStats()
+
+
+def configure(config: Dict[str, Any] = None):
+    """Apply the "profiling" config section"""
+    global _config
+    _config = {**DEFAULT_PROFILING_CONFIG, **(config or {})}
+
+
+def enabled() -> bool:
+    """Whether request phases are being timed"""
+    return _config["sample_rate"] > 0
+
+
+# Phase timing; every hook is a single None check for actions that are not sampled
+
+def start_action(user) -> Optional[ActionTimer]:
+    """Sample the user's next action; its requests are then timed phase by phase"""
+    if not _config["sample_rate"] or _rng.random() >= _config["sample_rate"]:
+        user.profile = None
+        return None
+    user.profile = ActionTimer()
+    return user.profile
+
+
+def finish_action(user, action: ActionTimer):
+    user.profile = None
+    stats.record_action(user.current_action or "unknown", time.perf_counter() - action.started,
+                        action.requests, action.media)
+
+
+def add_media(user, seconds: float):
+    """Keep media streaming out of the action's own overhead"""
+    if user.profile is not None:
+        user.profile.media += seconds
+
+
+def finish_request(user, timer: RequestTimer, method: str, endpoint: str):
+    timer.mark("record")  # Whatever ran after the last mark, e.g. the world model update
+    total = timer.last - timer.started
+    if user.profile is not None:
+        user.profile.requests += total
+    stats.record_request(f"{method.upper()} {metrics.normalize_endpoint(endpoint)}", timer.finish(), total)
+
+
+def set_thread_timer(timer: Optional[RequestTimer]):
+    _local.timer = timer
+
+
+def thread_timer() -> Optional[RequestTimer]:
+    return getattr(_local, "timer", None)
+
+
+def time_exchange(timer: RequestTimer, conn, reused: bool, send):
+    """Time one urllib3 exchange: connect (wrapped on the connection while it runs) and the server wait"""
+    connected = timer.phases.get("connect", 0.0)
+    if not reused:
+        connect = conn.connect
+
+        def timed_connect():
+            began = time.perf_counter()
+            try:
+                return connect()
+            finally:
+                timer.add("connect", time.perf_counter() - began)
+
+        conn.connect = timed_connect
+    began = time.perf_counter()
+    try:
+        return send()
+    finally:
+        if not reused:
+            conn.__dict__.pop("connect", None)
+        connect_time = timer.phases.get("connect", 0.0) - connected
+        timer.add("wait", time.perf_counter() - began - connect_time)
+
+
+def on_response(response, *args, **kwargs):
+    """requests response hook: the response headers are in; the body is read after it"""
+    timer = getattr(_local, "timer", None)
+    if timer is not None:
+        timer.mark("http")
+
+
+def trace_config():
+    """aiohttp TraceConfig that times pool waits, DNS, connects and the exchange of sampled requests"""
+    import aiohttp
+
+    def span(name: str, begin: bool):
+        async def hook(session, context, params):
+            timer = context.trace_request_ctx
+            if isinstance(timer, RequestTimer):
+                timer.begin(name) if begin else timer.end(name)
+        return hook
+
+    config = aiohttp.TraceConfig()
+    for signal, name in (("connection_queued", "pool"), ("dns_resolvehost", "dns"),
+                         ("connection_create", "connect"), ("request", "exchange")):
+        getattr(config, f"on_{signal}_start").append(span(name, True))
+        getattr(config, f"on_{signal}_end").append(span(name, False))
+    config.on_request_exception.append(span("exchange", False))
+    return config
+
+
+def record_sleep(intended: float, actual: float):
+    """Lateness of a think-time sleep: timer, GIL or event loop delay the simulator adds"""
+    if _config["sample_rate"] and _rng.random() < _config["sample_rate"]:
+        stats.record_lateness(actual - intended)
+
+
+# Reports
+
+def _mean_ms(data: Dict[str, Any]) -> float:
+    return data["total"] / data["count"] / 1000 if data["count"] else 0.0
+
+
+def report_lines(snapshot: Dict[str, Any]) -> List[str]:
+    """Per-endpoint split of sampled request time into simulator work, waiting and backend latency"""
+    lines = ["--- PROFILE (mean ms per sampled request) ---"]
+    endpoints = sorted(snapshot["endpoints"].items(), key=lambda item: -item[1]["total"]["count"])
+    if not endpoints:
+        return lines + ["No sampled requests", "---------------"]
+    lines.append(f"{'endpoint':<34} {'n':>6} {'total':>8} {'simulator':>10} {'waiting':>8} {'backend':>8}  "
+                 + " ".join(f"{phase:>8}" for phase in PHASES))
+    overall = {"simulator": 0.0, "waiting": 0.0, "backend": 0.0}
+    for key, entry in endpoints:
+        count = entry["total"]["count"]
+        means = {phase: entry[phase]["total"] / count / 1000 for phase in PHASES}
+        groups = {"simulator": sum(means[phase] for phase in SIMULATOR_PHASES),
+                  "waiting": sum(means[phase] for phase in WAITING_PHASES),
+                  "backend": sum(means[phase] for phase in BACKEND_PHASES)}
+        for group, value in groups.items():
+            overall[group] += value * count
+        lines.append(
+            f"{key:<34} {count:>6} {_mean_ms(entry['total']):>8.2f} {groups['simulator']:>10.2f} "
+            f"{groups['waiting']:>8.2f} {groups['backend']:>8.2f}  "
+            + " ".join(f"{means[phase]:>8.2f}" for phase in PHASES))
+    total = sum(overall.values())
+    if total:
+        lines.append("Sampled request time: " + ", ".join(
+            f"{group} {value / total:.0%}" for group, value in overall.items()))
+    for name, entry in sorted(snapshot["actions"].items()):
+        other = LatencyHistogram.from_dict(entry["other"])
+        lines.append(f"Action {name}: {entry['total']['count']} sampled, {_mean_ms(entry['total']):.2f}ms, "
+                     f"of which {_mean_ms(entry['other']):.2f}ms outside requests (p99 {other.percentile(0.99) / 1000:.2f}ms)")
+    lateness = LatencyHistogram.from_dict(snapshot["lateness"])
+    if lateness.count:
+        lines.append(f"Think-time sleeps overran by p50 {lateness.percentile(0.5) / 1000:.2f}ms, "
+                     f"p99 {lateness.percentile(0.99) / 1000:.2f}ms, max {lateness.max / 1000:.2f}ms")
+    lines.append("---------------")
+    return lines
+
+
+def merge_stats(snapshots) -> Dict[str, Any]:
+    """Combine stats.snapshot() from several shards"""
+    def merge_into(target: Dict[str, LatencyHistogram], source: Dict[str, Any]):
+        for key, data in source.items():
+            target.setdefault(key, LatencyHistogram()).merge(LatencyHistogram.from_dict(data))
+
+    endpoints, actions, lateness = {}, {}, LatencyHistogram()
+    for snapshot in snapshots:
+        for key, entry in snapshot["endpoints"].items():
+            merge_into(endpoints.setdefault(key, {}), entry)
+        for name, entry in snapshot["actions"].items():
+            merge_into(actions.setdefault(name, {}), entry)
+        lateness.merge(LatencyHistogram.from_dict(snapshot["lateness"]))
+    return {
+        "endpoints": {key: {phase: h.to_dict() for phase, h in entry.items()} for key, entry in endpoints.items()},
+        "actions": {name: {key: h.to_dict() for key, h in entry.items()} for name, entry in actions.items()},
+        "lateness": lateness.to_dict()
+    }
+
+
+# Sampling profiler
+
+class SamplingProfiler:
+    """Samples the Python stack of every thread at an interval and reports where the time goes"""
+
+    def __init__(self, interval: float, top: int, output: str):
+        self.interval = interval
+        self.top = top
+        self.output = output
+        self.stacks: Counter = Counter()  # Folded stack (root first) -> samples
+        self.samples = 0
+        self.sampling_seconds = 0.0  # The profiler's own cost
+        self.started = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, duration: float = 0):
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, args=(duration,), daemon=True, name="sampling-profiler")
+        self._thread.start()
+        if duration:
+            logger.info("Sampling profiler started (%.0fms interval, %.0fs)", self.interval * 1000, duration)
+        else:
+            logger.info("Sampling profiler started (%.0fms interval)", self.interval * 1000)
+
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self, duration: float):
+        own = threading.get_ident()
+        deadline = self.started + duration if duration else None
+        while not self._stop.wait(self.interval):
+            began = time.perf_counter()
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(names))] += 1
+                self.samples += 1
+            now = time.perf_counter()
+            self.sampling_seconds += now - began
+            if deadline is not None and now >= deadline:
+                break
+        self._write()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+
+    def report_lines(self) -> List[str]:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        own, inclusive = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for name in set(frames):
+                inclusive[name] += count
+        total = max(self.samples, 1)
+        lines = [f"Sampling profile: {self.samples} thread samples over {elapsed:.1f}s; the profiler took "
+                 f"{self.sampling_seconds:.2f}s ({self.sampling_seconds / elapsed:.1%} of one core)",
+                 "Threads blocked in sleep or I/O are sampled too; their frames show where they wait",
+                 f"{'own':>6} {'total':>6}  function"]
+        for name, count in own.most_common(self.top):
+            lines.append(f"{count / total:>6.1%} {inclusive[name] / total:>6.1%}  {name}")
+        return lines
+
+    def _write(self):
+        prefix = f"{self.output}-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}"
+        try:
+            with open(f"{prefix}.txt", "w") as file:
+                file.write("\n".join(self.report_lines()) + "\n")
+            with open(f"{prefix}.folded", "w") as file:
+                for stack, count in self.stacks.most_common():
+                    file.write(f"{stack} {count}\n")
+        except OSError as e:
+            logger.warning("Could not write the profile: %s", e)
+            return
+        logger.info("Sampling profile written to %s.txt and %s.folded", prefix, prefix)
+
+
+_profiler: Optional[SamplingProfiler] = None
+_profiler_lock = threading.Lock()
+
+
+def toggle_profiler(duration: float = None) -> bool:
+    """Start the sampling profiler, or stop a running one and write its report; returns whether it runs now"""
+    global _profiler
+    with _profiler_lock:
+        running, _profiler = _profiler, None
+        if running is None or not running.running():
+            _profiler = SamplingProfiler(_config["sampler_interval"], _config["top"], _config["sampler_output"])
+            _profiler.start(_config["sampler_duration"] if duration is None else duration)
+            return True
+    running.stop()  # Joins the sampler, which writes the report; not under the lock
+    return False
+
+
+def stop_profiler():
+    global _profiler
+    with _profiler_lock:
+        profiler, _profiler = _profiler, None
+    if profiler is not None and profiler.running():
+        profiler.stop()
+
+
+def install_signal(forward=None):
+    """Switch the sampling profiler with the configured signal; forward(signum) passes it on, e.g. to shards"""
+    name = _config["sampler_signal"]
+    if not name:
+        return
+    import signal
+
+    signum = getattr(signal, name, None)
+    if signum is None:
+        logger.warning("Signal %s is not available here; the sampling profiler can only be started by flag", name)
+        return
+
+    def handle(received, frame):
+        # The handler may interrupt a thread holding the profiler lock or a logging lock; switch elsewhere
+        threading.Thread(target=toggle_profiler, daemon=True, name="profiler-switch").start()
+        if forward is not None:
+            forward(received)
+
+    signal.signal(signum, handle)
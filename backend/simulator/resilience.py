@@ -0,0 +1,318 @@
+"""
+Client-side resilience for the E-Learning Platform Simulator
+Per-endpoint circuit breakers, an adaptive global limit on requests in flight, jittered retries of
+idempotent GETs and per-endpoint timeouts, so a degraded backend sees less load rather than more
+"""
+
+import contextlib
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import http_pool
+import metrics
+
+logger = logging.getLogger("elearning-simulator")
+
+# Defaults for the "resilience" section of config.yaml
+DEFAULT_RESILIENCE_CONFIG = {
+    "circuit_breaker": {
+        "enabled": True,
+        "failure_threshold": 20,  # Consecutive failures of an endpoint that open its breaker
+        "reset_timeout": 10,      # Seconds an open breaker rejects requests before letting a probe through
+    },
+    "max_in_flight": 0,           # Requests in flight across all users (0 = no limit)
+    "min_in_flight": 8,           # The adaptive limit never drops below this
+    "queue_timeout": 5,           # Seconds a request may wait for a slot before it is shed
+    "retries": 2,                 # Extra attempts for GETs that failed with no response, 429 or 502-504
+    "backoff_base": 0.2,          # Seconds; attempt n waits uniform(0, min(backoff_max, backoff_base * 2**n))
+    "backoff_max": 5,
+    "timeouts": {}                # "METHOD endpoint" -> seconds, e.g. {"POST notifications/bulk": 30}
+}
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}  # Numeric breaker state for metrics
+
+RETRYABLE_STATUSES = (0, 429, 502, 503, 504)
+
+
+class Overloaded(Exception):
+    """A request was shed because no in-flight slot freed up in time"""
+
+
+def endpoint_key(method: str, endpoint: str) -> str:
+    """Breaker and timeout key of a request, e.g. "GET courses/:id\""""
+    return f"{method.upper()} {metrics.normalize_endpoint(endpoint)}"
+
+
+def is_failure(status: int) -> bool:
+    """Responses that say the backend is in trouble; other 4xx are the client's own errors"""
+    return status == 0 or status == 429 or status >= 500
+
+
+class CircuitBreaker:
+    """Opens after failure_threshold consecutive failures and lets one probe through per reset_timeout"""
+
+    def __init__(self, key: str, failure_threshold: int, reset_timeout: float):
+        self.key = key
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started = None
+        self.transitions = {CLOSED: 0, OPEN: 0, HALF_OPEN: 0}
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def _move(self, state: str):
+        self.state = state
+        self.transitions[state] += 1
+        log = logger.warning if state == OPEN else logger.info
+        log("Circuit breaker for %s is now %s", self.key, state)
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == OPEN and now - self.opened_at >= self.reset_timeout:
+                self._move(HALF_OPEN)
+            if self.state == HALF_OPEN and (self.probe_started is None
+                                            or now - self.probe_started >= self.reset_timeout):
+                # A probe that never reported back (e.g. shed by the limiter) is replaced after reset_timeout
+                self.probe_started = now
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, status: int):
+        with self._lock:
+            if not is_failure(status):
+                self.failures = 0
+                if self.state != CLOSED:
+                    self.probe_started = None
+                    self._move(CLOSED)
+                return
+            self.failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.opened_at = time.monotonic()
+                self.probe_started = None
+                self._move(OPEN)
+
+
+class AdaptiveLimiter:
+    """Global cap on requests in flight, halved on backend failures and grown back one slot per limit successes
+
+    Only requests sent after the last decrease can halve the limit again, so a burst of concurrent failures
+    counts as one congestion signal. Threads and coroutines wait for a slot up to queue_timeout and are shed
+    with Overloaded after that.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int, queue_timeout: float):
+        self.max_limit = max_limit
+        self.min_limit = min(min_limit, max_limit)
+        self.queue_timeout = queue_timeout
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self.shed = 0
+        self.decreased = float("-inf")  # monotonic time of the last decrease
+        self._cond = threading.Condition()
+        self._waiters = deque()  # Futures of coroutines waiting for a slot
+
+    def _free(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    def acquire(self) -> float:
+        """Take a slot; returns the time it was granted, for release()"""
+        with self._cond:
+            if not self._cond.wait_for(self._free, timeout=self.queue_timeout):
+                self.shed += 1
+                raise Overloaded(f"{self.in_flight} requests in flight (limit {int(self.limit)})")
+            self.in_flight += 1
+            return time.monotonic()
+
+    async def acquire_async(self) -> float:
+        import asyncio  # Only the async engine gets here; the threaded engine never loads asyncio for it
+
+        deadline = time.monotonic() + self.queue_timeout
+        while True:
+            with self._cond:
+                if self._free():
+                    self.in_flight += 1
+                    return time.monotonic()
+                waiter = asyncio.get_running_loop().create_future()
+                self._waiters.append(waiter)
+            try:
+                await asyncio.wait_for(waiter, max(0.0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                with self._cond:
+                    self.shed += 1
+                raise Overloaded(f"{self.in_flight} requests in flight (limit {int(self.limit)})")
+
+    def release(self, status: Optional[int], sent: float):
+        """Free a slot and adapt the limit to the outcome (None: no response to judge) of a request sent at sent"""
+        with self._cond:
+            self.in_flight -= 1
+            if status is not None:
+                if is_failure(status):
+                    if sent > self.decreased:
+                        self.limit = max(float(self.min_limit), self.limit / 2)
+                        self.decreased = time.monotonic()
+                else:
+                    self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+            self._cond.notify_all()
+            waking = int(self.limit) - self.in_flight
+            while waking > 0 and self._waiters:
+                waiter = self._waiters.popleft()
+                if waiter.done():  # Timed out already
+                    continue
+                waiter.get_loop().call_soon_threadsafe(_wake, waiter)
+                waking -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {"limit": int(self.limit), "in_flight": self.in_flight, "shed": self.shed}
+
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+_config = dict(DEFAULT_RESILIENCE_CONFIG)
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+_limiter: Optional[AdaptiveLimiter] = None
+_rng = random.Random()
+_retries = 0
+_retries_lock = threading.Lock()
+
+
+def configure(config: Dict[str, Any] = None):
+    """Apply the "resilience" config section"""
+    global _config, _limiter, _retries
+    config = {**DEFAULT_RESILIENCE_CONFIG, **(config or {})}
+    config["circuit_breaker"] = {**DEFAULT_RESILIENCE_CONFIG["circuit_breaker"],
+                                 **(config.get("circuit_breaker") or {})}
+    _config = config
+    with _breakers_lock:
+        _breakers.clear()
+    _limiter = AdaptiveLimiter(config["max_in_flight"], config["min_in_flight"], config["queue_timeout"]) \
+        if config["max_in_flight"] else None
+    _retries = 0
+
+
+def _breaker(key: str) -> Optional[CircuitBreaker]:
+    breaker_config = _config["circuit_breaker"]
+    if not breaker_config["enabled"]:
+        return None
+    breaker = _breakers.get(key)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(
+                key, CircuitBreaker(key, breaker_config["failure_threshold"], breaker_config["reset_timeout"]))
+    return breaker
+
+
+def allow(key: str) -> bool:
+    """Whether the endpoint's breaker lets a request through"""
+    breaker = _breaker(key)
+    return breaker is None or breaker.allow()
+
+
+def record(key: str, status: int):
+    """Feed a request's outcome to the endpoint's breaker"""
+    breaker = _breaker(key)
+    if breaker is not None:
+        breaker.record(status)
+
+
+def should_retry(method: str, status: int, attempt: int) -> bool:
+    """Whether to repeat a GET that failed transiently; attempt counts the retries already made"""
+    global _retries
+    if method.lower() != "get" or status not in RETRYABLE_STATUSES or attempt >= _config["retries"]:
+        return False
+    with _retries_lock:
+        _retries += 1
+    return True
+
+
+def backoff(attempt: int) -> float:
+    """Full-jitter exponential backoff before retry number `attempt` (1-based)"""
+    return _rng.uniform(0, min(_config["backoff_max"], _config["backoff_base"] * 2 ** attempt))
+
+
+def timeout(key: str) -> float:
+    """Request timeout of an endpoint"""
+    return _config["timeouts"].get(key, http_pool.request_timeout())
+
+
+def has_timeout(key: str) -> bool:
+    return key in _config["timeouts"]
+
+
+@contextlib.contextmanager
+def slot():
+    """Hold an in-flight slot for one request; raises Overloaded when it cannot get one in time"""
+    if _limiter is None:
+        yield None
+        return
+    sent = _limiter.acquire()
+    outcome = {"status": None}
+    try:
+        yield outcome
+    except Exception:
+        outcome["status"] = 0  # No response, e.g. refused or timed out
+        raise
+    finally:
+        _limiter.release(outcome["status"], sent)
+
+
+@contextlib.asynccontextmanager
+async def async_slot():
+    if _limiter is None:
+        yield None
+        return
+    sent = await _limiter.acquire_async()
+    outcome = {"status": None}
+    try:
+        yield outcome
+    except Exception:
+        outcome["status"] = 0  # No response, e.g. refused or timed out
+        raise
+    finally:
+        _limiter.release(outcome["status"], sent)
+
+
+def stats() -> Dict[str, Any]:
+    """Breaker states and transitions, requests rejected and shed, retries and the current in-flight limit"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    result = {
+        "breakers": {breaker.key: breaker.state for breaker in breakers},
+        "opened": sum(breaker.transitions[OPEN] for breaker in breakers),
+        "rejected": sum(breaker.rejected for breaker in breakers),
+        "retries": _retries,
+        "shed": 0
+    }
+    if _limiter is not None:
+        limiter = _limiter.stats()
+        result.update(shed=limiter["shed"], limit=limiter["limit"], in_flight=limiter["in_flight"])
+    return result
+
+
+def merge_stats(snapshots: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine stats() from several shards; a breaker is reported in its worst state on any shard"""
+    merged = {"breakers": {}, "opened": 0, "rejected": 0, "retries": 0, "shed": 0}
+    for snapshot in snapshots:
+        for key, state in snapshot["breakers"].items():
+            if STATE_VALUES[state] > STATE_VALUES.get(merged["breakers"].get(key, CLOSED), 0):
+                merged["breakers"][key] = state
+        for key in ("opened", "rejected", "retries", "shed", "limit", "in_flight"):
+            if key in snapshot:
+                merged[key] = merged.get(key, 0) + snapshot[key]
+    return merged
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Run results for the E-Learning Platform Simulator
+Keeps a compact summary of every run (config hash, per-endpoint latency distributions, throughput and
+error rates) and compares runs with significance tests, exiting non-zero when a candidate regressed
+"""
+
+import argparse
+import glob
+import json
+import logging
+import math
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import metrics
+from metrics import LatencyHistogram
+
+logger = logging.getLogger("elearning-simulator")
+
+RESULTS_VERSION = 1
+
+# Defaults for the "results" section of config.yaml
+DEFAULT_RESULTS_CONFIG = {
+    "enabled": True,
+    "directory": "results",
+    "label": None,        # Free text stored with the run, e.g. the backend version under test
+    "warmup": 0,          # Seconds at the start of a run left out of its results
+    "thresholds": {       # A change is a regression when it is both this large and significant
+        "latency_pct": 20,     # p50/p95/p99 increase, percent
+        "latency_abs_ms": 2,   # ... and at least this many milliseconds
+        "error_rate_abs": 0.01,  # Error rate increase, absolute (0.01 = one percentage point)
+        "throughput_pct": 10,  # Requests per second decrease, percent
+        "alpha": 0.01,         # Significance level of the one-sided tests
+        "min_count": 30        # Endpoints with fewer requests in either run are not judged
+    }
+}
+
+QUANTILES = (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))
+MIN_TAIL_SAMPLES = 5  # A quantile is judged only when both runs expect this many samples above it
+
+
+def config_hash(config: Dict[str, Any]) -> str:
+    """Short stable hash of a config, to tell whether two runs are like for like"""
+    import hashlib
+
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+
+def summarize_run(snapshot: Dict[str, Any], config: Dict[str, Any], label: Optional[str] = None,
+                  extra: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Run summary of a metrics snapshot (typically metrics.diff_snapshots of the run after warmup)"""
+    elapsed = max(snapshot["taken"] - snapshot["started"], 1e-9)
+    endpoints = {}
+    for (method, endpoint, status), data in snapshot["series"].items():
+        entry = endpoints.setdefault(f"{method} {endpoint}", {"histogram": LatencyHistogram(), "errors": 0})
+        histogram = LatencyHistogram.from_dict(data)
+        entry["histogram"].merge(histogram)
+        if metrics.is_error(status):
+            entry["errors"] += histogram.count
+
+    latency, errors = metrics.overall(snapshot)
+    created = time.time()
+    digest = config_hash(config)
+    return {
+        "version": RESULTS_VERSION,
+        "id": f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(created))}-{digest[:6]}",
+        "label": label,
+        "created": created,
+        "config_hash": digest,
+        "engine": config.get("engine", "threaded"),
+        "mode": (config.get("scheduler") or {}).get("mode", "closed"),
+        "started": snapshot["started"],
+        "duration": elapsed,
+        "requests": latency.count,
+        "throughput": latency.count / elapsed,
+        "error_rate": errors / latency.count if latency.count else 0.0,
+        "endpoints": {
+            key: {
+                "count": entry["histogram"].count,
+                "errors": entry["errors"],
+                "rps": entry["histogram"].count / elapsed,
+                **{name: entry["histogram"].percentile(q) / 1000 for name, q in QUANTILES},
+                "histogram": entry["histogram"].to_dict()
+            }
+            for key, entry in sorted(endpoints.items())
+        },
+        **(extra or {})
+    }
+
+
+def save(summary: Dict[str, Any], directory: str) -> str:
+    """Write a run summary into the results directory; returns its path"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{summary['id']}.json")
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as file:
+        json.dump(summary, file, separators=(",", ":"))
+    os.replace(temp_path, path)
+    return path
+
+
+def list_runs(directory: str) -> List[Dict[str, Any]]:
+    """Every stored run, oldest first"""
+    runs = []
+    for path in glob.glob(os.path.join(directory, "*.json")):
+        try:
+            with open(path, "r") as file:
+                run = json.load(file)
+        except (OSError, ValueError) as e:
+            logger.warning("Skipping unreadable result %s: %s", path, e)
+            continue
+        run["path"] = path
+        runs.append(run)
+    return sorted(runs, key=lambda run: run["created"])
+
+
+def load(ref: str, directory: str) -> Dict[str, Any]:
+    """Run by file path, id, label (its latest run) or "latest" / "latest~N" (N runs before the latest)"""
+    if os.path.isfile(ref):
+        with open(ref, "r") as file:
+            return {**json.load(file), "path": ref}
+    runs = list_runs(directory)
+    if ref == "latest" or ref.startswith("latest~"):
+        back = int(ref.split("~", 1)[1]) if "~" in ref else 0
+        if back >= len(runs):
+            raise LookupError(f"Only {len(runs)} runs stored in {directory}")
+        return runs[-1 - back]
+    matches = [run for run in runs if run["id"] == ref or run["id"].startswith(ref)] \
+        or [run for run in runs if run.get("label") == ref]
+    if not matches:
+        raise LookupError(f"No run '{ref}' in {directory}")
+    return matches[-1]
+
+
+# Significance tests; each returns a one-sided p-value for "the candidate is worse"
+
+def _normal_sf(z: float) -> float:
+    """P(Z > z) for a standard normal Z"""
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def mann_whitney(baseline: LatencyHistogram, candidate: LatencyHistogram) -> Tuple[float, float]:
+    """Mann-Whitney U test on two latency histograms; returns (p, P(candidate > baseline))
+
+    Ranks are assigned per histogram bucket, so samples sharing a bucket count as ties; the normal
+    approximation with tie correction is used, which is accurate at the sample sizes judged here.
+    """
+    n1, n2 = baseline.count, candidate.count
+    if not n1 or not n2:
+        return 1.0, 0.5
+    rank = 0
+    rank_sum = 0.0  # Of the candidate
+    ties = 0
+    for index in sorted(set(baseline.counts) | set(candidate.counts)):
+        in_baseline, in_candidate = baseline.counts.get(index, 0), candidate.counts.get(index, 0)
+        group = in_baseline + in_candidate
+        rank_sum += in_candidate * (rank + (group + 1) / 2)
+        rank += group
+        ties += group ** 3 - group
+    u = rank_sum - n2 * (n2 + 1) / 2  # Pairs where the candidate is slower, ties counting half
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1))) if n > 1 else 0.0
+    superiority = u / (n1 * n2)
+    if variance <= 0:
+        return 1.0, superiority
+    return _normal_sf((u - n1 * n2 / 2) / math.sqrt(variance)), superiority
+
+
+def quantile_test(baseline: LatencyHistogram, candidate: LatencyHistogram, q: float) -> float:
+    """Test that the candidate's q-quantile is higher: more of its samples lie above the baseline's q-quantile
+
+    A whole-distribution test such as Mann-Whitney would let a shift of the median stand in for the tail.
+    """
+    cut = metrics.bucket_index(baseline.percentile(q))
+
+    def above(histogram):
+        return sum(n for index, n in histogram.counts.items() if index > cut)
+
+    return proportion_test(above(baseline), baseline.count, above(candidate), candidate.count)
+
+
+def proportion_test(errors1: int, n1: int, errors2: int, n2: int) -> float:
+    """Two-proportion z-test that the second error rate is higher"""
+    if not n1 or not n2:
+        return 1.0
+    pooled = (errors1 + errors2) / (n1 + n2)
+    deviation = math.sqrt(pooled * (1 - pooled) * (1 / n1 + 1 / n2))
+    if deviation == 0:
+        return 1.0
+    return _normal_sf((errors2 / n2 - errors1 / n1) / deviation)
+
+
+def rate_test(count1: int, seconds1: float, count2: int, seconds2: float) -> float:
+    """z-test on two Poisson request rates that the second is lower"""
+    deviation = math.sqrt(count1 / seconds1 ** 2 + count2 / seconds2 ** 2)
+    if deviation == 0:
+        return 1.0
+    return _normal_sf((count1 / seconds1 - count2 / seconds2) / deviation)
+
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any], thresholds: Dict[str, Any] = None) -> List[Dict]:
+    """Per-endpoint changes from baseline to candidate; rows with "regressions" failed a threshold"""
+    thresholds = {**DEFAULT_RESULTS_CONFIG["thresholds"], **(thresholds or {})}
+    alpha = thresholds["alpha"]
+    rows = []
+    for key in sorted(set(baseline["endpoints"]) | set(candidate["endpoints"])):
+        before, after = baseline["endpoints"].get(key), candidate["endpoints"].get(key)
+        row = {"endpoint": key, "baseline": before, "candidate": after, "regressions": []}
+        rows.append(row)
+        if before is None or after is None:
+            row["note"] = "only in baseline" if after is None else "only in candidate"
+            continue
+        if min(before["count"], after["count"]) < thresholds["min_count"]:
+            row["note"] = "too few requests"
+            continue
+        if key.split(" ", 1)[0] in metrics.AGGREGATE_METHODS:
+            row["note"] = "aggregate"
+            continue
+
+        baseline_histogram = LatencyHistogram.from_dict(before["histogram"])
+        candidate_histogram = LatencyHistogram.from_dict(after["histogram"])
+        row["p_latency"], row["superiority"] = mann_whitney(baseline_histogram, candidate_histogram)
+        for name, q in QUANTILES:
+            increase = after[name] - before[name]
+            if increase < thresholds["latency_abs_ms"] or increase <= before[name] * thresholds["latency_pct"] / 100:
+                continue
+            if min(before["count"], after["count"]) * (1 - q) < MIN_TAIL_SAMPLES:
+                continue  # e.g. a p99 of a few hundred requests; too few tail samples to tell
+            p = quantile_test(baseline_histogram, candidate_histogram, q)
+            if p < alpha:
+                row["regressions"].append(f"{name} {before[name]:.1f} -> {after[name]:.1f}ms (p={p:.3f})")
+
+        rate_before, rate_after = before["errors"] / before["count"], after["errors"] / after["count"]
+        row["p_errors"] = proportion_test(before["errors"], before["count"], after["errors"], after["count"])
+        if rate_after - rate_before > thresholds["error_rate_abs"] and row["p_errors"] < alpha:
+            row["regressions"].append(f"errors {rate_before:.2%} -> {rate_after:.2%}")
+
+        row["p_throughput"] = rate_test(before["count"], baseline["duration"], after["count"], candidate["duration"])
+        if after["rps"] < before["rps"] * (1 - thresholds["throughput_pct"] / 100) and row["p_throughput"] < alpha:
+            row["regressions"].append(f"throughput {before['rps']:.1f} -> {after['rps']:.1f} req/s")
+    return rows
+
+
+def _change(before: float, after: float) -> str:
+    return f"{(after - before) / before:+.0%}" if before else "n/a"
+
+
+def format_comparison(baseline: Dict[str, Any], candidate: Dict[str, Any], rows: List[Dict]) -> List[str]:
+    def describe(run):
+        return f"{run['id']}" + (f" ({run['label']})" if run.get("label") else "")
+
+    lines = [f"Baseline {describe(baseline)} vs candidate {describe(candidate)}"]
+    if baseline["config_hash"] != candidate["config_hash"]:
+        lines.append("Warning: the runs used different configs; differences may not come from the backend")
+    lines.append(f"Throughput {baseline['throughput']:.1f} -> {candidate['throughput']:.1f} req/s "
+                 f"({_change(baseline['throughput'], candidate['throughput'])}), error rate "
+                 f"{baseline['error_rate']:.2%} -> {candidate['error_rate']:.2%}")
+    lines.append(f"{'endpoint':<34} {'count':>13} {'p50 ms':>15} {'p99 ms':>15} {'err':>13} {'p':>7}  result")
+    for row in rows:
+        before, after = row["baseline"], row["candidate"]
+        if before is None or after is None:
+            lines.append(f"{row['endpoint']:<34} {row['note']}")
+            continue
+        verdict = "REGRESSION: " + "; ".join(row["regressions"]) if row["regressions"] else row.get("note", "ok")
+        p = f"{row['p_latency']:.3f}" if "p_latency" in row else "-"
+        lines.append(
+            f"{row['endpoint']:<34} {before['count']:>6}/{after['count']:<6} "
+            f"{before['p50']:>7.1f}/{after['p50']:<7.1f} {before['p99']:>7.1f}/{after['p99']:<7.1f} "
+            f"{before['errors'] / before['count']:>6.1%}/{after['errors'] / after['count']:<6.1%} {p:>7}  {verdict}")
+    return lines
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Stored simulator run results")
+    parser.add_argument("--directory", default=None, help="Results directory (default: from --config, else results)")
+    parser.add_argument("--config", default=None, help="Simulator config whose results section supplies defaults")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="List stored runs")
+    show = commands.add_parser("show", help="Print one run's per-endpoint summary")
+    show.add_argument("run")
+    diff = commands.add_parser("compare", help="Compare runs against a baseline; exits 1 on a regression")
+    diff.add_argument("baseline", help="Run id, id prefix, label, path, latest or latest~N")
+    diff.add_argument("candidates", nargs="+")
+    diff.add_argument("--latency-pct", type=float)
+    diff.add_argument("--latency-abs-ms", type=float)
+    diff.add_argument("--error-rate-abs", type=float)
+    diff.add_argument("--throughput-pct", type=float)
+    diff.add_argument("--alpha", type=float)
+    diff.add_argument("--min-count", type=int)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    config = dict(DEFAULT_RESULTS_CONFIG)
+    if args.config:
+        import startup
+
+        config.update((startup.load_config(args.config)[0].get("results") or {}))
+    directory = args.directory or config["directory"]
+
+    try:
+        if args.command == "list":
+            for run in list_runs(directory):
+                created = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(run["created"]))
+                print(f"{run['id']}  {created}  {run['requests']:>8} req  {run['throughput']:>8.1f} req/s  "
+                      f"{run['error_rate']:>6.2%} err  {run.get('label') or ''}")
+            return 0
+        if args.command == "show":
+            run = load(args.run, directory)
+            rows = [{"method": key.split(" ", 1)[0], "endpoint": key.split(" ", 1)[1], "count": entry["count"],
+                     "rps": entry["rps"], "error_rate": entry["errors"] / entry["count"] if entry["count"] else 0.0,
+                     "p50": entry["p50"], "p95": entry["p95"], "p99": entry["p99"],
+                     "max": entry["histogram"]["max"] / 1000}
+                    for key, entry in run["endpoints"].items()]
+            print(f"{run['id']} ({run.get('label') or 'no label'}), {run['duration']:.0f}s, config {run['config_hash']}")
+            for line in metrics.format_summary(sorted(rows, key=lambda row: -row["count"])):
+                print(line)
+            return 0
+
+        thresholds = {**DEFAULT_RESULTS_CONFIG["thresholds"], **(config.get("thresholds") or {})}
+        for key in thresholds:
+            if getattr(args, key, None) is not None:
+                thresholds[key] = getattr(args, key)
+        baseline = load(args.baseline, directory)
+        regressed = False
+        for ref in args.candidates:
+            candidate = load(ref, directory)
+            rows = compare(baseline, candidate, thresholds)
+            for line in format_comparison(baseline, candidate, rows):
+                print(line)
+            print()
+            regressed = regressed or any(row["regressions"] for row in rows)
+    except LookupError as e:
+        print(e, file=sys.stderr)
+        return 2
+    print("Regression detected" if regressed else "No regression")
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
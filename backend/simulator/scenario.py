@@ -0,0 +1,215 @@
+"""
+Declarative scenarios for the E-Learning Platform Simulator
+Per-role action weights, multi-step flows, think-time distributions, population mix and bursts from config.yaml
+"""
+
+import logging
+import math
+import random
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("elearning-simulator")
+
+# Defaults for the "scenario" section of config.yaml; the weights reproduce the original hardcoded mix
+DEFAULT_SCENARIO_CONFIG = {
+    "roles": {
+        "student": {
+            "actions": {"browse_courses": 0.1, "view_enrolled_course": 0.1, "make_progress": 0.4,
+                        "check_notifications": 0.4}
+        },
+        "instructor": {
+            "actions": {"create_course": 0.1, "check_enrollments": 0.15, "add_content": 0.2, "update_course": 0.25,
+                        "send_notification": 0.3}
+        },
+        "admin": {
+            "actions": {"view_all_users": 0.33, "view_all_courses": 0.33, "check_course_metrics": 0.34}
+        }
+    },
+    "population": None,  # {total, mix: {role: share}}; overrides num_admins/num_instructors/num_students
+    "bursts": []         # List of {at, duration, multiplier}, in seconds from the start of the simulation
+}
+
+
+class AliasTable:
+    """Vose alias table: O(1) weighted sampling after O(n) setup"""
+
+    def __init__(self, weights: Sequence[float]):
+        total = float(sum(weights))
+        if not weights or total <= 0 or any(w < 0 for w in weights):
+            raise ValueError(f"Weights must be non-negative with a positive sum, got {list(weights)}")
+        n = len(weights)
+        self.prob = [0.0] * n
+        self.alias = [0] * n
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+        # Leftovers are 1.0 up to rounding error
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def sample(self, rng: random.Random) -> int:
+        column = int(rng.random() * len(self.prob))
+        return column if rng.random() < self.prob[column] else self.alias[column]
+
+
+class ThinkTime:
+    """Pause between two actions of a user, drawn from a configured distribution"""
+
+    def __init__(self, distribution: str = "uniform", min: float = 0.0, max: float = None, mean: float = None,
+                 value: float = None, sigma: float = 1.0):
+        if distribution not in ("constant", "uniform", "exponential", "lognormal"):
+            raise ValueError(
+                f"Unknown think time distribution '{distribution}', expected constant, uniform, exponential or lognormal")
+        if distribution == "constant" and value is None:
+            raise ValueError("Constant think time needs a value")
+        if distribution in ("exponential", "lognormal") and not mean:
+            raise ValueError(f"{distribution.capitalize()} think time needs a positive mean")
+        self.distribution = distribution
+        self.min = min
+        self.max = max
+        self.mean = mean
+        self.value = value
+        self.sigma = sigma
+
+    def sample(self, rng: random.Random) -> float:
+        if self.distribution == "constant":
+            delay = self.value
+        elif self.distribution == "uniform":
+            delay = rng.uniform(self.min, self.max if self.max is not None else self.min)
+        elif self.distribution == "exponential":
+            delay = rng.expovariate(1.0 / self.mean)
+        else:
+            # mu is chosen so that the distribution's mean is `mean`
+            delay = rng.lognormvariate(math.log(self.mean) - self.sigma ** 2 / 2, self.sigma)
+        delay = max(delay, self.min)
+        return min(delay, self.max) if self.max is not None else delay
+
+
+class RoleProfile:
+    """Weighted choices of one role; each choice is a single action or a multi-step flow"""
+
+    def __init__(self, role: str, config: Dict[str, Any], think_time: ThinkTime):
+        self.role = role
+        self.choices: List[Tuple[str, ...]] = []
+        weights = []
+        for action, weight in (config.get("actions") or {}).items():
+            self.choices.append((action,))
+            weights.append(weight)
+        for name, flow in (config.get("flows") or {}).items():
+            if not flow.get("steps"):
+                raise ValueError(f"Flow '{name}' of role {role} has no steps")
+            self.choices.append(tuple(flow["steps"]))
+            weights.append(flow.get("weight", 1.0))
+        if not self.choices:
+            raise ValueError(f"Scenario role {role} has no actions or flows")
+        self.table = AliasTable(weights)
+        self.think_time = think_time
+        # Pause between the steps of a flow, e.g. reading a page before the next click
+        self.flow_think_time = ThinkTime(**config["flow_think_time"]) if config.get("flow_think_time") else think_time
+
+    def actions(self) -> set:
+        return {step for choice in self.choices for step in choice}
+
+    def next_steps(self, rng: random.Random) -> Tuple[str, ...]:
+        return self.choices[self.table.sample(rng)]
+
+
+class Scenario:
+    """Role profiles plus the burst timeline of a run"""
+
+    def __init__(self, config: Dict[str, Any], min_delay: float, max_delay: float):
+        default_think_time = ThinkTime("uniform", min=min_delay, max=max_delay)
+        self.profiles = {}
+        for role, role_config in config["roles"].items():
+            think_time = ThinkTime(**role_config["think_time"]) if role_config.get("think_time") else default_think_time
+            self.profiles[role] = RoleProfile(role, role_config, think_time)
+        self.bursts = [(b["at"], b["at"] + b["duration"], b["multiplier"]) for b in config.get("bursts") or []]
+        self.started = time.monotonic()
+
+    def start(self):
+        self.started = time.monotonic()
+
+    def multiplier_at(self, elapsed: float) -> float:
+        """Activity multiplier `elapsed` seconds into the run"""
+        multiplier = 1.0
+        for start, end, factor in self.bursts:
+            if start <= elapsed < end:
+                multiplier *= factor
+        return multiplier
+
+    def think_time(self, role: str, rng: random.Random, in_flow: bool = False) -> float:
+        profile = self.profiles[role]
+        delay = (profile.flow_think_time if in_flow else profile.think_time).sample(rng)
+        if self.bursts:
+            delay /= self.multiplier_at(time.monotonic() - self.started)
+        return delay
+
+
+def merge_config(config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Scenario section over the defaults; a configured role replaces that role's default mix"""
+    config = config or {}
+    return {
+        **DEFAULT_SCENARIO_CONFIG,
+        **config,
+        "roles": {**DEFAULT_SCENARIO_CONFIG["roles"], **(config.get("roles") or {})}
+    }
+
+
+def population_counts(population: Dict[str, Any]) -> Dict[str, int]:
+    """Split population.total users across roles by share, rounding by largest remainder"""
+    mix = population["mix"]
+    total = int(population["total"])
+    share_sum = float(sum(mix.values()))
+    exact = {role: total * share / share_sum for role, share in mix.items()}
+    counts = {role: int(value) for role, value in exact.items()}
+    remainder = total - sum(counts.values())
+    for role in sorted(exact, key=lambda r: exact[r] - counts[r], reverse=True)[:remainder]:
+        counts[role] += 1
+    return counts
+
+
+_scenario: Optional[Scenario] = None
+
+
+def configure(config: Dict[str, Any], min_delay: float, max_delay: float):
+    """Apply the "scenario" config section"""
+    global _scenario
+    _scenario = Scenario(merge_config(config), min_delay, max_delay)
+
+
+def check_actions(role: str, user_class):
+    """Fail fast on scenario steps the role's user class does not implement"""
+    if _scenario is None or role not in _scenario.profiles:
+        return
+    missing = [name for name in _scenario.profiles[role].actions() if not callable(getattr(user_class, name, None))]
+    if missing:
+        raise ValueError(f"Scenario for role {role} uses unknown actions: {', '.join(sorted(missing))}")
+
+
+def start():
+    """Mark the start of the run that burst offsets are measured from"""
+    if _scenario is not None:
+        _scenario.start()
+
+
+def next_steps(role: str, rng: random.Random) -> Tuple[str, ...]:
+    return _scenario.profiles[role].next_steps(rng)
+
+
+def think_time(role: str, rng: random.Random, in_flow: bool = False) -> float:
+    return _scenario.think_time(role, rng, in_flow)
+
+
+def multiplier_at(elapsed: float) -> float:
+    return _scenario.multiplier_at(elapsed) if _scenario is not None else 1.0
+
+
+def has_bursts() -> bool:
+    return _scenario is not None and bool(_scenario.bursts)
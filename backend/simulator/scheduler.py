@@ -0,0 +1,300 @@
+"""
+Open-loop load scheduling for the E-Learning Platform Simulator
+Issues actions at a target arrival rate instead of after each user's think time, so a slow
+backend does not lower the offered load (coordinated omission)
+"""
+
+import logging
+import queue
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from metrics import LatencyHistogram
+
+logger = logging.getLogger("elearning-simulator")
+
+# Defaults for the "scheduler" section of config.yaml
+DEFAULT_SCHEDULER_CONFIG = {
+    "mode": "closed",       # "closed": per-user think time, "open": target arrival rate
+    "schedule": "constant",  # constant | ramp | step | poisson
+    "rate": 10,             # Actions per second for constant and poisson schedules
+    "start_rate": 1,        # Ramp start rate
+    "end_rate": 50,         # Ramp end rate
+    "ramp_duration": 300,   # Seconds to go from start_rate to end_rate
+    "steps": [],            # Step schedule: list of {rate, duration}
+    "poisson": False,       # Exponential gaps between arrivals for ramp and step schedules too
+    "duration": None,       # Stop issuing actions after this many seconds
+    "workers": 256,         # Threaded engine: actions in flight at once
+    "max_backlog": 10000    # Due actions allowed to wait for a free user before new ones are dropped
+}
+
+_IDLE_TICK = 0.1  # Seconds to wait before re-checking a schedule whose current rate is zero
+
+
+class ArrivalSchedule:
+    """Target arrival rate over time and the arrival times derived from it"""
+
+    def __init__(self, poisson: bool = False, duration: Optional[float] = None, rng: random.Random = None):
+        self.poisson = poisson
+        self.duration = duration
+        self.rng = rng or random.Random()
+
+    def rate_at(self, elapsed: float) -> float:
+        """Actions per second `elapsed` seconds after the start"""
+        raise NotImplementedError
+
+    def next_arrival(self, elapsed: float) -> Optional[float]:
+        """Offset of the arrival after `elapsed`, or None once the schedule is over"""
+        while self.duration is None or elapsed < self.duration:
+            rate = self.rate_at(elapsed)
+            if rate > 0:
+                gap = self.rng.expovariate(rate) if self.poisson else 1.0 / rate
+                return elapsed + gap
+            elapsed += _IDLE_TICK
+        return None
+
+
+class ConstantSchedule(ArrivalSchedule):
+    def __init__(self, rate: float, **kwargs):
+        super().__init__(**kwargs)
+        self.rate = rate
+
+    def rate_at(self, elapsed: float) -> float:
+        return self.rate
+
+
+class RampSchedule(ArrivalSchedule):
+    """Linear change from start_rate to end_rate, then holds end_rate"""
+
+    def __init__(self, start_rate: float, end_rate: float, ramp_duration: float, **kwargs):
+        super().__init__(**kwargs)
+        self.start_rate = start_rate
+        self.end_rate = end_rate
+        self.ramp_duration = ramp_duration
+
+    def rate_at(self, elapsed: float) -> float:
+        if elapsed >= self.ramp_duration:
+            return self.end_rate
+        return self.start_rate + (self.end_rate - self.start_rate) * elapsed / self.ramp_duration
+
+
+class StepSchedule(ArrivalSchedule):
+    """Sequence of constant rates, each held for its duration; the last step is held afterwards"""
+
+    def __init__(self, steps: List[Dict[str, float]], **kwargs):
+        super().__init__(**kwargs)
+        if not steps:
+            raise ValueError("Step schedule needs at least one step")
+        self.steps = steps
+
+    def rate_at(self, elapsed: float) -> float:
+        for step in self.steps:
+            if elapsed < step["duration"]:
+                return step["rate"]
+            elapsed -= step["duration"]
+        return self.steps[-1]["rate"]
+
+
+class BurstSchedule(ArrivalSchedule):
+    """Another schedule with its rate scaled by a time-dependent multiplier, e.g. scenario bursts"""
+
+    def __init__(self, schedule: ArrivalSchedule, multiplier):
+        super().__init__(poisson=schedule.poisson, duration=schedule.duration, rng=schedule.rng)
+        self.schedule = schedule
+        self.multiplier = multiplier
+
+    def rate_at(self, elapsed: float) -> float:
+        return self.schedule.rate_at(elapsed) * self.multiplier(elapsed)
+
+
+def build_schedule(config: Dict[str, Any], rng: random.Random = None) -> ArrivalSchedule:
+    """Create the arrival schedule described by a "scheduler" config section"""
+    config = {**DEFAULT_SCHEDULER_CONFIG, **config}
+    kwargs = {"poisson": config["poisson"], "duration": config["duration"], "rng": rng}
+    kind = config["schedule"]
+    if kind == "constant":
+        return ConstantSchedule(config["rate"], **kwargs)
+    if kind == "poisson":
+        kwargs["poisson"] = True
+        return ConstantSchedule(config["rate"], **kwargs)
+    if kind == "ramp":
+        return RampSchedule(config["start_rate"], config["end_rate"], config["ramp_duration"], **kwargs)
+    if kind == "step":
+        return StepSchedule(config["steps"], **kwargs)
+    raise ValueError(f"Unknown schedule '{kind}', expected constant, ramp, step or poisson")
+
+
+def scale_schedule_config(config: Dict[str, Any], factor: float) -> Dict[str, Any]:
+    """Scale every rate in a "scheduler" config section, e.g. to split it across shards"""
+    scaled = dict(config)
+    for key in ("rate", "start_rate", "end_rate"):
+        if key in scaled:
+            scaled[key] = scaled[key] * factor
+    if scaled.get("steps"):
+        scaled["steps"] = [{**step, "rate": step["rate"] * factor} for step in scaled["steps"]]
+    return scaled
+
+
+class OpenLoopRunner:
+    """Threaded open-loop driver: one scheduler thread feeding a fixed pool of worker threads"""
+
+    def __init__(self, users: List, schedule: ArrivalSchedule, workers: int = 256, max_backlog: int = 10000):
+        self.schedule = schedule
+        self.workers = max(1, min(workers, len(users)))
+        self.max_backlog = max_backlog
+        self.idle_users = queue.Queue()
+        for user in users:
+            self.idle_users.put(user)
+        self.due = queue.Queue()
+        self.active = False
+        self.threads = []
+        self.lag = LatencyHistogram()  # Microseconds between intended and actual start of each action
+        self.issued = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.active = True
+        self.threads.append(threading.Thread(target=self._schedule_loop, daemon=True, name="open-loop-scheduler"))
+        for i in range(self.workers):
+            self.threads.append(threading.Thread(target=self._work_loop, daemon=True, name=f"open-loop-{i}"))
+        for thread in self.threads:
+            thread.start()
+
+    def _schedule_loop(self):
+        origin = time.perf_counter()
+        elapsed = 0.0
+        while self.active:
+            elapsed = self.schedule.next_arrival(elapsed)
+            if elapsed is None:
+                logger.info("Open-loop schedule finished")
+                return
+            intended = origin + elapsed
+            delay = intended - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            if self.due.qsize() >= self.max_backlog:
+                with self._lock:
+                    self.dropped += 1
+                continue
+            self.due.put(intended)
+
+    def _work_loop(self):
+        while self.active:
+            intended = self.due.get()
+            if intended is None:
+                return
+            user = self.idle_users.get()
+            try:
+                if user.id is None:
+                    user.set_user_id()
+                with self._lock:
+                    self.lag.record(int(max(0.0, time.perf_counter() - intended) * 1_000_000))
+                    self.issued += 1
+                # The action's first request is timed from when it should have started
+                user.intended_start = intended
+                user.perform_action()
+            except Exception as e:
+                logger.error("Error in open-loop action for %s: %s", user, e)
+            finally:
+                user.intended_start = None
+                self.idle_users.put(user)
+
+    def stats(self) -> Dict[str, Any]:
+        """Scheduling counters: actions issued and dropped, backlog and start lag (ms)"""
+        with self._lock:
+            return {
+                "issued": self.issued,
+                "dropped": self.dropped,
+                "backlog": self.due.qsize(),
+                "lag_p50": self.lag.percentile(0.50) / 1000,
+                "lag_p99": self.lag.percentile(0.99) / 1000
+            }
+
+    def stop(self, timeout: float = 2):
+        self.active = False
+        for _ in range(self.workers):
+            self.due.put(None)
+        # Workers blocked waiting for a free user are daemons; give all threads one shared deadline
+        deadline = time.perf_counter() + timeout
+        for thread in self.threads:
+            thread.join(timeout=max(0.0, deadline - time.perf_counter()))
+
+
+class AsyncOpenLoopRunner(OpenLoopRunner):
+    """Open-loop driver for the async engine: a scheduler coroutine spawning one task per due action"""
+
+    def __init__(self, users: List, schedule: ArrivalSchedule, max_backlog: int = 10000):
+        super().__init__(users, schedule, workers=1, max_backlog=max_backlog)
+        self.users = users
+        self.idle_users = None
+        self.waiting = 0
+        self.tasks = set()
+
+    async def run(self):
+        """Issue actions until the schedule ends or the task is cancelled"""
+        import asyncio
+
+        self.active = True
+        self.idle_users = asyncio.Queue()
+        for user in self.users:
+            self.idle_users.put_nowait(user)
+
+        origin = time.perf_counter()
+        elapsed = 0.0
+        try:
+            while self.active:
+                elapsed = self.schedule.next_arrival(elapsed)
+                if elapsed is None:
+                    logger.info("Open-loop schedule finished")
+                    return
+                intended = origin + elapsed
+                delay = intended - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                if self.waiting >= self.max_backlog:
+                    self.dropped += 1
+                    continue
+                task = asyncio.ensure_future(self._dispatch(intended))
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+        finally:
+            for task in list(self.tasks):
+                task.cancel()
+
+    async def _dispatch(self, intended: float):
+        import asyncio
+
+        self.waiting += 1
+        try:
+            user = await self.idle_users.get()
+        finally:
+            self.waiting -= 1
+        try:
+            if user.id is None:
+                await user.set_user_id()
+            self.lag.record(int(max(0.0, time.perf_counter() - intended) * 1_000_000))
+            self.issued += 1
+            user.intended_start = intended
+            await user.perform_action()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Error in open-loop action for %s: %s", user, e)
+        finally:
+            user.intended_start = None
+            self.idle_users.put_nowait(user)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "issued": self.issued,
+            "dropped": self.dropped,
+            "backlog": self.waiting,
+            "lag_p50": self.lag.percentile(0.50) / 1000,
+            "lag_p99": self.lag.percentile(0.99) / 1000
+        }
+
+    def stop(self, timeout: float = 2):
+        self.active = False
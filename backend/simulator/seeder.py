@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Bulk data seeding for the E-Learning Platform Simulator
+Builds a large dataset (users, courses, content, enrollments, progress) through the backend's bulk endpoints
+with many batches in flight, checkpointing after each batch so an interrupted seed resumes where it stopped
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import aiohttp
+import yaml
+
+import codec
+import http_pool
+import metrics
+
+logger = logging.getLogger("elearning-simulator")
+
+# Defaults for the "seeder" section of config.yaml
+DEFAULT_SEEDER_CONFIG = {
+    "instructors": 100,
+    "students": 10000,
+    "courses": 10000,
+    "contents_per_course": 3,
+    "enrollments_per_student": 100,  # Distinct courses per student; 10000 students x 100 = 1M enrollments
+    "progress_per_enrollment": 1,    # Content items completed per enrollment, in course order
+    "batch_size": 1000,              # Rows per bulk request (the backend accepts up to 5000)
+    "concurrency": 8,                # Bulk requests in flight
+    "retries": 5,                    # Attempts per batch on no response, 429 or 5xx; see Seeder._post
+    "timeout": 120,                  # Seconds per bulk request
+    "checkpoint": "seed-checkpoint.json",
+    "checkpoint_interval": 2,        # Seconds between checkpoint writes (courses and content: every batch)
+    "seed": 42                       # Makes titles, content and time spent reproducible
+}
+
+STAGES = ("users", "courses", "content", "enrollments", "progress")
+
+# Settings that decide which rows go into which batch; a checkpoint is only valid for the same values
+_SHAPE_KEYS = ("instructors", "students", "courses", "contents_per_course", "enrollments_per_student",
+               "progress_per_enrollment", "batch_size", "seed")
+
+# Smallest stride between consecutive students' first courses; see _course_stride
+_COURSE_STRIDE = 7919
+
+
+def _course_stride(courses: int) -> int:
+    """Smallest prime from _COURSE_STRIDE up that does not divide the catalog size, so students'
+    first courses cover every course instead of clustering on a few"""
+    stride = _COURSE_STRIDE
+    while courses % stride == 0 or any(stride % d == 0 for d in range(2, int(stride ** 0.5) + 1)):
+        stride += 1
+    return stride
+
+
+class SeedError(Exception):
+    """A batch was rejected by the backend or kept failing after its retries"""
+
+
+class Checkpoint:
+    """Completed batches of every stage and the ids they created, kept in a JSON file"""
+
+    def __init__(self, path: str, shape: Dict[str, Any], interval: float):
+        self.path = path
+        self.interval = interval
+        self.state = {"version": 1, "shape": shape, "stages": {stage: {"batches": {}, "complete": False}
+                                                               for stage in STAGES}}
+        self._dirty = False
+        self._saved_at = 0.0
+
+    def load(self) -> bool:
+        """Resume from the file when it exists; returns whether it did"""
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, "r") as file:
+            state = json.load(file)
+        if state.get("shape") != self.state["shape"]:
+            raise SeedError(f"Checkpoint {self.path} was written for different seeder settings; "
+                            f"remove it or run with --fresh")
+        self.state = state
+        return True
+
+    def batches(self, stage: str) -> Dict[str, Any]:
+        return self.state["stages"][stage]["batches"]
+
+    def complete(self, stage: str) -> bool:
+        return self.state["stages"][stage]["complete"]
+
+    def done(self, stage: str, batch: int, ids: Optional[List[int]] = None, sync: bool = False):
+        """Record a completed batch; sync saves it at once instead of within the checkpoint interval"""
+        self.batches(stage)[str(batch)] = ids
+        self._dirty = True
+        if sync or time.monotonic() - self._saved_at >= self.interval:
+            self.save()
+
+    def finish(self, stage: str):
+        self.state["stages"][stage]["complete"] = True
+        self._dirty = True
+        self.save()
+
+    def ids(self, stage: str) -> List[int]:
+        """Ids created by a stage, in batch order"""
+        batches = self.batches(stage)
+        return [id_ for batch in sorted(batches, key=int) for id_ in batches[batch] or []]
+
+    def save(self):
+        if not self._dirty:
+            return
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as file:
+            json.dump(self.state, file, separators=(",", ":"))
+        os.replace(temp_path, self.path)  # Atomic, so a crash never leaves half a checkpoint
+        self._dirty = False
+        self._saved_at = time.monotonic()
+
+
+class Seeder:
+    """Runs the seeding stages in order against the bulk endpoints"""
+
+    def __init__(self, config: Dict[str, Any], fresh: bool = False):
+        self.api_url = config["api_url"]
+        self.passwords = config["user_passwords"]
+        self.course_topics = config["course_topics"]
+        self.content_types = config["content_types"]
+        self.config = {**DEFAULT_SEEDER_CONFIG, **(config.get("seeder") or {})}
+        if self.config["enrollments_per_student"] > self.config["courses"]:
+            raise ValueError("enrollments_per_student cannot exceed the number of courses")
+        if self.config["courses"] and not self.config["instructors"]:
+            raise ValueError("Courses need at least one instructor")
+        self.checkpoint = Checkpoint(self.config["checkpoint"], {key: self.config[key] for key in _SHAPE_KEYS},
+                                     self.config["checkpoint_interval"])
+        if fresh and os.path.exists(self.checkpoint.path):
+            os.remove(self.checkpoint.path)
+        self.session: aiohttp.ClientSession = None
+        self.token = None
+        self.report: Dict[str, Dict[str, float]] = {}
+
+    # Rows of each stage, generated deterministically so a resumed stage rebuilds the same batches
+
+    def _user_rows(self) -> Iterator[Dict[str, Any]]:
+        # Named like the simulator's users, so a later run logs in to the seeded accounts
+        for role, count in (("instructor", self.config["instructors"]), ("student", self.config["students"])):
+            for i in range(count):
+                yield {"name": f"{role.title()} {i + 1}", "email": f"{role}{i + 1}@example.com",
+                       "password": self.passwords[role], "role": role}
+
+    def _course_rows(self, instructor_ids: List[int]) -> Iterator[Dict[str, Any]]:
+        rng = random.Random(f"{self.config['seed']}:courses")
+        for i in range(self.config["courses"]):
+            topic = rng.choice(self.course_topics)
+            yield {"title": f"{topic} {i + 1}", "description": f"Seeded course on {topic}",
+                   "instructor_id": instructor_ids[i % len(instructor_ids)]}
+
+    def _content_rows(self, course_ids: List[int]) -> Iterator[Dict[str, Any]]:
+        rng = random.Random(f"{self.config['seed']}:content")
+        for course_id in course_ids:
+            for order in range(1, self.config["contents_per_course"] + 1):
+                content_type = rng.choice(self.content_types)
+                yield {"course_id": course_id, "type": content_type, "order": order,
+                       "content": {"title": f"{content_type.title()} {order}",
+                                   "url": f"https://example.com/{content_type}/{course_id}/{order}"}}
+
+    def _enrolled_pairs(self, student_ids: List[int], course_ids: List[int]) -> Iterator[Tuple[int, int]]:
+        """(student index, course index) of every enrollment; distinct courses per student"""
+        stride = _course_stride(len(course_ids))
+        for student in range(len(student_ids)):
+            first = student * stride
+            for j in range(self.config["enrollments_per_student"]):
+                yield student, (first + j) % len(course_ids)
+
+    def _enrollment_rows(self, student_ids: List[int], course_ids: List[int]) -> Iterator[Dict[str, Any]]:
+        for student, course in self._enrolled_pairs(student_ids, course_ids):
+            yield {"user_id": student_ids[student], "course_id": course_ids[course]}
+
+    def _progress_rows(self, student_ids: List[int], course_ids: List[int],
+                       content_ids: List[int]) -> Iterator[Dict[str, Any]]:
+        rng = random.Random(f"{self.config['seed']}:progress")
+        per_course = self.config["contents_per_course"]
+        completed = min(self.config["progress_per_enrollment"], per_course)
+        for student, course in self._enrolled_pairs(student_ids, course_ids):
+            # Content ids were created course by course, per_course at a time
+            for content_id in content_ids[course * per_course:course * per_course + completed]:
+                yield {"user_id": student_ids[student], "course_id": course_ids[course],
+                       "content_id": content_id, "time_spent": rng.randint(30, 3600)}
+
+    # Requests
+
+    async def _login(self):
+        """Log in as admin1, registering it first on an empty database"""
+        admin = {"name": "Admin 1", "email": "admin1@example.com", "password": self.passwords["admin"],
+                 "role": "admin"}
+        for attempt in range(2):
+            async with self.session.post(f"{self.api_url}/users/login",
+                                         json={"email": admin["email"], "password": admin["password"]}) as response:
+                body = await response.read()
+            if response.status < 400:
+                self.token = codec.loads(body).get("data")
+                return
+            if attempt == 0:
+                async with self.session.post(f"{self.api_url}/users/register", json=admin) as response:
+                    await response.read()
+        raise SeedError(f"Could not log in as {admin['email']}: {body.decode('utf-8', errors='replace')}")
+
+    async def _post(self, endpoint: str, payload: Dict[str, Any], idempotent: bool = True) -> Dict[str, Any]:
+        """POST one batch, retrying transient failures with jittered backoff
+
+        A batch that is not idempotent is only retried when the backend cannot have created it: on a failed
+        connect, 401 or 429, not after a timeout or 5xx that may have come after the commit.
+        """
+        body = codec.dumps(payload)
+        timeout = aiohttp.ClientTimeout(total=self.config["timeout"])
+        for attempt in range(self.config["retries"]):
+            started = time.perf_counter()
+            status, content = 0, b""
+            sent = True
+            try:
+                async with self.session.post(f"{self.api_url}/{endpoint}", data=body, timeout=timeout, headers={
+                        "Authorization": f"Bearer {self.token}", "Content-Type": "application/json"}) as response:
+                    status, content = response.status, await response.read()
+            except aiohttp.ClientConnectorError as e:
+                sent = False
+                logger.warning("Seeding %s failed: %s", endpoint, e)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning("Seeding %s failed: %s", endpoint, e)
+            metrics.registry.record("post", endpoint, status, time.perf_counter() - started, "admin")
+            if status == 401:
+                await self._login()
+                continue
+            if 0 < status < 400:
+                return codec.loads(content)
+            if 400 <= status < 500 and status != 429:
+                raise SeedError(f"{endpoint} rejected a batch ({status}): "
+                                f"{content.decode('utf-8', errors='replace')[:500]}")
+            if not idempotent and sent and status != 429:
+                raise SeedError(f"{endpoint} failed a batch ({status or 'no response'}) that the backend may have "
+                                f"created; not retrying it to avoid duplicates. Check the data before resuming")
+            await asyncio.sleep(random.uniform(0, min(30, 0.5 * 2 ** attempt)))
+        raise SeedError(f"{endpoint} kept failing after {self.config['retries']} attempts")
+
+    async def _run_stage(self, stage: str, endpoint: str, key: str, rows: Iterator[Dict[str, Any]],
+                         ids_of=None, idempotent: bool = True):
+        """Send a stage's rows in batches, skipping batches the checkpoint has, with `concurrency` in flight
+
+        ids_of(rows, response) returns the ids a batch created, in row order, when later stages need them.
+        Batches of a stage that is not idempotent are checkpointed as soon as they complete, so a resumed
+        stage never sends them again.
+        """
+        if self.checkpoint.complete(stage):
+            logger.info("Seeding %s: already complete", stage)
+            return
+        batch_size = self.config["batch_size"]
+        done = self.checkpoint.batches(stage)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.config["concurrency"] * 2)
+        started = time.perf_counter()
+        sent = {"rows": 0, "batches": 0}
+
+        async def work():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                number, batch = item
+                response = await self._post(endpoint, {key: batch}, idempotent)
+                self.checkpoint.done(stage, number, ids_of(batch, response) if ids_of else None, not idempotent)
+                sent["rows"] += len(batch)
+                sent["batches"] += 1
+                if sent["batches"] % 50 == 0:
+                    logger.info("Seeding %s: %d rows (%.0f rows/s)",
+                                stage, sent["rows"], sent["rows"] / (time.perf_counter() - started))
+
+        workers = [asyncio.ensure_future(work()) for _ in range(self.config["concurrency"])]
+        try:
+            number, batch = 0, []
+            for row in rows:
+                batch.append(row)
+                if len(batch) == batch_size:
+                    if str(number) not in done:
+                        await self._put(queue, workers, (number, batch))
+                    number, batch = number + 1, []
+            if batch and str(number) not in done:
+                await self._put(queue, workers, (number, batch))
+            for _ in workers:
+                await self._put(queue, workers, None)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            self.checkpoint.save()
+
+        self.checkpoint.finish(stage)
+        elapsed = time.perf_counter() - started
+        self.report[stage] = {"rows": sent["rows"], "batches": sent["batches"], "seconds": elapsed}
+        logger.info("Seeding %s: done, %d rows in %.1fs (%.0f rows/s)",
+                    stage, sent["rows"], elapsed, sent["rows"] / max(elapsed, 1e-9))
+
+    @staticmethod
+    async def _put(queue: asyncio.Queue, workers: List[asyncio.Future], item):
+        """Queue a batch, surfacing a worker's failure instead of waiting on a queue nobody drains"""
+        while True:
+            failed = next((worker for worker in workers if worker.done()), None)
+            if failed is not None and failed.exception() is not None:
+                raise failed.exception()
+            try:
+                await asyncio.wait_for(queue.put(item), 1)
+                return
+            except asyncio.TimeoutError:
+                continue
+
+    @staticmethod
+    def _user_ids(rows: List[Dict[str, Any]], response: Dict[str, Any]) -> List[int]:
+        # Existing users come back first, so match them to the rows by email
+        ids = {user["email"]: user["id"] for user in response["data"]}
+        return [ids[row["email"]] for row in rows]
+
+    @staticmethod
+    def _created_ids(rows: List[Dict[str, Any]], response: Dict[str, Any]) -> List[int]:
+        return [item["id"] for item in response["data"]]
+
+    async def _seed(self):
+        self.session = http_pool.create_async_session()
+        try:
+            await self._login()
+            await self._run_stage("users", "users/bulk", "users", self._user_rows(), self._user_ids)
+            user_ids = self.checkpoint.ids("users")
+            instructor_ids = user_ids[:self.config["instructors"]]
+            student_ids = user_ids[self.config["instructors"]:]
+
+            # Courses and content have no natural key, so a batch sent twice is created twice
+            await self._run_stage("courses", "courses/bulk", "courses", self._course_rows(instructor_ids),
+                                  self._created_ids, idempotent=False)
+            course_ids = self.checkpoint.ids("courses")
+            await self._run_stage("content", "course-content/bulk", "items", self._content_rows(course_ids),
+                                  self._created_ids, idempotent=False)
+            content_ids = self.checkpoint.ids("content")
+            if student_ids and course_ids:
+                await self._run_stage("enrollments", "enrollments/bulk", "enrollments",
+                                      self._enrollment_rows(student_ids, course_ids))
+                await self._run_stage("progress", "progress/bulk", "records",
+                                      self._progress_rows(student_ids, course_ids, content_ids))
+        finally:
+            await self.session.close()
+
+    def run(self) -> Dict[str, Dict[str, float]]:
+        """Seed every stage not yet complete; returns rows, batches and seconds per stage run"""
+        if self.checkpoint.load():
+            logger.info("Resuming seeding from %s", self.checkpoint.path)
+        asyncio.run(self._seed())
+        return self.report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed the E-Learning Platform with a large generated dataset")
+    parser.add_argument("config", nargs="?", default="config.yaml", help="Simulator config with a seeder section")
+    parser.add_argument("--fresh", action="store_true", help="Ignore and replace an existing checkpoint")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    with open(args.config, "r") as file:
+        config = yaml.safe_load(file)
+    http_pool.configure(config.get("http"))
+    codec.configure(config.get("codec"))
+    try:
+        report = Seeder(config, fresh=args.fresh).run()
+    except (SeedError, ValueError) as e:
+        logger.error("Seeding failed: %s", e)
+        return 1
+    except KeyboardInterrupt:
+        logger.info("Seeding interrupted; run again to resume from the checkpoint")
+        return 1
+    for stage, stats in report.items():
+        logger.info("%s: %d rows in %d batches, %.1fs", stage, stats["rows"], stats["batches"], stats["seconds"])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
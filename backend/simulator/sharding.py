@@ -0,0 +1,106 @@
+"""
+Multi-process sharding for the E-Learning Platform Simulator
+Splits the simulated population across worker processes and collects their stats
+"""
+
+import logging
+import os
+import queue
+import threading
+from typing import Any, Callable, Dict, List, Tuple
+
+logger = logging.getLogger("elearning-simulator")
+
+ROLES = ("admin", "instructor", "student")
+
+
+def split_range(start: int, stop: int, shards: int) -> List[Tuple[int, int]]:
+    """Split range(start, stop) into `shards` contiguous (start, stop) slices of near-equal size"""
+    base, extra = divmod(stop - start, shards)
+    slices = []
+    for i in range(shards):
+        end = start + base + (1 if i < extra else 0)
+        slices.append((start, end))
+        start = end
+    return slices
+
+
+def partition(user_ranges: Dict[str, Tuple[int, int]], shards: int) -> List[Dict[str, Tuple[int, int]]]:
+    """Assign each shard a slice of every role's user index range"""
+    per_role = {role: split_range(*user_ranges[role], shards) for role in ROLES}
+    return [{role: per_role[role][i] for role in ROLES} for i in range(shards)]
+
+
+class ShardCoordinator:
+    """Starts one worker process per shard, keeps their latest stats and stops them together"""
+
+    kind = "shard"
+
+    def __init__(self, target: Callable, config: Dict[str, Any], plans: List[Dict[str, Tuple[int, int]]]):
+        self.target = target
+        self.config = config
+        self.plans = plans
+        import multiprocessing  # Shard workers never coordinate, so only the coordinator loads it
+
+        self.context = multiprocessing.get_context("spawn")
+        self.stop_event = self.context.Event()
+        self.stats_queue = self.context.Queue()
+        self.processes = []
+        self.latest = {}  # Shard index -> last stats snapshot received
+        self._lock = threading.Lock()
+        self._collector = None
+
+    def prepare(self):
+        """Nothing to do before the start; each shard sets up its own users once launched"""
+
+    def start(self):
+        """Launch the shard processes and the stats collector"""
+        for index, plan in enumerate(self.plans):
+            process = self.context.Process(
+                target=self.target,
+                args=(self.config, index, plan, self.stop_event, self.stats_queue),
+                name=f"shard-{index}",
+                daemon=True
+            )
+            process.start()
+            self.processes.append(process)
+            logger.info("Started shard %d (pid %d) with users %s", index, process.pid, plan)
+
+        self._collector = threading.Thread(target=self._collect, daemon=True, name="shard-stats")
+        self._collector.start()
+
+    def signal(self, signum: int):
+        """Pass a signal, such as the sampling profiler's switch, on to the running shards"""
+        for process in self.processes:
+            if process.is_alive():
+                os.kill(process.pid, signum)
+
+    def _collect(self):
+        while True:
+            try:
+                index, stats = self.stats_queue.get(timeout=1)
+            except queue.Empty:
+                if self.stop_event.is_set() and not any(p.is_alive() for p in self.processes):
+                    return
+                continue
+            except (EOFError, OSError):
+                return
+            with self._lock:
+                self.latest[index] = stats
+
+    def shard_stats(self) -> List[Dict[str, Any]]:
+        """Return the latest stats snapshot of every shard that has reported"""
+        with self._lock:
+            return list(self.latest.values())
+
+    def stop(self, timeout: float = 10):
+        """Signal every shard to stop and wait for them to exit"""
+        self.stop_event.set()
+        for process in self.processes:
+            process.join(timeout=timeout)
+            if process.is_alive():
+                logger.warning("Shard %s did not stop in time, terminating", process.name)
+                process.terminate()
+                process.join(timeout=2)
+        if self._collector is not None:
+            self._collector.join(timeout=2)
@@ -0,0 +1,140 @@
+"""
+Startup cost tracking for the E-Learning Platform Simulator
+Times the phases between process start and generated load, and caches the parsed config so a
+container or shard does not re-parse the same YAML on every start
+"""
+
+import binascii
+import contextlib
+import json
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("elearning-simulator")
+
+# Heavy modules that are imported on first use; the report lists which of them a run ended up loading
+DEFERRED_MODULES = ("yaml", "requests", "asyncio", "aiohttp", "tenacity", "multiprocessing", "http.server")
+
+CACHE_VERSION = 1
+
+_parsed: Dict[str, Tuple[str, str]] = {}  # Absolute path -> (content key, config as JSON) for this process
+
+
+def process_age() -> Optional[float]:
+    """Seconds since the process started, from /proc; None where that is not available"""
+    try:
+        with open("/proc/self/stat", "rb") as file:
+            # The command name may contain spaces, so fields are counted from its closing parenthesis
+            start_ticks = int(file.read().rsplit(b")", 1)[1].split()[19])
+        with open("/proc/uptime", "rb") as file:
+            uptime = float(file.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class StartupProfiler:
+    """Wall time of each named startup phase, in order"""
+
+    def __init__(self, started: float = None):
+        self.started = started if started is not None else time.perf_counter()
+        age = process_age()
+        # Interpreter start up to `started`, before any phase ran
+        self.interpreter = max(0.0, age - (time.perf_counter() - self.started)) if age is not None else None
+        self.phases: List[Tuple[str, float, str]] = []
+
+    def record(self, name: str, seconds: float, note: str = ""):
+        self.phases.append((name, seconds, note))
+
+    @contextlib.contextmanager
+    def phase(self, name: str, note: str = ""):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started, note)
+
+    def total(self) -> float:
+        return sum(seconds for _, seconds, _ in self.phases) + (self.interpreter or 0.0)
+
+    def report(self, budget: float = None) -> List[str]:
+        total = self.total()
+        lines = ["--- STARTUP ---"]
+        rows = ([("interpreter", self.interpreter, "")] if self.interpreter is not None else []) + self.phases
+        for name, seconds, note in rows:
+            share = seconds / total if total else 0.0
+            lines.append(f"{name}: {seconds * 1000:.1f}ms ({share:.0%})" + (f" - {note}" if note else ""))
+        lines.append(f"Total: {total * 1000:.1f}ms" + (f" of a {budget * 1000:.0f}ms budget" if budget else ""))
+        loaded = [name for name in DEFERRED_MODULES if name in sys.modules]
+        lines.append(f"Modules loaded: {len(sys.modules)}; deferred modules in use: {', '.join(loaded) or 'none'}")
+        lines.append("---------------")
+        return lines
+
+    def over_budget(self, budget: float) -> bool:
+        return budget is not None and self.total() > budget
+
+
+def _cache_path(path: str) -> str:
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.cache.json")
+
+
+def _parse_yaml(content: bytes) -> Dict[str, Any]:
+    import yaml
+
+    # libyaml's loader is several times faster than the pure Python one when PyYAML was built with it
+    return yaml.load(content, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+
+
+def load_config(path: str, use_cache: bool = True) -> Tuple[Dict[str, Any], str]:
+    """Parse a YAML config, reusing an earlier parse of the same content; returns (config, source)
+
+    The parse is kept in memory and in a JSON file next to the config, keyed by the content's hash, so
+    an edited config is always re-read. Source is "memory", "cache" or "yaml".
+    """
+    path = os.path.abspath(path)
+    with open(path, "rb") as file:
+        content = file.read()
+    # CRC and length of the content; hashlib would add more import time than the whole cached load takes
+    digest = f"{binascii.crc32(content):08x}-{len(content)}"
+
+    if use_cache:
+        parsed = _parsed.get(path)
+        if parsed is not None and parsed[0] == digest:
+            return json.loads(parsed[1]), "memory"  # A fresh copy, as callers may modify it
+        try:
+            with open(_cache_path(path), "r") as file:
+                cached = json.load(file)
+            if cached.get("version") == CACHE_VERSION and cached.get("key") == digest:
+                _parsed[path] = (digest, json.dumps(cached["config"]))
+                return cached["config"], "cache"
+        except (OSError, ValueError):
+            pass
+
+    config = _parse_yaml(content)
+    if use_cache:
+        _store(path, digest, config)
+    return config, "yaml"
+
+
+def _store(path: str, digest: str, config: Dict[str, Any]):
+    try:
+        encoded = json.dumps(config)
+    except (TypeError, ValueError):
+        return  # YAML-only types such as dates; parse the YAML every time
+    if json.loads(encoded) != config:
+        return  # e.g. integer keys, which JSON turns into strings
+    _parsed[path] = (digest, encoded)
+    temp_path = f"{_cache_path(path)}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "w") as file:
+            file.write(f'{{"version": {CACHE_VERSION}, "key": "{digest}", "config": {encoded}}}')
+        os.replace(temp_path, _cache_path(path))
+    except OSError as e:
+        # A read-only config directory (e.g. a mounted volume) only loses the cache
+        logger.debug("Could not cache config %s: %s", path, e)
+        with contextlib.suppress(OSError):
+            os.remove(temp_path)
@@ -0,0 +1,53 @@
+"""
+Lazy response bodies read by several threads at once, as catalog cache entries are
+Run from backend/simulator with: python -m unittest discover -s tests -t .
+"""
+
+import sys
+import threading
+import unittest
+
+import codec
+
+
+class LazyResultTest(unittest.TestCase):
+
+    def setUp(self):
+        # Switch threads as often as possible, so readers interleave inside the decode
+        self.switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+
+    def tearDown(self):
+        sys.setswitchinterval(self.switch_interval)
+
+    def test_shared_result_decodes_once(self):
+        body = b'{"status":"success","data":[' + b",".join(b'{"id":%d}' % i for i in range(2000)) + b"]}"
+        for _ in range(200):
+            codec.stats.reset()
+            result = codec.parse(body, lazy=True)
+            calls = []
+            codec.when_decoded(result, calls.append)
+            start = threading.Barrier(8)
+
+            def read():
+                start.wait()
+                self.assertEqual(len(result["data"]), 2000)
+
+            readers = [threading.Thread(target=read) for _ in range(8)]
+            for reader in readers:
+                reader.start()
+            for reader in readers:
+                reader.join()
+            self.assertEqual(len(calls), 1)
+            self.assertEqual(codec.stats.snapshot()["decoded"], 1)
+
+    def test_callback_runs_at_once_for_a_decoded_result(self):
+        result = codec.parse(b'{"status":"success","data":{"id":1}}', lazy=True)
+        self.assertEqual(result["data"], {"id": 1})
+        calls = []
+        codec.when_decoded(result, calls.append)
+        self.assertEqual(calls, [{"status": "success", "data": {"id": 1}}])
+
+
+if __name__ == "__main__":
+    unittest.main()
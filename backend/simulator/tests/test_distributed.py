@@ -0,0 +1,132 @@
+"""
+Distributed mode with a controller and two agent processes on 127.0.0.1, against the mock backend
+Run from backend/simulator with: python -m unittest discover -s tests -t .
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import threading
+import unittest
+
+import yaml
+
+import distributed
+import metrics
+from main import ELearningSimulator
+from mock_backend import MockBackend
+
+SIMULATOR_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOKEN = "test-token"
+AGENTS = 2
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _count(snapshot) -> int:
+    return sum(data["count"] for data in snapshot["series"].values())
+
+
+class DistributedModeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.backend = MockBackend()
+        self.backend.start()
+        self.port = _free_port()
+        with open(os.path.join(SIMULATOR_DIR, "config.yaml")) as file:
+            config = yaml.safe_load(file)
+        users = {"num_admins": 1, "num_instructors": 2, "num_students": 5}
+        self.config = {
+            **config, **users,
+            "api_url": self.backend.api_url,
+            "min_delay": 0,
+            "max_delay": 0,
+            "credential_cache": {"enabled": False},
+            "results": {"enabled": False},
+            "load_profile": {"profile": "soak", "duration": 4, "level": sum(users.values())},
+            "distributed": {"host": "127.0.0.1", "port": self.port, "agents": AGENTS, "token": TOKEN,
+                            "join_timeout": 60, "start_delay": 1, "report_interval": 0.5, "stop_timeout": 15}
+        }
+        self.agents = []
+
+    def tearDown(self):
+        for agent in self.agents:
+            if agent.poll() is None:
+                agent.kill()
+            agent.wait(timeout=10)
+        self.backend.stop()
+
+    def start_agent(self) -> subprocess.Popen:
+        agent = subprocess.Popen(
+            [sys.executable, "main.py", "--agent", f"127.0.0.1:{self.port}", "--token", TOKEN],
+            cwd=SIMULATOR_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.agents.append(agent)
+        return agent
+
+    def intrude(self) -> bool:
+        """Whether a client with the wrong token gets anything before the controller hangs up"""
+        for _ in range(100):
+            try:
+                connection = distributed.Connection(socket.create_connection(("127.0.0.1", self.port), 5), "test")
+                break
+            except ConnectionRefusedError:
+                threading.Event().wait(0.1)
+        else:
+            self.fail("The controller did not start listening")
+        try:
+            connection.send({"type": "hello", "version": distributed.PROTOCOL_VERSION, "token": "wrong"})
+            return connection.receive(10) is not None
+        except OSError:
+            return False
+        finally:
+            connection.close()
+
+    def test_controller_and_two_agents(self):
+        simulator = ELearningSimulator(config=self.config)
+        simulator.controller = True
+        simulator.create_users()
+
+        setup = threading.Thread(target=simulator.setup_users)
+        setup.start()
+        self.assertFalse(self.intrude(), "a client with the wrong token was sent a message")
+        for _ in range(AGENTS):
+            self.start_agent()
+        setup.join(timeout=90)
+        self.assertFalse(setup.is_alive(), "the agents did not get ready")
+
+        simulator.start_simulation()
+        self.assertTrue(simulator.finished.wait(30), "the soak profile did not end the run")
+        simulator.stop_simulation()
+        for agent in self.agents:
+            self.assertEqual(agent.wait(timeout=30), 0)
+
+        # Every user belongs to exactly one agent
+        plans = simulator.coordinator.plans
+        self.assertEqual(len(plans), AGENTS)
+        for role, total in (("admin", 1), ("instructor", 2), ("student", 5)):
+            owned = [index for plan in plans for index in range(*plan[role])]
+            self.assertEqual(sorted(owned), list(range(total)), role)
+
+        # Every agent reported, and the merged metrics add up the agents' metrics
+        per_agent = simulator.coordinator.shard_stats()
+        self.assertEqual(len(per_agent), AGENTS)
+        counts = [_count(stats["metrics"]) for stats in per_agent]
+        self.assertTrue(all(count > 0 for count in counts), counts)
+        merged = simulator.collect_stats()
+        self.assertEqual(_count(merged["metrics"]), sum(counts))
+        self.assertEqual(merged["metrics"]["series"].keys(),
+                         metrics.merge_snapshots([stats["metrics"] for stats in per_agent])["series"].keys())
+        self.assertEqual(sum(total for _, total in merged["users"].values()), 8)
+        # Whole fan-outs are timed as their own series on top of their requests
+        sent = sum(data["count"] for (method, _, _), data in merged["metrics"]["series"].items()
+                   if method.lower() != "fanout")
+        self.assertLessEqual(sent, self.backend.requests)
+
+
+if __name__ == "__main__":
+    unittest.main()
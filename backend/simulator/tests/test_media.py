@@ -0,0 +1,98 @@
+"""
+Media streaming against the mock backend's generated /media files
+Run from backend/simulator with: python -m unittest discover -s tests -t .
+"""
+
+import asyncio
+import time
+import unittest
+
+import aiohttp
+
+import http_pool
+import media
+from metrics import LatencyHistogram
+from mock_backend import DEFAULT_MEDIA_SIZE, MockBackend
+
+
+class MediaFetchTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.backend = MockBackend()
+        cls.backend.start()
+        cls.base_url = f"http://{cls.backend.host}:{cls.backend.port}/media"
+
+    @classmethod
+    def tearDownClass(cls):
+        http_pool.close()
+        cls.backend.stop()
+
+    def setUp(self):
+        http_pool.configure({})
+        media.stats.reset()
+
+    def tearDown(self):
+        media.configure()
+
+    def configure(self, mode: str, max_bytes: int = 0, bitrate_kbps: float = 0, segment_bytes: int = 131072):
+        media.configure({"enabled": True, "mode": mode, "segment_bytes": segment_bytes, "chunk_size": 16384,
+                         "types": {"default": {"bitrate_kbps": bitrate_kbps, "max_bytes": max_bytes}}})
+
+    def fetch(self) -> dict:
+        self.assertTrue(media.fetch("quiz", f"{self.base_url}/quiz/lesson.bin", lambda: True))
+        return media.stats.snapshot()["quiz"]
+
+    def assert_one_fetch(self, entry: dict, size: int):
+        self.assertEqual(entry["fetches"], 1)
+        self.assertEqual(entry["failed"], 0)
+        self.assertEqual(entry["bytes"], size)
+        ttfb = LatencyHistogram.from_dict(entry["ttfb"])
+        self.assertEqual(ttfb.count, 1)
+        self.assertGreater(ttfb.max, 0)
+        self.assertLessEqual(ttfb.max, entry["seconds"] * 1_000_000)
+
+    def test_range_mode_reads_whole_file(self):
+        self.configure("range")
+        self.assert_one_fetch(self.fetch(), DEFAULT_MEDIA_SIZE)
+
+    def test_stream_mode_reads_whole_file(self):
+        self.configure("stream")
+        self.assert_one_fetch(self.fetch(), DEFAULT_MEDIA_SIZE)
+
+    def test_range_mode_stops_at_max_bytes(self):
+        self.configure("range", max_bytes=300000, segment_bytes=65536)
+        self.assert_one_fetch(self.fetch(), 300000)
+
+    def test_stream_mode_stops_at_max_bytes(self):
+        self.configure("stream", max_bytes=200001)
+        self.assert_one_fetch(self.fetch(), 200001)
+
+    def test_bitrate_paces_the_transfer(self):
+        # 4000 kbps = 500 KB/s: reading 300 KB takes at least the time to play all but the last chunk
+        for mode in media.MODES:
+            with self.subTest(mode=mode):
+                media.stats.reset()
+                self.configure(mode, max_bytes=300000, bitrate_kbps=4000)
+                started = time.perf_counter()
+                entry = self.fetch()
+                elapsed = time.perf_counter() - started
+                self.assert_one_fetch(entry, 300000)
+                self.assertGreaterEqual(elapsed, (300000 - 16384) / 500000)
+                self.assertLess(elapsed, 3.0)
+
+    def test_async_fetch(self):
+        async def fetch():
+            async with aiohttp.ClientSession() as session:
+                return await media.fetch_async(session, "quiz", f"{self.base_url}/quiz/lesson.bin", lambda: True)
+
+        for mode in media.MODES:
+            with self.subTest(mode=mode):
+                media.stats.reset()
+                self.configure(mode, max_bytes=250000, segment_bytes=65536)
+                self.assertTrue(asyncio.run(fetch()))
+                self.assert_one_fetch(media.stats.snapshot()["quiz"], 250000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+"""
+World model updates from responses that race the simulated users' own writes
+Run from backend/simulator with: python -m unittest discover -s tests -t .
+"""
+
+import time
+import unittest
+
+import world_model
+
+
+def _item(item_id, order, course_id=1):
+    return {"id": item_id, "course_id": course_id, "order": order, "type": "text", "content": {}}
+
+
+class WorldModelTest(unittest.TestCase):
+
+    def setUp(self):
+        world_model.configure()
+        self.model = world_model.WorldModel()
+        self.model.add_course({"id": 1, "title": "Course"}, instructor_id=7, created=True)
+
+    def tearDown(self):
+        world_model.configure()
+
+    def test_stale_content_listing_keeps_local_adds(self):
+        sent = time.perf_counter()
+        self.model.add_content(1, _item(10, 1))
+        # Sent before the add, so the listing does not have the new item yet
+        self.model.observe("course-content/1", {"status": "success", "data": []}, sent)
+        self.assertEqual([item.id for item in self.model.content[1]], [10])
+        self.assertEqual(self.model.next_order(1), 2)
+        self.assertEqual(self.model.stats()["violations"], {})
+
+    def test_current_content_listing_replaces_the_course(self):
+        self.model.add_content(1, _item(10, 1))
+        sent = time.perf_counter()
+        self.model.observe("course-content/1", {"status": "success", "data": [_item(10, 1), _item(11, 2)]}, sent)
+        self.assertEqual([item.id for item in self.model.content[1]], [10, 11])
+        self.assertEqual(self.model.next_order(1), 3)
+
+    def test_course_lookup_is_learned_without_validation(self):
+        world_model.configure({"validate": False})
+        self.model.observe("courses/2", {"status": "success", "data": {"id": 2, "title": "Other",
+                                                                       "instructor_id": 8}}, time.perf_counter())
+        self.assertEqual(self.model.title(2), "Other")
+        self.assertEqual(self.model.stats()["checks"], 0)
+
+    def test_running_totals_match_the_indexes(self):
+        sent = time.perf_counter()
+        self.model.add_content(1, _item(10, 1))
+        self.model.observe("course-content/1", {"status": "success", "data": [_item(11, 2)]}, sent)
+        self.model.observe("course-content/1", {"status": "success", "data": [_item(10, 1)]}, time.perf_counter())
+        self.model.enroll(3, 1)
+        self.model.enroll(3, 1, created=False)
+        self.model.observe("enrollments/course/1", {"status": "success", "data": [{"user_id": 3}, {"user_id": 4}]},
+                           time.perf_counter())
+        stats = self.model.stats()
+        self.assertEqual(stats["content"], sum(len(items) for items in self.model.content.values()))
+        self.assertEqual(stats["enrollments"], sum(len(courses) for courses in self.model.by_user.values()))
+        self.assertEqual((stats["content"], stats["enrollments"]), (1, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
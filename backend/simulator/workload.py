@@ -0,0 +1,236 @@
+"""
+Workload recording and replay for the E-Learning Platform Simulator
+Writes every request as a timestamped JSON-lines action log and re-issues such a log at original or scaled speed
+"""
+
+import glob
+import heapq
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional
+
+if TYPE_CHECKING:
+    import asyncio
+
+logger = logging.getLogger("elearning-simulator")
+
+# Defaults for the "workload" section of config.yaml
+DEFAULT_WORKLOAD_CONFIG = {
+    "seed": None,          # Seed for per-user RNGs; None keeps runs unseeded
+    "record": None,        # Path of the action log to write
+    "replay": None,        # Path (or glob) of action logs to re-issue instead of generating actions
+    "replay_speed": 1.0,   # 2.0 replays twice as fast as recorded
+    "replay_workers": 64   # Threaded engine: requests replayed at once
+}
+
+
+def user_rng(seed, email: str) -> random.Random:
+    """Per-user random generator; the same seed and email always give the same sequence"""
+    if seed is None:
+        return random.Random()
+    return random.Random(f"{seed}:{email}")
+
+
+class Recorder:
+    """Thread-safe streaming writer of the action log"""
+
+    def __init__(self, path: str, meta: Dict[str, Any] = None):
+        self.path = path
+        self._file = open(path, "w", buffering=1 << 16)
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self.count = 0
+        self._write({"meta": {"version": 1, "started": time.time(), **(meta or {})}})
+
+    def _write(self, entry: Dict[str, Any]):
+        self._file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+    def record(self, user, method: str, endpoint: str, payload: Optional[Dict]):
+        entry = {
+            "t": round(time.perf_counter() - self._origin, 4),
+            "u": user.email,
+            "a": user.current_action,
+            "m": method.lower(),
+            "e": endpoint
+        }
+        if payload is not None:
+            entry["p"] = payload
+        with self._lock:
+            self._write(entry)
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+        logger.info("Recorded %d requests to %s", self.count, self.path)
+
+
+_recorder: Optional[Recorder] = None
+
+
+def start_recording(path: str, meta: Dict[str, Any] = None):
+    global _recorder
+    _recorder = Recorder(path, meta)
+    logger.info("Recording workload to %s", path)
+
+
+def record(user, method: str, endpoint: str, payload: Optional[Dict]):
+    """Append a request to the action log when recording"""
+    if _recorder is not None:
+        _recorder.record(user, method, endpoint, payload)
+
+
+def stop_recording():
+    global _recorder
+    if _recorder is not None:
+        _recorder.close()
+        _recorder = None
+
+
+def read_log(path: str) -> Iterator[Dict[str, Any]]:
+    """Stream entries from one action log"""
+    with open(path, "r") as file:
+        for line in file:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if "meta" not in entry:
+                yield entry
+
+
+def read_logs(pattern: str) -> Iterator[Dict[str, Any]]:
+    """Stream entries from every log matching a path or glob (e.g. per-shard logs), in time order"""
+    paths = sorted(glob.glob(pattern)) or [pattern]
+    return heapq.merge(*(read_log(path) for path in paths), key=lambda entry: entry["t"])
+
+
+class Replayer:
+    """Re-issues a recorded action log from the threaded engine, keeping each user's requests in order"""
+
+    def __init__(self, pattern: str, users: List, speed: float = 1.0, workers: int = 64):
+        self.pattern = pattern
+        self.users = {user.email: user for user in users}
+        self.speed = speed
+        self.workers = max(1, workers)
+        self.queues = [queue.Queue() for _ in range(self.workers)]
+        self.active = False
+        self.threads = []
+        self._lock = threading.Lock()  # The workers all count issued requests
+        self.issued = 0
+        self.skipped = 0  # Entries for users that are not part of this process
+
+    def start(self):
+        self.active = True
+        self.threads.append(threading.Thread(target=self._feed, daemon=True, name="replay-feeder"))
+        for i in range(self.workers):
+            self.threads.append(threading.Thread(target=self._work, args=(self.queues[i],), daemon=True,
+                                                 name=f"replay-{i}"))
+        for thread in self.threads:
+            thread.start()
+
+    def _feed(self):
+        origin = time.perf_counter()
+        try:
+            for entry in read_logs(self.pattern):
+                if not self.active:
+                    return
+                user = self.users.get(entry["u"])
+                if user is None:
+                    self.skipped += 1
+                    continue
+                intended = origin + entry["t"] / self.speed
+                delay = intended - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                # A user always maps to the same worker, so its requests stay in recorded order
+                self.queues[hash(user.email) % self.workers].put((user, entry, intended))
+            logger.info("Replay of %s dispatched (%d entries for other users skipped)", self.pattern, self.skipped)
+        finally:
+            for work_queue in self.queues:
+                work_queue.put(None)
+
+    def _work(self, work_queue: queue.Queue):
+        while True:
+            item = work_queue.get()
+            if item is None:
+                break
+            user, entry, intended = item
+            if not self.active:
+                continue
+            user.current_action = entry.get("a")
+            user.intended_start = intended
+            try:
+                user.make_request(entry["m"], entry["e"], entry.get("p"), parse=False)
+            except Exception as e:
+                logger.error("Error replaying %s %s for %s: %s", entry["m"], entry["e"], user, e)
+            with self._lock:
+                self.issued += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"issued": self.issued, "skipped": self.skipped}
+
+    def stop(self, timeout: float = 2):
+        self.active = False
+        deadline = time.perf_counter() + timeout
+        for thread in self.threads:
+            thread.join(timeout=max(0.0, deadline - time.perf_counter()))
+
+
+class AsyncReplayer(Replayer):
+    """Replay driver for the async engine: one task per entry, serialized per user"""
+
+    def __init__(self, pattern: str, users: List, speed: float = 1.0):
+        super().__init__(pattern, users, speed, workers=1)
+        self.locks = {}
+        self.tasks = set()
+
+    async def run(self):
+        import asyncio
+
+        self.active = True
+        origin = time.perf_counter()
+        try:
+            for entry in read_logs(self.pattern):
+                if not self.active:
+                    return
+                user = self.users.get(entry["u"])
+                if user is None:
+                    self.skipped += 1
+                    continue
+                intended = origin + entry["t"] / self.speed
+                delay = intended - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                lock = self.locks.setdefault(user.email, asyncio.Lock())
+                task = asyncio.ensure_future(self._issue(user, entry, intended, lock))
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+            if self.tasks:
+                await asyncio.gather(*self.tasks, return_exceptions=True)
+            logger.info("Replay of %s finished (%d entries for other users skipped)", self.pattern, self.skipped)
+        finally:
+            for task in list(self.tasks):
+                task.cancel()
+
+    async def _issue(self, user, entry: Dict[str, Any], intended: float, lock: "asyncio.Lock"):
+        # asyncio.Lock wakes waiters in FIFO order, so a user's requests keep their recorded order
+        async with lock:
+            user.current_action = entry.get("a")
+            user.intended_start = intended
+            try:
+                await user.make_request(entry["m"], entry["e"], entry.get("p"), parse=False)
+            except Exception as e:
+                logger.error("Error replaying %s %s for %s: %s", entry["m"], entry["e"], user, e)
+            self.issued += 1
+
+    def start(self):
+        raise RuntimeError("AsyncReplayer runs on the async engine; use AsyncEngine.start_replay")
+
+    def stop(self, timeout: float = 2):
+        self.active = False
@@ -0,0 +1,310 @@
+"""
+Shared world model for the E-Learning Platform Simulator
+An indexed, in-memory view of the platform (courses by instructor, enrollments by user and by course,
+content order per course) kept in sync from API responses. Users pick action targets from it in O(1),
+skip lookups whose answer it already holds, and responses that contradict it are counted and logged.
+"""
+
+import bisect
+import logging
+import threading
+import time
+from typing import Any, Dict, Hashable, Iterable, List, NamedTuple, Optional
+
+logger = logging.getLogger("elearning-simulator")
+
+# Defaults for the "world_model" section of config.yaml
+DEFAULT_WORLD_MODEL_CONFIG = {
+    "skip_lookups": True,   # Take content order, content items and course titles from the model once known
+    "validate": True,       # Check responses against the model
+    "log_violations": 10    # Inconsistencies logged per kind; all of them are counted
+}
+
+# Attempts at drawing a course the student is not enrolled in before giving up
+UNENROLLED_TRIES = 8
+
+
+class ContentItem(NamedTuple):
+    order: int
+    id: Any
+    type: Optional[str]
+    url: Optional[str]
+
+
+class IdSet:
+    """Set of ids with O(1) add, discard, membership and uniform random choice"""
+
+    __slots__ = ("_items", "_positions")
+
+    def __init__(self):
+        self._items: List[Hashable] = []
+        self._positions: Dict[Hashable, int] = {}
+
+    def add(self, item: Hashable) -> bool:
+        """Add an id; returns False when it was already present"""
+        if item in self._positions:
+            return False
+        self._positions[item] = len(self._items)
+        self._items.append(item)
+        return True
+
+    def discard(self, item: Hashable):
+        position = self._positions.pop(item, None)
+        if position is None:
+            return
+        last = self._items.pop()
+        if position < len(self._items):
+            # Move the last id into the hole so the list stays dense
+            self._items[position] = last
+            self._positions[last] = position
+
+    def choice(self, rng) -> Optional[Hashable]:
+        return self._items[int(rng.random() * len(self._items))] if self._items else None
+
+    def __contains__(self, item: Hashable) -> bool:
+        return item in self._positions
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+
+def _id(value: Any) -> Any:
+    """Ids compare as ints where they are numeric, as the API returns them either way"""
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return value
+
+
+class WorldModel:
+    """Thread-safe indexes over everything the simulated users have created or been shown"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.courses = IdSet()                          # Every known course
+            self.course_info: Dict[Any, tuple] = {}         # Course id -> (instructor id, title)
+            self.by_instructor: Dict[Any, IdSet] = {}       # Instructor id -> their course ids
+            self.by_user: Dict[Any, IdSet] = {}             # User id -> enrolled course ids
+            self.by_course: Dict[Any, IdSet] = {}           # Course id -> enrolled user ids
+            self.content: Dict[Any, List[ContentItem]] = {}  # Course id -> content items by order
+            self.changed: Dict[Any, float] = {}             # Course id -> perf_counter time of our last write
+            self.enrollments = 0                            # Running totals, so stats() does not walk the indexes
+            self.items = 0
+            self.checks = 0
+            self.violations: Dict[str, int] = {}
+
+    # Writes made by the simulated users
+
+    def add_course(self, course: Dict[str, Any], instructor_id: Any = None, created: bool = False):
+        """Record a course from a listing, or from its create response with created=True"""
+        course_id = _id(course.get("id"))
+        if course_id is None:
+            return
+        owner = _id(course.get("instructor_id", instructor_id))
+        with self._lock:
+            known = self.course_info.get(course_id)
+            if known is not None and owner is not None and known[0] is not None and known[0] != owner:
+                self._violation("course_owner", f"course {course_id} listed for instructor {owner}, "
+                                                f"created by {known[0]}")
+                return
+            self.courses.add(course_id)
+            self.course_info[course_id] = (owner, course.get("title"))
+            if owner is not None:
+                self.by_instructor.setdefault(owner, IdSet()).add(course_id)
+            if created:
+                self.items -= len(self.content.get(course_id, ()))
+                self.content[course_id] = []  # Known to be empty, so its content order is known too
+
+    def enroll(self, user_id: Any, course_id: Any, created: bool = True):
+        """Record an enrollment; created=False for one the backend reported as already existing"""
+        user_id, course_id = _id(user_id), _id(course_id)
+        if user_id is None or course_id is None:
+            return
+        with self._lock:
+            added = self.by_user.setdefault(user_id, IdSet()).add(course_id)
+            self.by_course.setdefault(course_id, IdSet()).add(user_id)
+            if added:
+                self.enrollments += 1
+            self.changed[course_id] = time.perf_counter()
+            if created and not added:
+                self._violation("duplicate_enrollment", f"user {user_id} enrolled in course {course_id} twice")
+
+    def add_content(self, course_id: Any, item: Dict[str, Any]):
+        """Record a content item from a create response"""
+        course_id = _id(course_id)
+        entry = to_content_item(item)
+        with self._lock:
+            self.changed[course_id] = time.perf_counter()
+            items = self.content.get(course_id)
+            if items is None:
+                return  # The course's other items are not known; it is fetched whole when needed
+            if items and entry.order < items[-1].order:
+                bisect.insort(items, entry)
+            else:
+                items.append(entry)
+            self.items += 1
+
+    # Target picks
+
+    def own_course(self, instructor_id: Any, rng) -> Optional[Any]:
+        """Random course created by an instructor"""
+        with self._lock:
+            courses = self.by_instructor.get(_id(instructor_id))
+            return courses.choice(rng) if courses else None
+
+    def enrolled_course(self, user_id: Any, rng) -> Optional[Any]:
+        """Random course a user is enrolled in"""
+        with self._lock:
+            courses = self.by_user.get(_id(user_id))
+            return courses.choice(rng) if courses else None
+
+    def unenrolled_course(self, user_id: Any, rng) -> Optional[Any]:
+        """Random known course a user is not enrolled in; None when a few draws find none"""
+        with self._lock:
+            enrolled = self.by_user.get(_id(user_id)) or ()
+            if len(enrolled) >= len(self.courses):
+                return None
+            for _ in range(UNENROLLED_TRIES):
+                course_id = self.courses.choice(rng)
+                if course_id not in enrolled:
+                    return course_id
+            return None
+
+    def content_item(self, course_id: Any, rng) -> Optional[ContentItem]:
+        """Random content item of a course, or None when its content is not known"""
+        with self._lock:
+            items = self.content.get(_id(course_id))
+            return items[int(rng.random() * len(items))] if items else None
+
+    def next_order(self, course_id: Any) -> Optional[int]:
+        """Order of the next content item of a course, or None when its content is not known"""
+        with self._lock:
+            items = self.content.get(_id(course_id))
+            if items is None:
+                return None
+            return items[-1].order + 1 if items else 1
+
+    def title(self, course_id: Any) -> Optional[str]:
+        with self._lock:
+            info = self.course_info.get(_id(course_id))
+            return info[1] if info else None
+
+    # Responses
+
+    def observe(self, endpoint: str, result, sent: float):
+        """Learn from and check a successful GET response; sent is the perf_counter time it was sent"""
+        if result.get("status") != "success":
+            return
+        parts = endpoint.split("?", 1)[0].strip("/").split("/")
+        if parts[0] == "courses" and len(parts) == 1:
+            for course in result.get("data") or []:
+                self.add_course(course)
+        elif parts[0] == "courses" and len(parts) == 2:
+            self._check_course(_id(parts[1]), result.get("data") or {})
+        elif parts[0] == "course-content" and len(parts) == 2 and parts[1]:
+            self._observe_content(_id(parts[1]), result.get("data") or [], sent)
+        elif parts[:2] == ["enrollments", "course"] and len(parts) == 3:
+            self._observe_enrollments(_id(parts[2]), result.get("data") or [], sent)
+
+    def _check_course(self, course_id: Any, course: Dict[str, Any]):
+        if _config["validate"]:
+            with self._lock:
+                self.checks += 1
+                if course.get("id") is not None and _id(course["id"]) != course_id:
+                    self._violation("course_id", f"courses/{course_id} returned course {course['id']}")
+        self.add_course({**course, "id": course_id})
+
+    def _observe_content(self, course_id: Any, items: List[Dict[str, Any]], sent: float):
+        foreign = [item.get("id") for item in items
+                   if item.get("course_id") is not None and _id(item["course_id"]) != course_id]
+        entries = sorted(to_content_item(item) for item in items if item.get("id") not in foreign)
+        returned = {entry.id for entry in entries}
+        with self._lock:
+            # A response sent before our last write to the course may predate items we added since
+            current = self.changed.get(course_id, 0.0) < sent
+            if _config["validate"]:
+                self.checks += 1
+                if foreign:
+                    self._violation("content_course", f"course-content/{course_id} returned items {foreign} "
+                                                      f"of other courses")
+                if current:
+                    # Items created before the request was sent must be in it
+                    missing = [item.id for item in self.content.get(course_id, ()) if item.id not in returned]
+                    if missing:
+                        self._violation("content_missing", f"course-content/{course_id} is missing items {missing}")
+            if not current:
+                # Keep the items the response does not know about yet
+                entries += [item for item in self.content.get(course_id, ()) if item.id not in returned]
+                entries.sort()
+            self.items += len(entries) - len(self.content.get(course_id, ()))
+            self.content[course_id] = entries
+
+    def _observe_enrollments(self, course_id: Any, enrollments: Iterable[Dict[str, Any]], sent: float):
+        user_ids = [_id(enrollment.get("user_id")) for enrollment in enrollments]
+        with self._lock:
+            if _config["validate"]:
+                self.checks += 1
+                known = self.by_course.get(course_id)
+                if known and self.changed.get(course_id, 0.0) < sent:
+                    returned = set(user_ids)
+                    missing = [user_id for user_id in known if user_id not in returned]
+                    if missing:
+                        self._violation("enrollment_missing",
+                                        f"enrollments/course/{course_id} is missing users {missing}")
+            enrolled = self.by_course.setdefault(course_id, IdSet())
+            for user_id in user_ids:
+                if user_id is not None and enrolled.add(user_id):
+                    if self.by_user.setdefault(user_id, IdSet()).add(course_id):
+                        self.enrollments += 1
+
+    def _violation(self, kind: str, message: str):
+        """Count an inconsistency; called with the lock held"""
+        count = self.violations[kind] = self.violations.get(kind, 0) + 1
+        if count <= _config["log_violations"]:
+            logger.warning("World model: %s", message)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "courses": len(self.courses),
+                "enrollments": self.enrollments,
+                "content": self.items,
+                "checks": self.checks,
+                "violations": dict(self.violations)
+            }
+
+
+def to_content_item(item: Dict[str, Any]) -> ContentItem:
+    return ContentItem(int(item.get("order") or 0), _id(item.get("id")), item.get("type"),
+                       (item.get("content") or {}).get("url"))
+
+
+model = WorldModel()
+_config = dict(DEFAULT_WORLD_MODEL_CONFIG)
+
+
+def configure(config: Dict[str, Any] = None):
+    """Apply the "world_model" config section"""
+    global _config
+    _config = {**DEFAULT_WORLD_MODEL_CONFIG, **(config or {})}
+
+
+def skip_lookups() -> bool:
+    return _config["skip_lookups"]
+
+
+def merge_stats(snapshots) -> Dict[str, Any]:
+    """Combine model.stats() from several shards; each shard keeps its own model"""
+    merged = {"courses": 0, "enrollments": 0, "content": 0, "checks": 0, "violations": {}}
+    for snapshot in snapshots:
+        for key in ("courses", "enrollments", "content", "checks"):
+            merged[key] += snapshot[key]
+        for kind, count in snapshot["violations"].items():
+            merged["violations"][kind] = merged["violations"].get(kind, 0) + count
+    return merged